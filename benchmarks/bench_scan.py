@@ -0,0 +1,158 @@
+"""
+Benchmark dos modos do scanner sobre uma árvore sintética (ou real).
+
+Cada modo roda em um subprocesso próprio, para que o pico de RSS medido seja só dele.
+O resultado é gravado em JSON para comparação entre versões.
+
+Uso:
+	python -m benchmarks.bench_scan [--root DIR] [--files 10000] [--modes serial,parallel,...]
+		[--jobs N] [--output bench.json] [opções de benchmarks.synth]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synth import SynthSpec, generate
+from core.scanner import DEFAULT_EXCLUDES, DEFAULT_GLOBS, iter_files
+
+try:
+	import resource
+except ImportError:  # Windows
+	resource = None  # type: ignore[assignment]
+
+
+MODES = ("serial", "parallel", "cache-cold", "cache-warm", "index", "ndjson", "library")
+# Passo interno que grava o cache usado por "cache-warm"
+WARMUP = "cache-warmup"
+
+
+def _peak_rss_mb() -> Dict[str, Any]:
+	if resource is None:
+		return {"peak_rss_mb": None, "peak_rss_workers_mb": None}
+	# ru_maxrss é KiB no Linux e bytes no macOS
+	scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+	own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+	children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+	return {"peak_rss_mb": round(own, 1), "peak_rss_workers_mb": round(children, 1)}
+
+
+def _run_mode(mode: str, root: Path, jobs: int, workdir: Path) -> Dict[str, Any]:
+	from cli.commands import scan as scan_cli
+	from core.scan_cache import ScanCache
+	from core.scan_index import ScanIndex
+	from core.scanner import scan_paths
+
+	globs, excludes = list(DEFAULT_GLOBS), set(DEFAULT_EXCLUDES)
+	cache_path = workdir / "scan_cache.json"
+	runners: Dict[str, Callable[[], int]] = {
+		"serial": lambda: len(scan_cli._scan_tree(root, globs, excludes)),
+		"parallel": lambda: len(scan_cli._scan_tree(root, globs, excludes, jobs=jobs)),
+		"cache-cold": lambda: len(scan_cli._scan_tree(root, globs, excludes, cache=ScanCache(cache_path))),
+		"cache-warm": lambda: len(scan_cli._scan_tree(root, globs, excludes, cache=ScanCache(cache_path).load())),
+		"index": lambda: len(scan_cli._scan_tree(root, globs, excludes, index=ScanIndex())),
+		"ndjson": lambda: scan_cli._stream_ndjson(
+			scan_cli._iter_results(iter_files(root, globs, excludes)), str(workdir / "scan.ndjson")
+		),
+		"library": lambda: len(scan_paths(root, globs, excludes)),
+	}
+	if mode == WARMUP:
+		# Roda em subprocesso próprio antes de "cache-warm", cujo pico de RSS não inclui este scan
+		cache = ScanCache(cache_path)
+		scan_cli._scan_tree(root, globs, excludes, cache=cache)
+		cache.save()
+		return {"mode": mode}
+	start = time.perf_counter()
+	variables = runners[mode]()
+	elapsed = time.perf_counter() - start
+	return {"mode": mode, "seconds": round(elapsed, 4), "variables": variables, **_peak_rss_mb()}
+
+
+def _spawn(mode: str, root: Path, jobs: int, workdir: str) -> Dict[str, Any]:
+	proc = subprocess.run(
+		[sys.executable, "-m", "benchmarks.bench_scan", "--run-mode", mode, "--root", str(root),
+		 "--jobs", str(jobs), "--workdir", workdir],
+		check=True,
+		stdout=subprocess.PIPE,
+		cwd=Path(__file__).resolve().parent.parent,
+	)
+	return json.loads(proc.stdout)
+
+
+def _candidates(root: Path) -> Dict[str, int]:
+	count = total = 0
+	for path in iter_files(root, DEFAULT_GLOBS, DEFAULT_EXCLUDES):
+		count += 1
+		total += path.stat().st_size
+	return {"files": count, "bytes": total}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Benchmark dos modos do scanner")
+	parser.add_argument("--root", help="Árvore a escanear; se omitida, gera uma sintética")
+	parser.add_argument("--modes", default=",".join(MODES))
+	parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+	parser.add_argument("--output", help="Arquivo JSON de resultados (padrão: stdout)")
+	parser.add_argument("--run-mode", help=argparse.SUPPRESS)
+	parser.add_argument("--workdir", help=argparse.SUPPRESS)
+	defaults = SynthSpec()
+	for field_name, value in asdict(defaults).items():
+		parser.add_argument(f"--{field_name.replace('_', '-')}", type=type(value), default=value)
+	args = parser.parse_args()
+
+	if args.run_mode:
+		result = _run_mode(args.run_mode, Path(args.root), args.jobs, Path(args.workdir))
+		print(json.dumps(result))
+		return
+
+	spec = SynthSpec(**{k: getattr(args, k) for k in asdict(defaults)})
+	with tempfile.TemporaryDirectory(prefix="envsecure-bench-") as tmp:
+		root = Path(args.root) if args.root else Path(tmp) / "tree"
+		if not args.root:
+			generate(root, spec)
+		workload = _candidates(root)
+		results: List[Dict[str, Any]] = []
+		for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+			if mode not in MODES:
+				parser.error(f"modo desconhecido: {mode}")
+			if mode == "cache-warm":
+				_spawn(WARMUP, root, args.jobs, tmp)
+			result = _spawn(mode, root, args.jobs, tmp)
+			seconds = max(result["seconds"], 1e-9)
+			result["files_per_s"] = round(workload["files"] / seconds, 1)
+			result["mb_per_s"] = round(workload["bytes"] / (1024 * 1024) / seconds, 2)
+			results.append(result)
+			print(
+				f"{mode:11s} {result['seconds']:8.3f}s {result['files_per_s']:10.1f} files/s "
+				f"{result['mb_per_s']:8.2f} MB/s rss {result['peak_rss_mb']} MB (workers {result['peak_rss_workers_mb']} MB)",
+				file=sys.stderr,
+			)
+
+	report = {
+		"meta": {
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"cpu_count": os.cpu_count(),
+			"jobs": args.jobs,
+			"root": args.root,
+			"spec": None if args.root else asdict(spec),
+			"workload": workload,
+		},
+		"results": results,
+	}
+	text = json.dumps(report, indent=2)
+	if args.output:
+		Path(args.output).write_text(text)
+	else:
+		print(text)
+
+
+if __name__ == "__main__":
+	main()
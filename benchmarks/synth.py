@@ -0,0 +1,127 @@
+"""
+Gerador de monorepo sintético para benchmarks do scanner.
+
+Uso:
+	python -m benchmarks.synth DEST [--files 10000] [--depth 4] [--fanout 6]
+		[--size-mean 4096] [--size-sigma 1.0] [--binary-ratio 0.01] [--excluded-share 0.2] [--seed 42]
+"""
+import argparse
+import json
+import math
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List
+
+
+EXCLUDED_DIRS = ("node_modules", ".git", "__pycache__", ".venv")
+NAMES = [f"{prefix}_{suffix}" for prefix in ("DB", "REDIS", "API", "SMTP", "S3", "JWT") for suffix in ("HOST", "PORT", "USER", "PASSWORD", "URL", "KEY", "SECRET", "TOKEN")]
+FILLER = {
+	".py": [
+		"    result = self.session.execute(query, params=params)",
+		"def handle(event: dict) -> None:",
+		"    logger.info('processing %s', event)",
+		"    return {'status': 'ok', 'items': [x.to_dict() for x in items]}",
+	],
+	".yml": [
+		"    image: registry.example.com/app:latest",
+		"    restart: unless-stopped",
+		"      - \"8000:8000\"",
+		"      - ./data:/var/lib/data",
+	],
+	".json": ['  {"id": 1, "label": "item", "enabled": true},'],
+	"Dockerfile": ["RUN pip install -r requirements.txt", "COPY . /app", "WORKDIR /app"],
+}
+HITS = {
+	".py": "    value = os.getenv('{name}')",
+	".yml": "      - {name}=${{{name}}}",
+	".json": '  {{"env": "${{{name}}}"}},',
+	"Dockerfile": "ENV {name} value",
+}
+
+
+@dataclass
+class SynthSpec:
+	files: int = 10000
+	depth: int = 4
+	fanout: int = 6
+	size_mean: int = 4096
+	size_sigma: float = 1.0
+	binary_ratio: float = 0.01
+	excluded_share: float = 0.2
+	hit_ratio: float = 0.05
+	seed: int = 42
+
+
+def _directories(spec: SynthSpec) -> List[Path]:
+	dirs = [Path(".")]
+	frontier = [Path(".")]
+	for level in range(spec.depth):
+		nxt: List[Path] = []
+		for parent in frontier:
+			for i in range(spec.fanout):
+				nxt.append(parent / f"pkg{level}_{i}")
+		dirs.extend(nxt)
+		frontier = nxt
+	return dirs
+
+
+def _content(rng: random.Random, kind: str, size: int, spec: SynthSpec) -> bytes:
+	lines: List[str] = []
+	total = 0
+	while total < size:
+		if rng.random() < spec.hit_ratio:
+			line = HITS[kind].format(name=rng.choice(NAMES))
+		else:
+			line = rng.choice(FILLER[kind])
+		lines.append(line)
+		total += len(line) + 1
+	return ("\n".join(lines) + "\n").encode()
+
+
+def generate(dest: Path, spec: SynthSpec) -> Dict[str, int]:
+	"""Gera a árvore em `dest` e devolve contagens do que foi criado."""
+	rng = random.Random(spec.seed)
+	dirs = _directories(spec)
+	# Tamanho log-normal com média aproximada size_mean
+	mu = math.log(max(spec.size_mean, 1)) - spec.size_sigma ** 2 / 2
+	stats = {"files": 0, "bytes": 0, "binary": 0, "excluded": 0}
+	for i in range(spec.files):
+		directory = dest / rng.choice(dirs)
+		if rng.random() < spec.excluded_share:
+			directory = directory / rng.choice(EXCLUDED_DIRS)
+			stats["excluded"] += 1
+		directory.mkdir(parents=True, exist_ok=True)
+		kind = rng.choice(list(FILLER))
+		name = "Dockerfile" if kind == "Dockerfile" else f"f{i}{kind}"
+		if kind == "Dockerfile":
+			directory = directory / f"svc{i}"
+			directory.mkdir(parents=True, exist_ok=True)
+		size = max(16, int(rng.lognormvariate(mu, spec.size_sigma)))
+		if rng.random() < spec.binary_ratio:
+			# Bytes do rng semeado (não os.urandom): a árvore é reproduzível pela seed
+			data = rng.getrandbits(8 * size).to_bytes(size, "little") + b"\0"
+			stats["binary"] += 1
+		else:
+			data = _content(rng, kind, size, spec)
+		(directory / name).write_bytes(data)
+		stats["files"] += 1
+		stats["bytes"] += len(data)
+	(dest / "synth.json").write_text(json.dumps({"spec": asdict(spec), "stats": stats}, indent=2))
+	return stats
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Gera um monorepo sintético para benchmarks do scanner")
+	parser.add_argument("dest")
+	defaults = SynthSpec()
+	for field_name, value in asdict(defaults).items():
+		parser.add_argument(f"--{field_name.replace('_', '-')}", type=type(value), default=value)
+	args = parser.parse_args()
+	spec = SynthSpec(**{k: getattr(args, k) for k in asdict(defaults)})
+	stats = generate(Path(args.dest), spec)
+	print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+	main()
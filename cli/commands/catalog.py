@@ -1,28 +1,20 @@
+import heapq
+import itertools
 import json
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Any, Callable, Iterable, Iterator, Optional, Dict, List, Set, TextIO, Tuple
 import click
 from rich.table import Table
 from rich.console import Console
+from core.catalog import CATALOG_DB, CATALOG_FILE, CatalogStore, catalog_transaction, open_catalog
+from core.catalog_query import CatalogQuery, QueryError, compile_query, quote
 
 
 console = Console()
 
 
-CATALOG_FILE = Path(".envsecure/catalog.json")
-
-
-def _load_catalog() -> dict:
-	if CATALOG_FILE.exists():
-		return json.loads(CATALOG_FILE.read_text())
-	return {}
-
-
-def _save_catalog(data: dict) -> None:
-	CATALOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-	CATALOG_FILE.write_text(json.dumps(data, indent=2, ensure_ascii=False))
-
-
 @click.group()
 def catalog_cmd() -> None:
 	"""Gerencia o catálogo de variáveis."""
@@ -36,60 +28,156 @@ def catalog_cmd() -> None:
 @click.option("--required", is_flag=True, default=False)
 @click.option("--min-length", type=int)
 def add_cmd(name: str, category: str, sensitive: bool, required: bool, min_length: Optional[int]) -> None:
-	catalog = _load_catalog()
-	catalog[name] = {
-		"category": category,
-		"sensitive": sensitive,
-		"required": required,
-		"min_length": min_length,
-	}
-	_save_catalog(catalog)
+	with catalog_transaction() as catalog:
+		catalog.put(
+			name,
+			{
+				"category": category,
+				"sensitive": sensitive,
+				"required": required,
+				"min_length": min_length,
+			},
+		)
 	console.print(f"[green]Adicionada {name}[/green]")
 
 
+Item = Tuple[str, Dict[str, Any]]
+
+QUERY_HELP = "Consulta, ex: 'category=secrets and sensitive=true and name~DB_*' (=, !=, ~ glob, !~, and/or/not)"
+
+
+def _compile(expr: Optional[str], param_hint: str = "--filter") -> Optional[CatalogQuery]:
+	if not expr:
+		return None
+	try:
+		return compile_query(expr)
+	except QueryError as e:
+		raise click.BadParameter(str(e), param_hint=param_hint)
+
+
+def _select(catalog: CatalogStore, query: Optional[CatalogQuery]) -> Iterator[Item]:
+	return catalog.query(query) if query is not None else catalog.items()
+
+
+LIST_COLUMNS = ("category", "sensitive", "required", "min_length")
+SORT_KEYS = ("name", "category", "sensitive", "required", "detected_in")
+
+def _sort_key(field: str) -> Callable[[Item], Any]:
+	if field == "name":
+		return lambda item: item[0]
+	if field == "detected_in":
+		return lambda item: (len(item[1].get("detected_in") or ()), item[0])
+	return lambda item: (str(item[1].get(field, "")), item[0])
+
+
+def _page(items: Iterable[Item], sort: Optional[str], offset: int, limit: Optional[int]) -> Iterator[Item]:
+	"""Aplica --sort/--offset/--limit; com limite, ordena só o top-(offset+limit) via heap."""
+	if sort:
+		key = _sort_key(sort)
+		if limit is not None:
+			items = heapq.nsmallest(offset + limit, items, key=key)
+		else:
+			items = sorted(items, key=key)
+	stop = offset + limit if limit is not None else None
+	return itertools.islice(items, offset, stop)
+
+
+def _list_row(name: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+	row: Dict[str, Any] = {"name": name}
+	for column in LIST_COLUMNS:
+		row[column] = meta.get(column)
+	return row
+
+
 @catalog_cmd.command("list")
-@click.option("--filter", "filter_expr", help="Ex: sensitive=true")
-def list_cmd(filter_expr: Optional[str]) -> None:
-	catalog = _load_catalog()
-	items = list(catalog.items())
-	if filter_expr:
-		key, _, value = filter_expr.partition("=")
-		if key and _:
-			value_norm = value.lower() in {"1", "true", "yes"}
-			items = [(k, v) for k, v in items if str(v.get(key)).lower() in {value.lower(), str(value_norm)}]
-	
-	table = Table(title="Catálogo")
-	table.add_column("Name")
-	table.add_column("Category")
-	table.add_column("Sensitive")
-	table.add_column("Required")
-	table.add_column("MinLen")
-	for name, meta in items:
-		table.add_row(
-			name,
-			str(meta.get("category", "")),
-			str(meta.get("sensitive", False)),
-			str(meta.get("required", False)),
-			str(meta.get("min_length", "")),
-		)
-	console.print(table)
+@click.option("--filter", "filter_expr", help=QUERY_HELP)
+@click.option("--sort", type=click.Choice(SORT_KEYS), help="Ordena por campo (detected_in = nº de ocorrências)")
+@click.option("--offset", type=click.IntRange(min=0), default=0, show_default=True)
+@click.option("--limit", type=click.IntRange(min=0), help="Máximo de entradas exibidas")
+@click.option(
+	"--format",
+	"fmt",
+	type=click.Choice(["table", "plain", "ndjson"]),
+	default="table",
+	show_default=True,
+	help="plain (TSV) e ndjson são escritos linha a linha, sem montar a tabela",
+)
+def list_cmd(filter_expr: Optional[str], sort: Optional[str], offset: int, limit: Optional[int], fmt: str) -> None:
+	query = _compile(filter_expr)
+	catalog = open_catalog()
+	rows = _page(_select(catalog, query), sort, offset, limit)
+
+	if fmt == "plain":
+		for name, meta in rows:
+			click.echo("\t".join([name] + ["" if meta.get(c) is None else str(meta.get(c)) for c in LIST_COLUMNS]))
+	elif fmt == "ndjson":
+		for name, meta in rows:
+			click.echo(json.dumps(_list_row(name, meta), ensure_ascii=False))
+	else:
+		table = Table(title="Catálogo")
+		table.add_column("Name")
+		table.add_column("Category")
+		table.add_column("Sensitive")
+		table.add_column("Required")
+		table.add_column("MinLen")
+		for name, meta in rows:
+			table.add_row(
+				name,
+				str(meta.get("category", "")),
+				str(meta.get("sensitive", False)),
+				str(meta.get("required", False)),
+				str(meta.get("min_length", "")),
+			)
+		console.print(table)
+	catalog.close()
+
+
+def _export_meta(meta: Dict[str, Any], counts: bool) -> Dict[str, Any]:
+	if counts and "detected_in" in meta:
+		meta = dict(meta)
+		meta["detected_in_count"] = len(meta.pop("detected_in") or ())
+	return meta
+
+
+def _write_export(fh: TextIO, items: Iterable[Item], fmt: str, counts: bool) -> int:
+	"""Escreve a exportação entrada a entrada; retorna o número de entradas."""
+	count = 0
+	if fmt == "csv":
+		fh.write("name;category;sensitive;required;min_length" + (";detected_in_count" if counts else "") + "\n")
+		for name, meta in items:
+			line = f"{name};{meta.get('category','')};{meta.get('sensitive',False)};{meta.get('required',False)};{meta.get('min_length','')}"
+			if counts:
+				line += f";{len(meta.get('detected_in') or ())}"
+			fh.write(line + "\n")
+			count += 1
+	elif fmt == "ndjson":
+		for name, meta in items:
+			row = {"name": name, **_export_meta(meta, counts)}
+			fh.write(json.dumps(row, ensure_ascii=False, default=list) + "\n")
+			count += 1
+	else:
+		# Mesmo texto de json.dumps(catalogo, indent=2), mas uma entrada por vez
+		fh.write("{")
+		for name, meta in items:
+			entry = json.dumps({name: _export_meta(meta, counts)}, indent=2, ensure_ascii=False, default=list)
+			fh.write(("," if count else "") + entry[1:-2])
+			count += 1
+		fh.write("\n}" if count else "}")
+	return count
 
 
 @catalog_cmd.command("export")
-@click.option("--format", "fmt", type=click.Choice(["json", "csv"]), default="json")
+@click.option("--format", "fmt", type=click.Choice(["json", "csv", "ndjson"]), default="json")
 @click.option("--output", required=True)
-def export_cmd(fmt: str, output: str) -> None:
-	catalog = _load_catalog()
+@click.option("--counts", is_flag=True, default=False, help="Exportar o nº de ocorrências em vez da lista detected_in")
+@click.option("--filter", "filter_expr", help=QUERY_HELP)
+def export_cmd(fmt: str, output: str, counts: bool, filter_expr: Optional[str]) -> None:
+	query = _compile(filter_expr)
+	catalog = open_catalog()
 	out_path = Path(output)
-	if fmt == "json":
-		out_path.write_text(json.dumps(catalog, indent=2, ensure_ascii=False))
-	else:
-		lines = ["name;category;sensitive;required;min_length"]
-		for name, meta in catalog.items():
-			lines.append(
-				f"{name};{meta.get('category','')};{meta.get('sensitive',False)};{meta.get('required',False)};{meta.get('min_length','')}"
-			)
-		out_path.write_text("\n".join(lines))
+	with out_path.open("w", encoding="utf-8") as fh:
+		_write_export(fh, _select(catalog, query), fmt, counts)
+	catalog.close()
 	console.print(f"[green]Exportado para {out_path}[/green]")
 
 
@@ -98,11 +186,11 @@ def clean_invalid_cmd() -> None:
 	"""Remove entradas inválidas (nomes fora de ^[A-Z][A-Z0-9_]*$)."""
 	import re
 	env_re = re.compile(r"^[A-Z][A-Z0-9_]*$")
-	catalog = _load_catalog()
-	before = len(catalog)
-	catalog = {k: v for k, v in catalog.items() if env_re.match(k)}
-	_save_catalog(catalog)
-	console.print(f"[green]Removidas {before - len(catalog)} entradas inválidas[/green]")
+	with catalog_transaction() as catalog:
+		invalid = [k for k in catalog.names() if not env_re.match(k)]
+		for name in invalid:
+			catalog.delete(name)
+	console.print(f"[green]Removidas {len(invalid)} entradas inválidas[/green]")
 
 
 def _auto_category(name: str) -> str:
@@ -116,42 +204,141 @@ def _auto_category(name: str) -> str:
 	return "general"
 
 
+@dataclass
+class ScanDiff:
+	"""Diferença entre o catálogo e um scan importado."""
+
+	added: List[str] = field(default_factory=list)
+	changed: List[str] = field(default_factory=list)
+	removed: List[str] = field(default_factory=list)
+	paths_added: Set[str] = field(default_factory=set)
+	paths_removed: Set[str] = field(default_factory=set)
+
+	def __bool__(self) -> bool:
+		return bool(self.added or self.changed or self.removed)
+
+	def summary(self) -> str:
+		return (
+			f"+{len(self.added)} variáveis, ~{len(self.changed)} alteradas, -{len(self.removed)} não detectadas; "
+			f"caminhos +{len(self.paths_added)} -{len(self.paths_removed)}"
+		)
+
+
+def _missing_fields(name: str, meta: Dict[str, Any], auto_categorize: bool) -> Dict[str, object]:
+	# Só campos ausentes: um set-required concorrente não é sobrescrito (min_length None = ausente)
+	sensitive_default = any(k in name.lower() for k in ["password", "passwd", "secret", "token", "key"])
+	defaults = {
+		"sensitive": sensitive_default,
+		"required": True,
+	}
+	fields: Dict[str, object] = {k: v for k, v in defaults.items() if k not in meta}
+	if not meta.get("category"):
+		fields["category"] = _auto_category(name) if auto_categorize else "general"
+	return fields
+
+
+def _import_scan(groups: Iterable[Tuple[str, List[str]]], auto_categorize: bool, prune: bool = False) -> ScanDiff:
+	"""Aplica um scan ao catálogo gravando só o que mudou.
+
+	Cada grupo de `groups` (lido em streaming) é comparado com `catalog.get(name)` assim que
+	chega; só as variáveis que mudam guardam estado até o fim. No NDJSON uma variável reaparece
+	em vários grupos: enquanto eles repetem, em ordem, o detected_in atual, só um contador é
+	mantido. Cada variável recebe no máximo um update. Variáveis que não aparecem no scan são
+	listadas em `removed` e, com `prune`, têm detected_in esvaziado. Sem diferenças, nada é gravado.
+	"""
+	diff = ScanDiff()
+	with catalog_transaction() as catalog:
+		# Variável vista -> quantos caminhos do detected_in atual o scan já repetiu, em ordem
+		seen: Dict[str, int] = {}
+		# Só variáveis que mudam: campos ausentes e, se o detected_in diverge, os novos caminhos
+		fields: Dict[str, Dict[str, object]] = {}
+		paths: Dict[str, Dict[str, None]] = {}
+		for name, files in groups:
+			if name in paths:
+				paths[name].update(dict.fromkeys(files))
+				continue
+			meta = catalog.get(name)
+			if name not in seen:
+				if meta is None:
+					diff.added.append(name)
+				missing = _missing_fields(name, meta or {}, auto_categorize)
+				if missing:
+					fields[name] = missing
+			old = (meta or {}).get("detected_in") or []
+			matched = seen.get(name, 0)
+			seen[name] = matched + len(files)
+			if list(old[matched:matched + len(files)]) != files:
+				paths[name] = dict.fromkeys(list(old[:matched]) + files)
+
+		# Passada final: contagem de caminhos, variáveis desaparecidas e detected_in encurtados
+		path_refs: Counter = Counter()
+		changes: Dict[str, Tuple[List[str], List[str]]] = {}
+		for name, meta in catalog.items():
+			current = list(meta.get("detected_in") or ())
+			path_refs.update(set(current))
+			if name in paths:
+				changes[name] = (current, list(paths.pop(name)))
+			elif name not in seen:
+				if current:
+					diff.removed.append(name)
+					if prune:
+						changes[name] = (current, [])
+			elif seen[name] < len(current):
+				changes[name] = (current, current[:seen[name]])
+		for name, found in paths.items():
+			changes[name] = ([], list(found))
+		before = set(path_refs)
+
+		added = set(diff.added)
+		for name in dict.fromkeys(itertools.chain(fields, changes)):
+			update = fields.get(name, {})
+			if name in changes:
+				old, new = changes[name]
+				update["detected_in"] = new
+				path_refs.subtract(set(old))
+				path_refs.update(set(new))
+			if name in seen and name not in added:
+				diff.changed.append(name)
+			catalog.update(name, update)
+		after = {path for path, count in path_refs.items() if count > 0}
+		diff.paths_added = after - before
+		diff.paths_removed = before - after
+	return diff
+
+
 @catalog_cmd.command("import-scan")
 @click.option("--file", "scan_file", required=True, type=click.Path(exists=True, dir_okay=False))
 @click.option("--auto-categorize", is_flag=True, default=False, help="Tentar categorizar automaticamente")
-def import_scan_cmd(scan_file: str, auto_categorize: bool) -> None:
-	"""Importa variáveis a partir de um JSON gerado por 'envsecure scan'."""
-	data: Dict[str, List[str]] = json.loads(Path(scan_file).read_text())
-	catalog = _load_catalog()
-	for name, detected_in in data.items():
-		meta = catalog.get(name, {})
-		category = meta.get("category") or (_auto_category(name) if auto_categorize else "general")
-		sensitive_default = any(k in name.lower() for k in ["password", "passwd", "secret", "token", "key"])
-		meta.update(
-			{
-				"category": category,
-				"sensitive": meta.get("sensitive", sensitive_default),
-				"required": meta.get("required", True),
-				"min_length": meta.get("min_length", None),
-				"detected_in": detected_in,
-			}
-		)
-		catalog[name] = meta
-	_save_catalog(catalog)
-	console.print(f"[green]Importadas {len(data)} variáveis do scan[/green]")
+@click.option("--prune", is_flag=True, default=False, help="Esvaziar detected_in de variáveis ausentes do scan")
+def import_scan_cmd(scan_file: str, auto_categorize: bool, prune: bool) -> None:
+	"""Importa variáveis a partir de um JSON/NDJSON gerado por 'envsecure scan'."""
+	from core.scanner import iter_scan_groups
+	try:
+		diff = _import_scan(iter_scan_groups(Path(scan_file)), auto_categorize, prune)
+	except ValueError as e:
+		raise click.ClickException(f"Scan inválido em {scan_file}: {e}")
+	if not diff:
+		console.print("[green]Catálogo já atualizado; nada a gravar[/green]")
+		return
+	console.print(f"[green]Scan importado: {diff.summary()}[/green]")
+	if diff.removed and not prune:
+		console.print(f"[yellow]{len(diff.removed)} variáveis não detectadas mantidas (use --prune para limpá-las)[/yellow]")
 
 
 @catalog_cmd.command("generate-template")
 @click.option("--output", default=str(Path(".envsecure") / "templates" / "app.env.safe"), show_default=True)
 @click.option("--only-required", is_flag=True, default=False, help="Incluir apenas variáveis marcadas como required")
-def generate_template_cmd(output: str, only_required: bool) -> None:
+@click.option("--filter", "filter_expr", help=QUERY_HELP)
+def generate_template_cmd(output: str, only_required: bool, filter_expr: Optional[str]) -> None:
 	"""Gera o template .env seguro com base no catálogo atual."""
-	catalog = _load_catalog()
+	query = _compile(filter_expr)
+	catalog = open_catalog()
 	lines: List[str] = ["# Template gerado a partir do catálogo", "# Não inclua valores sensíveis aqui"]
-	for name in sorted(catalog.keys()):
-		if only_required and not catalog.get(name, {}).get("required", True):
+	for name, meta in sorted(_select(catalog, query)):
+		if only_required and not meta.get("required", True):
 			continue
 		lines.append(f"{name}=")
+	catalog.close()
 	out_path = Path(output)
 	out_path.parent.mkdir(parents=True, exist_ok=True)
 	out_path.write_text("\n".join(lines) + "\n")
@@ -162,40 +349,72 @@ def generate_template_cmd(output: str, only_required: bool) -> None:
 @click.option("--all", "set_all", is_flag=True, default=False, help="Aplicar a todos do catálogo")
 @click.option("--name", "name", help="Aplicar a um nome específico")
 @click.option("--pattern", "pattern", help="Aplicar a nomes que casem com padrão simples (*, ?)")
+@click.option("--where", "where", help=QUERY_HELP)
 @click.option("--required/--optional", default=True, show_default=True)
-def set_required_cmd(set_all: bool, name: str | None, pattern: str | None, required: bool) -> None:
+def set_required_cmd(set_all: bool, name: str | None, pattern: str | None, where: str | None, required: bool) -> None:
 	"""Marca variáveis como obrigatórias ou opcionais."""
-	import fnmatch
-	catalog = _load_catalog()
-	changed = 0
-	for var_name, meta in catalog.items():
-		match = False
+	# --name/--pattern/--where viram uma única consulta (termos combinados com 'or')
+	terms = []
+	try:
+		if name:
+			terms.append(f"name={quote(name)}")
+		if pattern:
+			terms.append(f"name~{quote(pattern)}")
+	except QueryError as e:
+		raise click.BadParameter(str(e), param_hint="--name/--pattern")
+	if where:
+		terms.append(f"({where})")
+	query = _compile(" or ".join(terms), param_hint="--name/--pattern/--where")
+	with catalog_transaction() as catalog:
 		if set_all:
-			match = True
-		elif name and var_name == name:
-			match = True
-		elif pattern and fnmatch.fnmatch(var_name, pattern):
-			match = True
-		if match:
-			meta["required"] = required
-			changed += 1
-	_save_catalog(catalog)
-	console.print(f"[green]Atualizadas {changed} entradas (required={required})[/green]")
+			targets = catalog.names()
+		else:
+			targets = catalog.query_names(query) if query is not None else []
+		catalog.update_many(targets, {"required": required})
+	console.print(f"[green]Atualizadas {len(targets)} entradas (required={required})[/green]")
 
 
 @catalog_cmd.command("auto-required")
 def auto_required_cmd() -> None:
 	"""Define 'required' com heurística: secrets/database obrigatórias, demais opcionais."""
-	catalog = _load_catalog()
 	changed = 0
-	for var_name, meta in catalog.items():
-		category = meta.get("category", "general")
-		is_sensitive = bool(meta.get("sensitive", False))
-		req = category in {"secrets", "database"} or is_sensitive
-		if meta.get("required") != req:
-			meta["required"] = req
-			changed += 1
-	_save_catalog(catalog)
+	with catalog_transaction() as catalog:
+		for var_name, meta in list(catalog.items()):
+			category = meta.get("category", "general")
+			is_sensitive = bool(meta.get("sensitive", False))
+			req = category in {"secrets", "database"} or is_sensitive
+			if meta.get("required") != req:
+				catalog.update(var_name, {"required": req})
+				changed += 1
 	console.print(f"[green]Heurística aplicada. Atualizadas {changed} entradas[/green]")
 
 
+@catalog_cmd.command("migrate")
+@click.option("--to", "backend", type=click.Choice(["sqlite", "json"]), required=True)
+def migrate_cmd(backend: str) -> None:
+	"""Converte o catálogo entre JSON (catalog.json) e SQLite indexado (catalog.db)."""
+	from core.catalog_sqlite import SqliteCatalogStore
+	if backend == "sqlite":
+		if CATALOG_DB.exists():
+			raise click.ClickException(f"{CATALOG_DB} já existe")
+		store = SqliteCatalogStore(CATALOG_DB)
+		count = store.import_json(CATALOG_FILE)
+		store.close()
+		console.print(f"[green]{count} entradas importadas para {CATALOG_DB} (passa a ser o catálogo ativo)[/green]")
+	else:
+		if not CATALOG_DB.exists():
+			raise click.ClickException(f"{CATALOG_DB} não encontrado")
+		store = SqliteCatalogStore(CATALOG_DB)
+		count = store.export_json(CATALOG_FILE)
+		store.close()
+		CATALOG_DB.unlink()
+		console.print(f"[green]{count} entradas exportadas para {CATALOG_FILE} (passa a ser o catálogo ativo)[/green]")
+
+
+@catalog_cmd.command("compact")
+def compact_cmd() -> None:
+	"""Incorpora o journal de mutações ao snapshot do catálogo."""
+	catalog = open_catalog()
+	count = catalog.compact()
+	catalog.close()
+	console.print(f"[green]Catálogo compactado ({count} entradas)[/green]")
@@ -0,0 +1,58 @@
+from pathlib import Path
+from typing import Optional
+import click
+from rich.console import Console
+from core.bundle import KEY_ENV_VAR, BundleError, build_bundle, bundle_path, resolve_key
+from core.envfile import load_env
+from core.template import render_values
+from utils.filesystem import atomic_write
+
+
+console = Console()
+
+# Ambientes em que um bundle em texto claro é aceito sem --allow-plaintext
+PLAINTEXT_ENVIRONMENTS = ("dev", "local", "test")
+
+
+@click.command()
+@click.argument("environment")
+@click.option("--output", type=click.Path(dir_okay=False), help="Destino (padrão: .envsecure/build/<env>.envb)")
+@click.option("--encrypt", is_flag=True, default=False, help=f"Cifrar valores com AES-GCM (chave em --key-file ou ${KEY_ENV_VAR})")
+@click.option("--key-file", type=click.Path(exists=True, dir_okay=False), help="Arquivo com a chave base64 (ver generate-keys)")
+@click.option("--allow-plaintext", is_flag=True, default=False, help="Permitir bundle sem cifra fora de dev/local/test")
+@click.option("--template-defaults", is_flag=True, default=False, help="Usar o valor do template para chaves sem segredo (padrão: vazio)")
+def compile_cmd(
+	environment: str,
+	output: Optional[str],
+	encrypt: bool,
+	key_file: Optional[str],
+	allow_plaintext: bool,
+	template_defaults: bool,
+) -> None:
+	"""Compila template + segredos do ambiente num bundle binário indexado."""
+	if not encrypt and environment not in PLAINTEXT_ENVIRONMENTS:
+		if not allow_plaintext:
+			raise click.ClickException(
+				f"Bundle de {environment} teria os segredos em texto claro: use --encrypt (ou --allow-plaintext)"
+			)
+		console.print(f"[yellow]Aviso: bundle de {environment} sem cifra; segredos ficam em texto claro no disco[/yellow]")
+	base_dir = Path(".envsecure")
+	secrets_path = base_dir / "secrets" / f"secrets.{environment}"
+	template_path = base_dir / "templates" / "app.env.safe"
+	if not secrets_path.exists():
+		raise click.ClickException(f"Segredos não encontrados: {secrets_path}")
+	if not template_path.exists():
+		raise click.ClickException(f"Template não encontrado: {template_path}")
+
+	try:
+		values = render_values(load_env(template_path), load_env(secrets_path), template_defaults)
+		key = resolve_key(key_file) if encrypt else None
+	except (ValueError, BundleError) as e:
+		raise click.ClickException(str(e))
+	if encrypt and key is None:
+		raise click.ClickException(f"--encrypt requer --key-file ou ${KEY_ENV_VAR}")
+
+	out_path = Path(output) if output else bundle_path(environment)
+	out_path.parent.mkdir(parents=True, exist_ok=True)
+	atomic_write(out_path, build_bundle(values, key))
+	console.print(f"[green]Bundle {out_path} gerado ({len(values)} chaves{', cifrado' if key else ''})[/green]")
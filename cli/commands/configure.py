@@ -2,6 +2,7 @@ from pathlib import Path
 from typing import Optional, List
 import click
 from rich.console import Console
+from core.envfile import format_env, load_env
 
 
 console = Console()
@@ -38,30 +39,17 @@ def configure_cmd(environment: str, wizard: bool, from_template: bool, secrets_f
 		if not template_path.exists():
 			raise click.ClickException("Template .env.safe não encontrado. Rode 'envsecure init' primeiro.")
 		# Copia placeholders para um arquivo de segredos para edição
-		content = template_path.read_text()
-		lines = []
-		for line in content.splitlines():
-			if line.strip().startswith("#") or not line.strip():
-				continue
-			name, _, _ = line.partition("=")
-			lines.append(f"{name}=\n")
+		lines = [f"{name}=\n" for name in load_env(template_path)]
 		secrets_path.write_text("\n".join(lines))
 		console.print(f"[green]Gerado {secrets_path} a partir do template[/green]")
 		if autofill_dev:
 			from core.autofill import generate_dev_defaults
-			catalog_path = base_dir / "catalog.json"
-			values = generate_dev_defaults(template_path, catalog_path)
-			existing = secrets_path.read_text().splitlines()
-			merged: dict[str, str] = {}
-			for line in existing:
-				if not line.strip() or line.strip().startswith('#'):
-					continue
-				k, _, v = line.partition('=')
-				merged[k.strip()] = v
+			values = generate_dev_defaults(template_path, base_dir)
+			merged = dict(load_env(secrets_path))
 			for k, v in values.items():
 				if k not in merged or not merged[k]:
 					merged[k] = v
-			secrets_path.write_text("\n".join(f"{k}={v}" for k, v in merged.items()) + "\n")
+			secrets_path.write_text(format_env(merged))
 			console.print(f"[green]Preenchidos valores de desenvolvimento em {secrets_path}[/green]")
 		return
 
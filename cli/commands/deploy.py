@@ -1,8 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
 import shutil
-from typing import Optional, Dict
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 import click
 from rich.console import Console
+from rich.table import Table
+from core.deploy_manifest import DeployManifest, content_digest
+from core.envfile import format_env, load_env
+from core.scan_cache import file_digest
+from core.template import render_values
+from utils.ssh import CHECK_MODES, DEFAULT_TIMEOUT, Transfer, TransferResult, fan_out, parse_target
 
 
 console = Console()
@@ -14,57 +23,349 @@ def _backup_file(target: Path) -> None:
 		shutil.copy2(target, backup)
 
 
-@click.command()
-@click.argument("environment")
-@click.option("--local", is_flag=True, help="Deploy local em arquivo .env")
-@click.option("--ssh", "ssh_target", help="user@host:/path")
-@click.option("--key", "key_file", help="Arquivo de chave SSH")
-@click.option("--validate-first", is_flag=True, default=False)
-def deploy_cmd(environment: str, local: bool, ssh_target: Optional[str], key_file: Optional[str], validate_first: bool) -> None:
-	"""Realiza deploy seguro dos segredos e arquivos de env."""
-	base_dir = Path(".envsecure")
-	secrets_path = base_dir / "secrets" / f"secrets.{environment}"
-	template_path = base_dir / "templates" / "app.env.safe"
-	output_env = base_dir / f".env.{environment}"
+@dataclass(frozen=True)
+class RenderOptions:
+	base_dir: Path = Path(".envsecure")
+	validate_first: bool = False
+	from_bundle: bool = False
+	bundle_key_file: Optional[str] = None
+	force: bool = False
+	# Usar padrões literais do template para chaves sem segredo (ver core.template.render_values)
+	template_defaults: bool = False
+
+
+@dataclass
+class Template:
+	"""Template analisado uma vez por execução, com o hash do arquivo para o manifest."""
+
+	values: Optional[Mapping[str, str]]
+	digest: Optional[str]
+
+
+@dataclass
+class DeployResult:
+	environment: str
+	output: Optional[Path]
+	seconds: float
+	error: Optional[str] = None
+	skipped: bool = False
+	entry: Optional[Dict[str, Any]] = None
+
+
+def _local_target(output_env: Path) -> str:
+	return f"local:{output_env}"
+
+
+def _inputs(environment: str, template: Template, options: RenderOptions) -> Dict[str, str]:
+	"""Hashes das entradas do render; iguais ao manifest => saída igual à do último deploy."""
+	if options.from_bundle:
+		from core.bundle import bundle_path
+		path = bundle_path(environment, options.base_dir / "build")
+		return {"bundle": file_digest(str(path))} if path.exists() else {}
+	secrets_path = options.base_dir / "secrets" / f"secrets.{environment}"
+	if not secrets_path.exists() or template.digest is None:
+		return {}
+	return {"template": template.digest, "secrets": file_digest(str(secrets_path)), "template_defaults": options.template_defaults}
 
-	if validate_first:
-		from cli.commands.validate import _validate_files
-		_validate_files(template_path, secrets_path)
 
-	if not secrets_path.exists():
-		raise click.ClickException(f"Segredos não encontrados: {secrets_path}")
+def _output_digest(output_env: Path) -> Optional[str]:
+	return file_digest(str(output_env)) if output_env.exists() else None
+
+
+def _render_env(
+	environment: str,
+	template: Template,
+	options: RenderOptions,
+	previous: Optional[Dict[str, Any]] = None,
+) -> Tuple[Path, Dict[str, Any], bool]:
+	"""Gera .envsecure/.env.<env>; retorna (saída, entrada do manifest, pulado).
+
+	Nada é renderizado, copiado para .bak ou regravado quando as entradas e a saída em disco
+	batem com o manifest, nem quando o conteúdo renderizado é idêntico ao arquivo atual.
+	"""
+	secrets_path = options.base_dir / "secrets" / f"secrets.{environment}"
+	output_env = options.base_dir / f".env.{environment}"
+	inputs = _inputs(environment, template, options)
+	if (
+		not options.force
+		and not options.validate_first
+		and previous is not None
+		and inputs
+		and all(previous.get(k) == v for k, v in inputs.items())
+		and _output_digest(output_env) == previous.get("output")
+	):
+		return output_env, previous, True
+
+	if options.from_bundle:
+		from cli.commands.validate import _open_bundle, _validate_mappings
+		with _open_bundle(environment, options.bundle_key_file) as bundle:
+			if options.validate_first:
+				_validate_mappings(dict.fromkeys(bundle, ""), bundle)
+			content = format_env(bundle)
+	else:
+		if template.values is None:
+			raise click.ClickException(f"Template não encontrado: {options.base_dir / 'templates' / 'app.env.safe'}")
+		if not secrets_path.exists():
+			raise click.ClickException(f"Segredos não encontrados: {secrets_path}")
+		try:
+			secrets = load_env(secrets_path)
+		except ValueError as e:
+			raise click.ClickException(str(e))
+		if options.validate_first:
+			from cli.commands.validate import _validate_mappings
+			_validate_mappings(template.values, secrets)
+
+		# Mantém chaves do template e substitui por valores de secrets (com ${VAR} resolvidos)
+		try:
+			content = format_env(render_values(template.values, secrets, options.template_defaults))
+		except ValueError as e:
+			raise click.ClickException(str(e))
+
+	data = content.encode("utf-8")
+	entry = dict(inputs, output=content_digest(data))
+	if not options.force and _output_digest(output_env) == entry["output"]:
+		return output_env, entry, True
+	_backup_file(output_env)
+	output_env.write_bytes(data)
+	return output_env, entry, False
+
+
+def _load_template(options: RenderOptions) -> Template:
+	if options.from_bundle:
+		return Template(None, None)
+	template_path = options.base_dir / "templates" / "app.env.safe"
 	if not template_path.exists():
 		raise click.ClickException(f"Template não encontrado: {template_path}")
+	try:
+		return Template(load_env(template_path), file_digest(str(template_path)))
+	except ValueError as e:
+		raise click.ClickException(str(e))
 
-	# Substituição simples: mantém chaves do template e substitui por valores de secrets
-	variables: Dict[str, str] = {}
-	for line in secrets_path.read_text().splitlines():
-		if not line.strip() or line.strip().startswith('#'):
-			continue
-		name, _, value = line.partition("=")
-		variables[name.strip()] = value.strip()
 
-	content = []
-	for line in template_path.read_text().splitlines():
-		if not line.strip() or line.strip().startswith('#'):
+def _discover_envs(options: RenderOptions) -> List[str]:
+	if options.from_bundle:
+		from core.bundle import BUNDLE_DIR
+		return sorted(p.stem for p in (options.base_dir / BUNDLE_DIR.name).glob("*.envb"))
+	names = []
+	for path in (options.base_dir / "secrets").glob("secrets.*"):
+		env = path.name[len("secrets."):]
+		if env and not env.endswith((".bak", ".tmp")):
+			names.append(env)
+	return sorted(names)
+
+
+def _deploy_one(environment: str, template: Template, options: RenderOptions, manifest: DeployManifest) -> DeployResult:
+	start = time.perf_counter()
+	output_env = options.base_dir / f".env.{environment}"
+	try:
+		output, entry, skipped = _render_env(environment, template, options, manifest.get(environment, _local_target(output_env)))
+	except click.ClickException as e:
+		return DeployResult(environment, None, time.perf_counter() - start, e.message)
+	except Exception as e:  # um ambiente com problema não interrompe os demais
+		return DeployResult(environment, None, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+	return DeployResult(environment, output, time.perf_counter() - start, skipped=skipped, entry=entry)
+
+
+def _record(manifest: DeployManifest, results: List[DeployResult]) -> None:
+	# Só a thread principal escreve no manifest
+	for result in results:
+		if result.entry is not None and result.output is not None:
+			manifest.update(result.environment, _local_target(result.output), result.entry)
+	manifest.save()
+
+
+def _deploy_many(environments: List[str], options: RenderOptions, jobs: int) -> List[DeployResult]:
+	template = _load_template(options)
+	manifest = DeployManifest(options.base_dir / "deploy_manifest.json").load()
+	with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(environments)))) as pool:
+		results = list(pool.map(lambda env: _deploy_one(env, template, options, manifest), environments))
+	_record(manifest, results)
+	return results
+
+
+def _ssh_target(transfer: Transfer) -> str:
+	return f"ssh:{transfer.target}"
+
+
+def _ship(
+	results: List[DeployResult],
+	specs: Tuple[str, ...],
+	key_file: Optional[str],
+	timeout: float,
+	jobs: int,
+	options: RenderOptions,
+	check: str = "stat",
+) -> List[Tuple[str, Transfer, Optional[TransferResult]]]:
+	"""Envia cada .env gerado para cada alvo SSH (`{env}` no caminho vira o ambiente).
+
+	`check` decide o que não precisa ser reenviado: "none" confia só no manifest (sem I/O
+	remoto), "stat" compara tamanho/mtime remotos com os registrados no último envio e "hash"
+	compara o `sha256sum` remoto com o hash da saída. Os envios seguem em paralelo por host
+	(`fan_out`), com escrita atômica no destino. Retorna (ambiente, transferência, resultado
+	ou None se pulada pelo manifest).
+	"""
+	manifest = DeployManifest(options.base_dir / "deploy_manifest.json").load()
+	if options.force:
+		check = "none"
+	planned: List[Tuple[str, Transfer, Dict[str, Any]]] = []
+	pending: List[Tuple[str, Transfer, Dict[str, Any]]] = []
+	for result in results:
+		if result.error is not None or result.output is None or result.entry is None:
 			continue
-		name, sep, _ = line.partition("=")
-		value = variables.get(name.strip(), "")
-		content.append(f"{name}{sep}{value}")
+		output = result.entry["output"]
+		size = result.output.stat().st_size
+		for spec in specs:
+			config, remote_path = parse_target(spec.replace("{env}", result.environment), key_file, timeout)
+			transfer = Transfer(config, str(result.output), remote_path, output, size)
+			previous = manifest.get(result.environment, _ssh_target(transfer)) or {}
+			same_output = previous.get("output") == output
+			if same_output and "remote_size" in previous:
+				transfer = replace(transfer, expected=(previous["remote_size"], previous["remote_mtime"]))
+			planned.append((result.environment, transfer, result.entry))
+			if options.force or check != "none" or not same_output:
+				pending.append(planned[-1])
 
-	_backup_file(output_env)
-	output_env.write_text("\n".join(content) + "\n")
-	console.print(f"[green]Gerado {output_env}[/green]")
+	done = fan_out([transfer for _, transfer, _ in pending], max_workers=jobs, check=check)
+	by_transfer = {id(r.transfer): r for r in done}
+	for (env, transfer, entry), outcome in zip(pending, done):
+		if outcome.error is None:
+			record: Dict[str, Any] = {"output": entry["output"]}
+			if outcome.remote is not None:
+				record.update(remote_size=outcome.remote[0], remote_mtime=outcome.remote[1])
+			manifest.update(env, _ssh_target(transfer), record)
+	manifest.save()
+	return [(env, transfer, by_transfer.get(id(transfer))) for env, transfer, _ in planned]
+
+
+def _print_transfers(shipped: List[Tuple[str, Transfer, Optional[TransferResult]]]) -> None:
+	table = Table(title="Envio SSH")
+	table.add_column("Ambiente")
+	table.add_column("Destino")
+	table.add_column("Status")
+	table.add_column("Tempo (ms)", justify="right")
+	table.add_column("Erro")
+	for env, transfer, outcome in shipped:
+		if outcome is None:
+			table.add_row(env, transfer.target, "[cyan]inalterado[/cyan]", "-", "")
+		elif outcome.skipped:
+			table.add_row(env, transfer.target, "[cyan]inalterado[/cyan]", f"{outcome.seconds * 1000:.1f}", "")
+		elif outcome.error is not None:
+			table.add_row(env, transfer.target, "[red]falhou[/red]", f"{outcome.seconds * 1000:.1f}", outcome.error)
+		else:
+			table.add_row(env, transfer.target, "[green]ok[/green]", f"{outcome.seconds * 1000:.1f}", "")
+	console.print(table)
+
+
+def _print_results(results: List[DeployResult]) -> None:
+	table = Table(title="Deploy por ambiente")
+	table.add_column("Ambiente")
+	table.add_column("Status")
+	table.add_column("Tempo (ms)", justify="right")
+	table.add_column("Saída / erro")
+	for result in results:
+		if result.error is not None:
+			status = "[red]falhou[/red]"
+		else:
+			status = "[cyan]inalterado[/cyan]" if result.skipped else "[green]ok[/green]"
+		table.add_row(result.environment, status, f"{result.seconds * 1000:.1f}", str(result.output) if result.error is None else result.error)
+	console.print(table)
+
+
+@click.command()
+@click.argument("environment", required=False)
+@click.option("--envs", help="Lista de ambientes separados por vírgula (ex: prod,staging,preview)")
+@click.option("--all-envs", is_flag=True, default=False, help="Todos os ambientes com secrets.<env> (ou bundle, com --from-bundle)")
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=8, show_default=True, help="Ambientes renderizados (e hosts SSH atendidos) em paralelo")
+@click.option("--local", is_flag=True, help="Deploy local em arquivo .env")
+@click.option("--ssh", "ssh_targets", multiple=True, help="user@host[:porta]:/path (repetível; {env} no caminho vira o ambiente)")
+@click.option("--key", "key_file", help="Arquivo de chave SSH")
+@click.option("--ssh-timeout", type=click.FloatRange(min=0.1), default=DEFAULT_TIMEOUT, show_default=True, help="Timeout (s) de conexão e operações por host")
+@click.option(
+	"--remote-check",
+	type=click.Choice(CHECK_MODES),
+	default="stat",
+	show_default=True,
+	help="Antes de enviar: none (só o manifest), stat (tamanho/mtime remotos) ou hash (sha256sum remoto)",
+)
+@click.option("--validate-first", is_flag=True, default=False)
+@click.option("--from-bundle", is_flag=True, default=False, help="Usar o bundle compilado (envsecure compile) em vez de template + segredos")
+@click.option("--bundle-key-file", type=click.Path(exists=True, dir_okay=False), help="Chave do bundle cifrado")
+@click.option("--force", is_flag=True, default=False, help="Regravar mesmo sem mudanças (ignora o manifest de deploy)")
+@click.option("--template-defaults", is_flag=True, default=False, help="Usar o valor do template para chaves sem segredo (padrão: vazio)")
+def deploy_cmd(
+	environment: Optional[str],
+	envs: Optional[str],
+	all_envs: bool,
+	jobs: int,
+	local: bool,
+	ssh_targets: Tuple[str, ...],
+	key_file: Optional[str],
+	ssh_timeout: float,
+	remote_check: str,
+	validate_first: bool,
+	from_bundle: bool,
+	bundle_key_file: Optional[str],
+	force: bool,
+	template_defaults: bool,
+) -> None:
+	"""Realiza deploy seguro dos segredos e arquivos de env."""
+	options = RenderOptions(
+		validate_first=validate_first,
+		from_bundle=from_bundle,
+		bundle_key_file=bundle_key_file,
+		force=force,
+		template_defaults=template_defaults,
+	)
+	for spec in ssh_targets:
+		try:
+			parse_target(spec)
+		except ValueError as e:
+			raise click.BadParameter(str(e), param_hint="--ssh")
+
+	if envs or all_envs:
+		if environment:
+			raise click.UsageError("Use ENVIRONMENT ou --envs/--all-envs, não ambos")
+		if any("{env}" not in spec for spec in ssh_targets):
+			raise click.UsageError("Com vários ambientes, use {env} no caminho de --ssh (ex: deploy@web1:/srv/{env}/.env)")
+		environments = _discover_envs(options) if all_envs else [e.strip() for e in envs.split(",") if e.strip()]
+		if not environments:
+			raise click.ClickException("Nenhum ambiente encontrado")
+		results = _deploy_many(list(dict.fromkeys(environments)), options, jobs)
+		_print_results(results)
+		failed = [r.environment for r in results if r.error is not None]
+		unsent: List[str] = []
+		if ssh_targets:
+			shipped = _ship(results, ssh_targets, key_file, ssh_timeout, jobs, options, remote_check)
+			_print_transfers(shipped)
+			unsent = [t.target for _, t, outcome in shipped if outcome is not None and outcome.error is not None]
+		if failed:
+			raise click.ClickException(f"{len(failed)} de {len(results)} ambientes falharam: {', '.join(failed)}")
+		if unsent:
+			raise click.ClickException(f"Falha no envio para: {', '.join(unsent)}")
+		return
+
+	if not environment:
+		raise click.UsageError("Informe ENVIRONMENT, --envs ou --all-envs")
+
+	result = _deploy_many([environment], options, jobs=1)[0]
+	if result.error is not None:
+		raise click.ClickException(result.error)
+	output_env = result.output
+	if result.skipped:
+		console.print(f"[cyan]Sem alterações em {output_env} (use --force para regravar)[/cyan]")
+	else:
+		console.print(f"[green]Gerado {output_env}[/green]")
 
 	if local:
 		console.print("[green]Deploy local concluído.[/green]")
 		return
 
-	if ssh_target:
-		# Deploy via SSH (placeholder minimal); implementação completa em utils/ssh futuramente
-		console.print(f"[yellow]Enviar {output_env} para {ssh_target} usando {key_file or 'agent'} (não implementado).[/yellow]")
+	if ssh_targets:
+		shipped = _ship([result], ssh_targets, key_file, ssh_timeout, jobs, options, remote_check)
+		_print_transfers(shipped)
+		failed = [t.target for _, t, outcome in shipped if outcome is not None and outcome.error is not None]
+		if failed:
+			raise click.ClickException(f"Falha no envio para: {', '.join(failed)}")
 		return
 
 	console.print("[yellow]Nenhum alvo especificado. Use --local ou --ssh.[/yellow]")
-
-
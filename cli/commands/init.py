@@ -23,7 +23,7 @@ def init_cmd(project_name: str, envs: str) -> None:
 	# .gitignore seguro
 	gitignore_path = base_dir / ".gitignore"
 	if not gitignore_path.exists():
-		gitignore_path.write_text("secrets.*\n*.env\n*.env.*\n.tmp/\n")
+		gitignore_path.write_text("secrets.*\n*.env\n*.env.*\n.tmp/\nbuild/\n")
 
 	# Template base
 	(templates_dir / "app.env.safe").write_text(
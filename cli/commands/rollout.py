@@ -0,0 +1,149 @@
+import asyncio
+from pathlib import Path
+import statistics
+from typing import Dict, List, Optional, Tuple
+import click
+from rich.console import Console
+from rich.table import Table
+from cli.commands.deploy import RenderOptions, _deploy_many
+from core.deploy_manifest import DeployManifest
+from core.rollout import (
+	HostResult,
+	Rollout,
+	RolloutError,
+	RolloutOptions,
+	RolloutReport,
+	STATE_DIR,
+	command_health_check,
+	load_targets,
+	target_from_spec,
+)
+from models.environment import DeployTarget
+from utils.ssh import CHECK_MODES, DEFAULT_TIMEOUT, RemoteStat
+
+
+console = Console()
+
+
+def _targets(environment: str, hosts_file: Optional[str], specs: Tuple[str, ...], key_file: Optional[str]) -> List[DeployTarget]:
+	try:
+		targets = load_targets(Path(hosts_file), key_file) if hosts_file else []
+		targets += [target_from_spec(spec.replace("{env}", environment), key_file) for spec in specs]
+	except ValueError as e:
+		raise click.BadParameter(str(e), param_hint="--hosts/--ssh")
+	if not targets:
+		raise click.UsageError("Informe os alvos com --hosts ARQUIVO ou --ssh user@host:/path")
+	return targets
+
+
+def _expected(manifest: DeployManifest, environment: str, output: str) -> Dict[str, RemoteStat]:
+	# Stat remoto só vale se o manifest registra o mesmo conteúdo que será enviado
+	prefix = f"{environment}|"
+	expected = {}
+	for key, entry in manifest.entries.items():
+		if key.startswith(prefix) and entry.get("output") == output and "remote_size" in entry:
+			expected[key[len(prefix):]] = (entry["remote_size"], entry["remote_mtime"])
+	return expected
+
+
+def _record(manifest: DeployManifest, environment: str, output: str, results: List[HostResult]) -> None:
+	for result in results:
+		if result.error is None:
+			entry = {"output": output}
+			if result.remote_size is not None:
+				entry.update(remote_size=result.remote_size, remote_mtime=result.remote_mtime)
+			manifest.update(environment, result.target, entry)
+	manifest.save()
+
+
+def _print_report(report: RolloutReport) -> None:
+	table = Table(title="Rollout por alvo")
+	table.add_column("Lote", justify="right")
+	table.add_column("Alvo")
+	table.add_column("Status")
+	table.add_column("Latência (ms)", justify="right")
+	table.add_column("Erro")
+	for r in report.results:
+		if r.error is not None:
+			status = "[red]falhou[/red]"
+		else:
+			status = "[cyan]inalterado[/cyan]" if r.skipped else "[green]ok[/green]"
+		table.add_row(str(r.batch + 1), r.target, status, f"{r.seconds * 1000:.1f}", r.error or "")
+	console.print(table)
+	latencies = sorted(r.seconds * 1000 for r in report.results)
+	if latencies:
+		p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+		console.print(f"Lotes: {report.completed}/{report.batches}  latência p50 {statistics.median(latencies):.1f} ms, p95 {p95:.1f} ms, máx {latencies[-1]:.1f} ms")
+
+
+@click.command()
+@click.argument("environment")
+@click.option("--hosts", "hosts_file", type=click.Path(exists=True, dir_okay=False), help="Arquivo com um alvo por linha (user@host[:porta]:/path ou local:<caminho>)")
+@click.option("--ssh", "ssh_targets", multiple=True, help="Alvo adicional user@host[:porta]:/path (repetível; {env} vira o ambiente)")
+@click.option("--key", "key_file", help="Arquivo de chave SSH")
+@click.option("--batch-size", default="10%", show_default=True, help="Alvos por lote: número (10) ou fração da frota (25%)")
+@click.option("--max-in-flight", type=click.IntRange(min=1), default=8, show_default=True, help="Conexões simultâneas por lote")
+@click.option("--pause", type=click.FloatRange(min=0), default=0.0, show_default=True, help="Pausa (s) entre lotes")
+@click.option("--health-check", "health_cmd", help="Comando local rodado após cada lote; código != 0 aborta o rollout")
+@click.option("--health-timeout", type=click.FloatRange(min=0.1), help="Timeout (s) do health check")
+@click.option("--abort-ratio", type=click.FloatRange(0, 1), default=0.0, show_default=True, help="Aborta quando a fração de alvos com falha passa deste valor")
+@click.option("--resume", is_flag=True, default=False, help="Continua do primeiro lote não concluído do último rollout abortado")
+@click.option("--remote-check", type=click.Choice(CHECK_MODES), default="stat", show_default=True, help="Verificação remota antes de enviar (ver deploy)")
+@click.option("--ssh-timeout", type=click.FloatRange(min=0.1), default=DEFAULT_TIMEOUT, show_default=True, help="Timeout (s) de conexão e operações por host")
+@click.option("--validate-first", is_flag=True, default=False)
+@click.option("--from-bundle", is_flag=True, default=False, help="Usar o bundle compilado (envsecure compile) em vez de template + segredos")
+@click.option("--bundle-key-file", type=click.Path(exists=True, dir_okay=False), help="Chave do bundle cifrado")
+@click.option("--template-defaults", is_flag=True, default=False, help="Usar o valor do template para chaves sem segredo (padrão: vazio)")
+def rollout_cmd(
+	environment: str,
+	hosts_file: Optional[str],
+	ssh_targets: Tuple[str, ...],
+	key_file: Optional[str],
+	batch_size: str,
+	max_in_flight: int,
+	pause: float,
+	health_cmd: Optional[str],
+	health_timeout: Optional[float],
+	abort_ratio: float,
+	resume: bool,
+	remote_check: str,
+	ssh_timeout: float,
+	validate_first: bool,
+	from_bundle: bool,
+	bundle_key_file: Optional[str],
+	template_defaults: bool,
+) -> None:
+	"""Deploy gradual do .env de um ambiente para uma frota, em lotes com health check."""
+	targets = _targets(environment, hosts_file, ssh_targets, key_file)
+	render = RenderOptions(
+		validate_first=validate_first,
+		from_bundle=from_bundle,
+		bundle_key_file=bundle_key_file,
+		template_defaults=template_defaults,
+	)
+	result = _deploy_many([environment], render, jobs=1)[0]
+	if result.error is not None or result.output is None or result.entry is None:
+		raise click.ClickException(result.error or f"Falha ao gerar o .env de {environment}")
+
+	output = result.entry["output"]
+	manifest = DeployManifest(render.base_dir / "deploy_manifest.json").load()
+	options = RolloutOptions(batch_size, max_in_flight, pause, abort_ratio, remote_check, ssh_timeout)
+	state_path = render.base_dir / STATE_DIR.name / f"{environment}.json"
+	try:
+		rollout = Rollout(
+			targets,
+			result.output,
+			options,
+			health_check=command_health_check(health_cmd, health_timeout) if health_cmd else None,
+			state_path=state_path,
+			expected=_expected(manifest, environment, output),
+		)
+		report = asyncio.run(rollout.run(resume=resume))
+	except RolloutError as e:
+		raise click.ClickException(str(e))
+
+	_record(manifest, environment, output, report.results)
+	_print_report(report)
+	if report.aborted:
+		raise click.ClickException(f"Rollout abortado: {report.aborted}. Corrija e rode de novo com --resume (estado em {state_path})")
+	console.print(f"[green]Rollout de {environment} concluído em {report.batches} lote(s).[/green]")
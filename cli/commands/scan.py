@@ -1,83 +1,498 @@
 from pathlib import Path
-import re
+import fnmatch
 import json
 import os
-import fnmatch
-from typing import Set, Dict, List, Optional
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from dataclasses import dataclass
+from typing import Any, Set, Dict, List, Optional, Iterable, Iterator, Tuple, Deque
 import click
 from rich.console import Console
+from core.scanner import DEFAULT_EXCLUDES, DEFAULT_GLOBS, NDJSON_SUFFIXES, iter_files, load_scan, merge_scan, scan_file, scan_file_lines, select_files
+from core.scan_cache import ScanCache, entry_found, file_digest, make_entry, matches_stat
+from core.scan_index import INDEX_FILE, ScanIndex
+from utils.filesystem import atomic_write
+from utils.git import changed_files
+from utils.watch import create_watcher
 
 
 console = Console()
+# Mensagens de progresso vão para stderr para não misturar com saída em stdout
+err_console = Console(stderr=True)
+
+
+def _scan_file(file_path: Path, max_file_size: Optional[int] = None) -> Set[str]:
+	return scan_file(file_path, max_file_size)
+
+
+# Quantidade de arquivos enviada a cada worker por tarefa
+BATCH_SIZE = 256
+
+# (caminho, entrada do cache) enviado ao worker; (caminho, variáveis, nova entrada) devolvido.
+# As variáveis de cada arquivo vêm ordenadas, mapeadas para suas linhas (vazias sem --index).
+ScanItem = Tuple[str, Optional[Dict[str, Any]]]
+Found = Dict[str, List[int]]
+ScanResult = Tuple[str, Found, Optional[Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class ScanOptions:
+	use_cache: bool = False
+	verify_hash: bool = False
+	max_file_size: Optional[int] = None
+	with_lines: bool = False
+
+
+def _scan_path(path: str, options: ScanOptions) -> Found:
+	if options.with_lines:
+		return dict(sorted(scan_file_lines(Path(path), options.max_file_size).items()))
+	return {name: [] for name in sorted(_scan_file(Path(path), options.max_file_size))}
+
+
+def _usable(entry: Dict[str, Any], options: ScanOptions) -> bool:
+	# Entradas gravadas sem linhas não servem quando o índice precisa delas
+	return not options.with_lines or "lines" in entry
+
+
+def _scan_one(path: str, cached: Optional[Dict[str, Any]], options: ScanOptions) -> Tuple[Found, Optional[Dict[str, Any]]]:
+	if not options.use_cache:
+		return _scan_path(path, options), None
+	st = os.stat(path)
+	if options.max_file_size is not None and st.st_size > options.max_file_size:
+		# Limite vale antes do cache: um arquivo já cacheado que passou do limite é ignorado.
+		# Não entra no cache para ser reavaliado se o limite mudar
+		return {}, None
+	if cached is not None and matches_stat(cached, st) and _usable(cached, options):
+		return entry_found(cached), cached
+	digest = file_digest(path) if options.verify_hash else None
+	if cached is not None and digest is not None and cached.get("sha256") == digest and _usable(cached, options):
+		# Conteúdo idêntico (ex.: checkout novo no CI): reaproveita o resultado
+		found = entry_found(cached)
+	else:
+		found = _scan_path(path, options)
+	return found, make_entry(st, found, digest, options.with_lines)
+
+
+def _scan_batch(items: List[ScanItem], options: ScanOptions = ScanOptions()) -> List[ScanResult]:
+	results: List[ScanResult] = []
+	for path, cached in items:
+		try:
+			found, entry = _scan_one(path, cached, options)
+		except OSError:
+			# Ignora arquivos inacessíveis
+			continue
+		results.append((path, found, entry))
+	return results
+
+
+def _batched(paths: Iterable[Path], size: int, cache: Optional[ScanCache]) -> Iterator[List[ScanItem]]:
+	batch: List[ScanItem] = []
+	for path in paths:
+		key = str(path)
+		batch.append((key, cache.get(key) if cache is not None else None))
+		if len(batch) >= size:
+			yield batch
+			batch = []
+	if batch:
+		yield batch
+
+
+def _scan_parallel(batches: Iterable[List[ScanItem]], jobs: int, options: ScanOptions) -> Iterator[ScanResult]:
+	"""Distribui lotes de arquivos entre processos, preservando a ordem da caminhada."""
+	with ProcessPoolExecutor(max_workers=jobs) as pool:
+		pending: Deque["Future[List[ScanResult]]"] = deque()
+		for batch in batches:
+			pending.append(pool.submit(_scan_batch, batch, options))
+			# Janela limitada de lotes em voo para não acumular a árvore inteira em memória
+			if len(pending) >= jobs * 2:
+				yield from pending.popleft().result()
+		while pending:
+			yield from pending.popleft().result()
+
+
+def _scan_tree(
+	path: Path,
+	extensions: List[str],
+	excluded_dirs: Set[str],
+	jobs: int = 1,
+	cache: Optional[ScanCache] = None,
+	verify_hash: bool = False,
+	max_file_size: Optional[int] = None,
+	index: Optional[ScanIndex] = None,
+) -> Dict[str, List[str]]:
+	files = iter_files(path, extensions, excluded_dirs)
+	return _scan_files(files, jobs, cache, verify_hash, max_file_size, index, prune_root=path)
+
+
+def _scan_files(
+	files: Iterable[Path],
+	jobs: int = 1,
+	cache: Optional[ScanCache] = None,
+	verify_hash: bool = False,
+	max_file_size: Optional[int] = None,
+	index: Optional[ScanIndex] = None,
+	prune_root: Optional[Path] = None,
+) -> Dict[str, List[str]]:
+	variables: Dict[str, List[str]] = {}
+	for file_path, found in _iter_results(files, jobs, cache, verify_hash, max_file_size, index, prune_root):
+		for var in found:
+			variables.setdefault(var, []).append(file_path)
+	return variables
+
+
+def _iter_results(
+	files: Iterable[Path],
+	jobs: int = 1,
+	cache: Optional[ScanCache] = None,
+	verify_hash: bool = False,
+	max_file_size: Optional[int] = None,
+	index: Optional[ScanIndex] = None,
+	prune_root: Optional[Path] = None,
+) -> Iterator[Tuple[str, Found]]:
+	"""Resultado por arquivo, na ordem da caminhada, à medida que fica pronto.
+
+	`prune_root`: raiz de uma caminhada completa; entradas do cache sob ela que não foram
+	vistas são descartadas (as de outras raízes ficam intactas).
+	"""
+	options = ScanOptions(
+		use_cache=cache is not None,
+		verify_hash=verify_hash,
+		max_file_size=max_file_size,
+		with_lines=index is not None,
+	)
+	batches = _batched(files, BATCH_SIZE, cache)
+	if jobs > 1:
+		results: Iterable[ScanResult] = _scan_parallel(batches, jobs, options)
+	else:
+		results = (item for batch in batches for item in _scan_batch(batch, options))
+	seen: List[str] = []
+	for file_path, found, entry in results:
+		if cache is not None and entry is not None:
+			cache.update(file_path, entry)
+			seen.append(file_path)
+		if index is not None:
+			index.update_file(file_path, found)
+		yield file_path, found
+	if cache is not None and prune_root is not None:
+		# Só um scan completo sabe quais arquivos deixaram de existir, e só sob a sua raiz
+		cache.prune(seen, prune_root)
+
+
+def _scan_since(
+	path: Path,
+	since: str,
+	previous: Dict[str, List[str]],
+	extensions: List[str],
+	excluded_dirs: Set[str],
+	**scan_kwargs: Any,
+) -> Dict[str, List[str]]:
+	try:
+		changed, deleted = changed_files(path, since)
+	except RuntimeError as e:
+		raise click.ClickException(f"Falha ao consultar o git: {e}")
+	stale = {str(path / rel) for rel in changed + deleted}
+	# Arquivos não rastreados que sumiram não aparecem no diff
+	stale.update(f for files in previous.values() for f in files if not os.path.exists(f))
+	index: Optional[ScanIndex] = scan_kwargs.get("index")
+	if index is not None:
+		for stale_path in stale:
+			index.remove_file(stale_path)
+	updates = _scan_files(select_files(path, changed, extensions, excluded_dirs), **scan_kwargs)
+	console.print(f"[cyan]{len(changed)} arquivos alterados e {len(deleted)} removidos desde {since}[/cyan]")
+	return merge_scan(previous, stale, updates)
+
+
+def _parse_size(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[int]:
+	if not value:
+		return None
+	units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+	text = value.strip().upper().rstrip("B")
+	try:
+		if text and text[-1] in units:
+			return int(float(text[:-1]) * units[text[-1]])
+		return int(text)
+	except ValueError:
+		raise click.BadParameter("use bytes ou sufixos K/M/G (ex.: 50M)")
 
 
-PATTERNS = [
-	re.compile(r"os\.getenv\(['\"]([A-Z0-9_]+)['\"]\)"),
-	re.compile(r"\$\{?([A-Z0-9_]+)\}?"),
-	re.compile(r"ENV\s+([A-Z][A-Z0-9_]+)"),
-]
+def _output_format(fmt: str, output: Optional[str]) -> str:
+	if fmt != "auto":
+		return fmt
+	if not output:
+		return "rich"
+	suffix = Path(output).suffix.lower()
+	if suffix == ".json":
+		return "json"
+	if suffix in NDJSON_SUFFIXES:
+		return "ndjson"
+	return "csv"
 
-ENV_VAR_RE = re.compile(r"^[A-Z][A-Z0-9_]*$")
 
+def _ndjson_lines(hits: Iterable[Tuple[str, str]]) -> Iterator[str]:
+	for name, file in hits:
+		yield json.dumps({"name": name, "file": file}, ensure_ascii=False) + "\n"
 
-def _scan_file(file_path: Path) -> Set[str]:
-	content = file_path.read_text(errors="ignore")
-	found: Set[str] = set()
-	for pattern in PATTERNS:
-		for match in pattern.findall(content):
-			if isinstance(match, tuple):
-				match = match[0]
-			name = str(match)
-			if ENV_VAR_RE.match(name):
-				found.add(name)
-	return found
+
+def _write_output(variables: Dict[str, List[str]], out_path: Path, fmt: str = "json") -> None:
+	if fmt == "json":
+		atomic_write(out_path, json.dumps(variables, indent=2, ensure_ascii=False), mode=None)
+	elif fmt == "ndjson":
+		hits = ((name, file) for name, files in variables.items() for file in files)
+		atomic_write(out_path, "".join(_ndjson_lines(hits)), mode=None)
+	else:
+		# CSV simples: VAR;path1,path2
+		lines = ["name;detected_in"]
+		for name, files in sorted(variables.items()):
+			lines.append(f"{name};{','.join(files)}")
+		atomic_write(out_path, "\n".join(lines), mode=None)
+
+
+def _stream_ndjson(results: Iterable[Tuple[str, Found]], output: Optional[str]) -> int:
+	"""Grava um registro por (variável, arquivo) assim que cada arquivo é escaneado."""
+	names: Set[str] = set()
+
+	def hits() -> Iterator[Tuple[str, str]]:
+		for file_path, found in results:
+			names.update(found)
+			for name in found:
+				yield name, file_path
+
+	if not output:
+		for line in _ndjson_lines(hits()):
+			sys.stdout.write(line)
+		sys.stdout.flush()
+		return len(names)
+	out_path = Path(output)
+	tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+	with open(tmp, "w", encoding="utf-8") as fh:
+		fh.writelines(_ndjson_lines(hits()))
+	os.replace(tmp, out_path)
+	return len(names)
+
+
+def _watch(
+	path: Path,
+	extensions: List[str],
+	excluded_dirs: Set[str],
+	variables: Dict[str, List[str]],
+	output: Optional[str],
+	max_file_size: Optional[int],
+	debounce: float,
+	poll: bool,
+	import_catalog: bool,
+	index: Optional[ScanIndex] = None,
+	fmt: str = "json",
+	auto_categorize: bool = False,
+) -> None:
+	persist_index = index is not None
+	if index is None:
+		index = ScanIndex.from_variables(variables)
+	options = ScanOptions(max_file_size=max_file_size, with_lines=persist_index)
+	watcher = create_watcher(
+		path, excluded_dirs, lambda: iter_files(path, extensions, excluded_dirs), force_polling=poll
+	)
+	console.print(f"[cyan]Observando {path} ({type(watcher).__name__}). Ctrl+C para sair.[/cyan]")
+	# A própria saída (e seu temporário) não deve realimentar o watch
+	ignored = {os.path.abspath(output), os.path.abspath(output) + ".tmp"} if output else set()
+	pending: Set[str] = set()
+	last_event = 0.0
+	try:
+		while True:
+			changed = {p for p in watcher.poll(debounce or 0.1) if os.path.abspath(p) not in ignored}
+			if changed:
+				pending.update(str(Path(p)) for p in changed)
+				last_event = time.monotonic()
+				continue
+			if not pending or time.monotonic() - last_event < debounce:
+				continue
+			touched = _apply_changes(path, extensions, excluded_dirs, index, pending, options)
+			pending.clear()
+			if not touched:
+				continue
+			updated = index.to_variables()
+			if updated == variables:
+				continue
+			variables = updated
+			console.print(f"[green]{touched} arquivos reescaneados; {len(variables)} variáveis[/green]")
+			if output:
+				_write_output(variables, Path(output), fmt)
+			if persist_index:
+				index.save()
+			if import_catalog:
+				from cli.commands.catalog import _import_scan
+				_import_scan(variables.items(), auto_categorize=auto_categorize)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		watcher.close()
+
+
+def _apply_changes(
+	base: Path,
+	extensions: List[str],
+	excluded_dirs: Set[str],
+	index: ScanIndex,
+	changed: Set[str],
+	options: ScanOptions = ScanOptions(),
+) -> int:
+	targets: Set[str] = set()
+	for changed_path in changed:
+		if os.path.isdir(changed_path) and not os.path.islink(changed_path):
+			# Diretório novo/movido (ou overflow): reconcilia tudo abaixo dele
+			targets.update(str(f) for f in iter_files(Path(changed_path), extensions, excluded_dirs))
+		else:
+			targets.add(changed_path)
+		targets.update(index.files_under(changed_path))
+	relpaths = [os.path.relpath(t, base) for t in sorted(targets)]
+	accepted = {str(f) for f in select_files(base, relpaths, extensions, excluded_dirs)}
+	touched = 0
+	for target in sorted(targets):
+		if target in accepted:
+			try:
+				found = _scan_path(target, options)
+			except OSError:
+				found = {}
+			index.update_file(target, found)
+		elif target in index.by_file:
+			index.remove_file(target)
+		else:
+			continue
+		touched += 1
+	return touched
+
+
+def _format_lines(lines: List[int]) -> str:
+	return ":" + ",".join(str(n) for n in lines) if lines else ""
+
+
+def _query_index(query_name: Optional[str], query_file: Optional[str]) -> None:
+	index = ScanIndex.load(INDEX_FILE)
+	if index is None:
+		raise click.ClickException(f"Índice não encontrado em {INDEX_FILE}. Rode 'envsecure scan --index' primeiro.")
+	if query_name:
+		names = [query_name] if query_name in index.by_var else fnmatch.filter(index.by_var, query_name)
+		if not names:
+			console.print(f"[yellow]{query_name} não aparece no índice[/yellow]")
+		for name in names:
+			console.print(f"[bold]{name}[/bold]")
+			for file_path, lines in index.lookup_var(name).items():
+				console.print(f"  {file_path}{_format_lines(lines)}", markup=False, highlight=False)
+	if query_file:
+		key = index.resolve_file(query_file)
+		if key is None:
+			console.print(f"[yellow]{query_file} não aparece no índice[/yellow]")
+			return
+		console.print(f"[bold]{key}[/bold]", markup=True, highlight=False)
+		for name, lines in index.by_file[key].items():
+			console.print(f"  {name}{_format_lines(lines)}", markup=False, highlight=False)
 
 
 @click.command()
 @click.option("--path", "scan_path", default=".", show_default=True, type=click.Path(exists=True, file_okay=False))
-@click.option("--output", type=click.Path(dir_okay=False), help="Arquivo de saída (csv/json)")
-@click.option("--pattern", default="*.py,*.yml,*.yaml,*.json,Dockerfile", show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), help="Arquivo de saída (csv/json/ndjson)")
+@click.option(
+	"--format",
+	"fmt",
+	type=click.Choice(["auto", "json", "csv", "ndjson"]),
+	default="auto",
+	show_default=True,
+	help="Formato da saída; auto decide pela extensão de --output. ndjson é gravado em streaming",
+)
+@click.option("--pattern", default=",".join(DEFAULT_GLOBS), show_default=True)
 @click.option(
 	"--exclude",
-	default=".venv,venv,.git,__pycache__,node_modules,.mypy_cache,.pytest_cache,.tox,dist,build,.envsecure",
+	default=",".join(DEFAULT_EXCLUDES),
 	show_default=True,
 	help="Pastas a serem ignoradas (lista separada por vírgulas)",
 )
-def scan_cmd(scan_path: str, output: Optional[str], pattern: str, exclude: str) -> None:
+@click.option("--jobs", "-j", default=1, show_default=True, type=click.IntRange(min=0), help="Processos paralelos (0 = número de CPUs)")
+@click.option("--cache/--no-cache", "use_cache", default=False, show_default=True, help="Reaproveitar resultados de arquivos inalterados (.envsecure/scan_cache.json)")
+@click.option("--hash", "verify_hash", is_flag=True, default=False, help="Com --cache, compara sha256 quando os metadados do arquivo mudam")
+@click.option("--max-file-size", callback=_parse_size, help="Ignorar arquivos maiores que o limite (ex.: 50M)")
+@click.option("--since", "since", metavar="REV", help="Escanear apenas arquivos alterados desde REV (git) e mesclar no --output existente")
+@click.option("--watch", is_flag=True, default=False, help="Continuar observando a árvore e reescanear arquivos alterados")
+@click.option("--debounce", default=0.5, show_default=True, type=click.FloatRange(min=0), help="Com --watch, segundos de calmaria antes de gravar")
+@click.option("--poll", is_flag=True, default=False, help="Com --watch, forçar polling por mtime em vez de inotify")
+@click.option("--import", "import_catalog", is_flag=True, default=False, help="Com --watch, aplicar cada atualização ao catálogo (import-scan)")
+@click.option("--auto-categorize", is_flag=True, default=False, help="Com --watch --import, categorizar automaticamente variáveis novas")
+@click.option("--index", "use_index", is_flag=True, default=False, help="Gravar índice variável <-> arquivo com linhas (.envsecure/scan_index.json)")
+@click.option("--query", "query_name", metavar="NAME", help="Consultar no índice quais arquivos usam NAME (aceita * e ?), sem escanear")
+@click.option("--file", "query_file", metavar="PATH", help="Consultar no índice quais variáveis PATH usa, sem escanear")
+def scan_cmd(
+	scan_path: str,
+	output: Optional[str],
+	fmt: str,
+	pattern: str,
+	exclude: str,
+	jobs: int,
+	use_cache: bool,
+	verify_hash: bool,
+	max_file_size: Optional[int],
+	since: Optional[str],
+	watch: bool,
+	debounce: float,
+	poll: bool,
+	import_catalog: bool,
+	auto_categorize: bool,
+	use_index: bool,
+	query_name: Optional[str],
+	query_file: Optional[str],
+) -> None:
 	"""Escaneia o código e detecta variáveis de ambiente."""
+	if query_name or query_file:
+		_query_index(query_name, query_file)
+		return
+
 	path = Path(scan_path)
 	extensions = [p.strip() for p in pattern.split(",") if p.strip()]
 	excluded_dirs = {e.strip() for e in exclude.split(",") if e.strip()}
-	variables: Dict[str, List[str]] = {}
-	# Caminhada segura evitando entrar em diretórios excluídos
-	for root, dirs, files in os.walk(path, topdown=True):
-		# Prune de diretórios excluídos
-		dirs[:] = [d for d in dirs if d not in excluded_dirs]
-		for fname in files:
-			if not any(fnmatch.fnmatch(fname, pat) for pat in extensions):
-				continue
-			file_path = Path(root) / fname
-			try:
-				if file_path.is_symlink():
-					continue
-				for var in _scan_file(file_path):
-					variables.setdefault(var, []).append(str(file_path))
-			except OSError:
-				# Ignora arquivos inacessíveis
-				continue
+	cache = ScanCache().load() if use_cache or verify_hash else None
+	index: Optional[ScanIndex] = None
+	if use_index:
+		# Um scan completo reconstrói o índice; --since o atualiza
+		index = (ScanIndex.load() if since else None) or ScanIndex()
+	scan_kwargs: Dict[str, Any] = {
+		"jobs": jobs or os.cpu_count() or 1,
+		"cache": cache,
+		"verify_hash": verify_hash,
+		"max_file_size": max_file_size,
+		"index": index,
+	}
+	fmt = _output_format(fmt, output)
+	status = err_console if not output and fmt != "rich" else console
+	if fmt == "ndjson" and not since and not watch:
+		found_count = _stream_ndjson(_iter_results(iter_files(path, extensions, excluded_dirs), prune_root=path, **scan_kwargs), output)
+		if cache is not None:
+			cache.save()
+		if index is not None:
+			index.save()
+		status.print(f"[green]Encontradas {found_count} variáveis[/green]")
+		return
 
-	console.print(f"[green]Encontradas {len(variables)} variáveis[/green]")
-	if output:
-		out_path = Path(output)
-		if out_path.suffix.lower() == ".json":
-			out_path.write_text(json.dumps(variables, indent=2, ensure_ascii=False))
-		else:
-			# CSV simples: VAR;path1,path2
-			lines = ["name;detected_in"]
-			for name, files in sorted(variables.items()):
-				lines.append(f"{name};{','.join(files)}")
-			out_path.write_text("\n".join(lines))
+	if since:
+		if not output or not Path(output).exists():
+			raise click.ClickException("--since requer --output apontando para o resultado de um scan anterior (JSON/NDJSON)")
+		previous = load_scan(Path(output))
+		variables = _scan_since(path, since, previous, extensions, excluded_dirs, **scan_kwargs)
 	else:
-		console.print(variables)
+		variables = _scan_tree(path, extensions, excluded_dirs, **scan_kwargs)
+	if cache is not None:
+		cache.save()
+	if index is not None:
+		index.save()
 
+	status.print(f"[green]Encontradas {len(variables)} variáveis[/green]")
+	if output:
+		_write_output(variables, Path(output), fmt)
+	elif fmt == "rich":
+		if not watch:
+			console.print(variables)
+	elif fmt == "json":
+		click.echo(json.dumps(variables, indent=2, ensure_ascii=False))
+	else:
+		click.echo("".join(_ndjson_lines((n, f) for n, files in variables.items() for f in files)), nl=False)
 
+	if watch:
+		_watch(path, extensions, excluded_dirs, variables, output, max_file_size, debounce, poll, import_catalog, index, fmt, auto_categorize)
@@ -1,9 +1,11 @@
 from pathlib import Path
-from typing import Optional, List, Dict, Set
+from typing import Optional, List, Dict, Mapping, Set
 import re
 import click
 from rich.console import Console
-import json
+from core.catalog import load_catalog
+from core.bundle import BundleError, EnvBundle, open_bundle
+from core.envfile import load_env
 
 
 console = Console()
@@ -13,30 +15,37 @@ PLACEHOLDER_RE = re.compile(r"your_.*_here|placeholder|changeme", flags=re.I)
 PROVIDER_PLACEHOLDER_RE = re.compile(r"your_value_here", flags=re.I)
 
 
+def _load(path: Path) -> Mapping[str, str]:
+	try:
+		return load_env(path)
+	except ValueError as e:
+		raise click.ClickException(str(e))
+
+
 def _validate_files(template_path: Path, secrets_path: Path) -> None:
 	if not template_path.exists():
 		raise click.ClickException("Template não encontrado")
 	if not secrets_path.exists():
 		raise click.ClickException("Segredos não encontrados")
 
+	_validate_mappings(_load(template_path), _load(secrets_path))
+
+
+def _open_bundle(environment: str, key_file: Optional[str]) -> EnvBundle:
+	try:
+		return open_bundle(environment, key_file)
+	except (ValueError, BundleError) as e:
+		raise click.ClickException(str(e))
+
+
+def _validate_mappings(template: Mapping[str, str], secrets: Mapping[str, str]) -> None:
+	"""Validação estrita sobre mapeamentos já carregados (arquivos .env ou bundle compilado)."""
 	# Constrói lista de chaves do template
-	required_keys: List[str] = []
-	for line in template_path.read_text().splitlines():
-		if not line.strip() or line.strip().startswith('#'):
-			continue
-		name, _, default_value = line.partition('=')
-		required_keys.append(name.strip())
+	required_keys: List[str] = list(template)
+	for name, default_value in template.items():
 		if PLACEHOLDER_RE.search(default_value):
 			raise click.ClickException(f"Template contém placeholder fraco para {name}")
 
-	# Lê segredos
-	secrets: Dict[str, str] = {}
-	for line in secrets_path.read_text().splitlines():
-		if not line.strip() or line.strip().startswith('#'):
-			continue
-		name, _, value = line.partition('=')
-		secrets[name.strip()] = value.strip()
-
 	# Presença
 	missing = [k for k in required_keys if k not in secrets or not secrets[k]]
 	if missing:
@@ -60,40 +69,34 @@ def _validate_files(template_path: Path, secrets_path: Path) -> None:
 @click.option("--audit", "audit_short", is_flag=True, help="Alias para --audit-secrets")
 @click.option("--report", type=click.Path(dir_okay=False))
 @click.option("--strict/--no-strict", default=False, show_default=True, help="Modo estrito: todas as chaves do template são obrigatórias")
-def validate_cmd(environment: Optional[str], check_strength: bool, audit_secrets: bool, env_short: Optional[str], audit_short: bool, report: Optional[str], strict: bool) -> None:
+@click.option("--from-bundle", is_flag=True, default=False, help="Validar o bundle compilado (envsecure compile) em vez dos arquivos")
+@click.option("--bundle-key-file", type=click.Path(exists=True, dir_okay=False), help="Chave do bundle cifrado")
+def validate_cmd(environment: Optional[str], check_strength: bool, audit_secrets: bool, env_short: Optional[str], audit_short: bool, report: Optional[str], strict: bool, from_bundle: bool, bundle_key_file: Optional[str]) -> None:
 	"""Valida templates e segredos."""
 	env = environment or env_short or "dev"
 	base_dir = Path(".envsecure")
 	secrets_path = base_dir / "secrets" / f"secrets.{env}"
 	template_path = base_dir / "templates" / "app.env.safe"
+	# O bundle já é o template renderizado: as chaves vêm dele e os valores fazem o papel dos segredos
+	bundle = _open_bundle(env, bundle_key_file) if from_bundle else None
 
 	if strict:
 		try:
-			_validate_files(template_path, secrets_path)
+			if bundle is not None:
+				_validate_mappings(dict.fromkeys(bundle, ""), bundle)
+			else:
+				_validate_files(template_path, secrets_path)
 			console.print("[green]Validação básica OK[/green]")
 		except click.ClickException as e:
 			console.print(f"[red]{e}[/red]")
 			raise
 	else:
 		# Validação baseada no catálogo: só exige variáveis marcadas como required
-		if not template_path.exists() or not secrets_path.exists():
+		if bundle is None and (not template_path.exists() or not secrets_path.exists()):
 			raise click.ClickException("Template ou segredos não encontrados")
-		catalog_path = base_dir / "catalog.json"
-		catalog: Dict[str, Dict] = {}
-		if catalog_path.exists():
-			catalog = json.loads(catalog_path.read_text())
-		template_keys: List[str] = []
-		for line in template_path.read_text().splitlines():
-			if not line.strip() or line.strip().startswith('#'):
-				continue
-			name, _, _ = line.partition('=')
-			template_keys.append(name.strip())
-		secrets: Dict[str, str] = {}
-		for line in secrets_path.read_text().splitlines():
-			if not line.strip() or line.strip().startswith('#'):
-				continue
-			name, _, value = line.partition('=')
-			secrets[name.strip()] = value.strip()
+		catalog: Dict[str, Dict] = load_catalog(base_dir)
+		template_keys: List[str] = list(bundle) if bundle is not None else list(_load(template_path))
+		secrets = bundle if bundle is not None else _load(secrets_path)
 		required_names: Set[str] = set(
 			name for name, meta in catalog.items() if meta.get("required", True)
 		)
@@ -106,11 +109,9 @@ def validate_cmd(environment: Optional[str], check_strength: bool, audit_secrets
 
 	if check_strength or audit_secrets or audit_short:
 		weak: List[str] = []
-		for line in secrets_path.read_text().splitlines():
-			if not line.strip() or line.strip().startswith('#'):
-				continue
-			name, _, value = line.partition('=')
-			if len(value.strip()) < 16:
+		# Mesmo mapeamento já lido acima (cache de load_env)
+		for name, value in (bundle if bundle is not None else _load(secrets_path)).items():
+			if len(value) < 16:
 				weak.append(name)
 		if weak:
 			msg = f"Fracos (<16 chars): {', '.join(weak)}"
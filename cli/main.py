@@ -41,6 +41,8 @@ def _register_commands() -> None:
 	from cli.commands.deploy import deploy_cmd
 	from cli.commands.validate import validate_cmd
 	from cli.commands.generate_keys import generate_keys_cmd
+	from cli.commands.compile import compile_cmd
+	from cli.commands.rollout import rollout_cmd
 
 	cli.add_command(init_cmd, name="init")
 	cli.add_command(scan_cmd, name="scan")
@@ -49,6 +51,8 @@ def _register_commands() -> None:
 	cli.add_command(deploy_cmd, name="deploy")
 	cli.add_command(validate_cmd, name="validate")
 	cli.add_command(generate_keys_cmd, name="generate-keys")
+	cli.add_command(compile_cmd, name="compile")
+	cli.add_command(rollout_cmd, name="rollout")
 
 
 _register_commands()
@@ -3,7 +3,8 @@ from pathlib import Path
 from typing import Dict, List
 import base64
 import os
-import json
+from core.catalog import load_catalog
+from core.envfile import load_env
 
 
 SENSITIVE_HINTS = ("PASSWORD", "SECRET", "TOKEN", "KEY")
@@ -58,21 +59,14 @@ def _guess_default(name: str) -> str:
 	return ""
 
 
-def generate_dev_defaults(template_path: Path, catalog_path: Path) -> Dict[str, str]:
+def generate_dev_defaults(template_path: Path, catalog_dir: Path) -> Dict[str, str]:
 	# Carrega chaves do template
-	keys: List[str] = []
-	for line in template_path.read_text().splitlines():
-		if not line.strip() or line.strip().startswith('#'):
-			continue
-		name, _, _ = line.partition('=')
-		keys.append(name.strip())
+	keys: List[str] = list(load_env(template_path))
 
 	# Carrega required do catálogo, se existir
 	catalog_required: Dict[str, bool] = {}
-	if catalog_path.exists():
-		catalog = json.loads(catalog_path.read_text())
-		for name, meta in catalog.items():
-			catalog_required[name] = bool(meta.get("required", True))
+	for name, meta in load_catalog(catalog_dir).items():
+		catalog_required[name] = bool(meta.get("required", True))
 
 	values: Dict[str, str] = {}
 	for name in keys:
@@ -0,0 +1,171 @@
+"""Bundle binário compilado de um ambiente (`envsecure compile <env>`).
+
+Layout (little-endian)::
+
+	cabeçalho  "<4sBBHI"  magic b"ESB1", versão, flags, reservado, nº de chaves
+	índice     "<IHII" × n  (offset da chave, tamanho da chave, offset do valor, tamanho do valor)
+	           ordenado pelos bytes da chave -> busca binária sem carregar o resto
+	chaves     nomes UTF-8 concatenados, na ordem do template
+	valores    valores UTF-8 concatenados (com FLAG_ENCRYPTED: nonce(12) + AES-GCM, AAD = nome)
+
+Offsets são absolutos no arquivo. `EnvBundle` faz mmap do arquivo e só decodifica (e decifra)
+o valor da chave pedida.
+"""
+from __future__ import annotations
+import base64
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Iterator, List, Mapping, Optional, Tuple
+
+
+MAGIC = b"ESB1"
+VERSION = 1
+FLAG_ENCRYPTED = 0x01
+HEADER = struct.Struct("<4sBBHI")
+ENTRY = struct.Struct("<IHII")
+NONCE_SIZE = 12
+BUNDLE_DIR = Path(".envsecure/build")
+KEY_ENV_VAR = "ENVSECURE_BUNDLE_KEY"
+
+
+class BundleError(ValueError):
+	pass
+
+
+def bundle_path(environment: str, base_dir: Path = BUNDLE_DIR) -> Path:
+	return base_dir / f"{environment}.envb"
+
+
+def resolve_key(key_file: Optional[str]) -> Optional[bytes]:
+	"""Chave AES (base64 urlsafe, como em utils.crypto) de --key-file ou de $ENVSECURE_BUNDLE_KEY."""
+	encoded = Path(key_file).read_text().strip() if key_file else os.environ.get(KEY_ENV_VAR)
+	if not encoded:
+		return None
+	key = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+	if len(key) not in (16, 24, 32):
+		raise BundleError("Chave do bundle deve ter 16, 24 ou 32 bytes")
+	return key
+
+
+def build_bundle(values: Mapping[str, str], key: Optional[bytes] = None) -> bytes:
+	"""Serializa `values` (ordem preservada no blob de chaves); cifra os valores se `key` for dado."""
+	aead = None
+	if key is not None:
+		from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+		aead = AESGCM(key)
+	names = [name.encode("utf-8") for name in values]
+	blobs: List[bytes] = []
+	for name, raw_name in zip(values, names):
+		data = values[name].encode("utf-8")
+		if aead is not None:
+			nonce = os.urandom(NONCE_SIZE)
+			data = nonce + aead.encrypt(nonce, data, raw_name)
+		blobs.append(data)
+
+	keys_start = HEADER.size + ENTRY.size * len(names)
+	entries: List[Tuple[bytes, int, int, int, int]] = []
+	key_offset = keys_start
+	value_offset = keys_start + sum(len(n) for n in names)
+	for raw_name, data in zip(names, blobs):
+		if len(raw_name) > 0xFFFF:
+			raise BundleError(f"Nome de variável longo demais: {raw_name[:40]!r}...")
+		entries.append((raw_name, key_offset, len(raw_name), value_offset, len(data)))
+		key_offset += len(raw_name)
+		value_offset += len(data)
+	entries.sort(key=lambda e: e[0])
+
+	header = HEADER.pack(MAGIC, VERSION, FLAG_ENCRYPTED if aead is not None else 0, 0, len(names))
+	index = b"".join(ENTRY.pack(*e[1:]) for e in entries)
+	return header + index + b"".join(names) + b"".join(blobs)
+
+
+class EnvBundle(Mapping[str, str]):
+	"""Leitor de bundle via mmap: busca binária no índice, decodificação sob demanda."""
+
+	def __init__(self, path: Path, key: Optional[bytes] = None) -> None:
+		# `key` é ignorada se o bundle não for cifrado
+		self.path = path
+		with open(path, "rb") as fh:
+			size = os.fstat(fh.fileno()).st_size
+			if size < HEADER.size:
+				raise BundleError(f"Bundle inválido: {path}")
+			self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, version, flags, _, count = HEADER.unpack_from(self._mm, 0)
+		if magic != MAGIC or version != VERSION:
+			self._mm.close()
+			raise BundleError(f"Bundle inválido ou de versão incompatível: {path}")
+		self.count = count
+		self.encrypted = bool(flags & FLAG_ENCRYPTED)
+		self._aead = None
+		if self.encrypted:
+			if key is None:
+				self._mm.close()
+				raise BundleError(f"Bundle cifrado: informe a chave (--key-file ou ${KEY_ENV_VAR})")
+			from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+			self._aead = AESGCM(key)
+
+	def _entry(self, i: int) -> Tuple[int, int, int, int]:
+		return ENTRY.unpack_from(self._mm, HEADER.size + i * ENTRY.size)
+
+	def _find(self, raw_name: bytes) -> Optional[Tuple[int, int, int, int]]:
+		lo, hi = 0, self.count
+		mm = self._mm
+		while lo < hi:
+			mid = (lo + hi) // 2
+			entry = self._entry(mid)
+			probe = mm[entry[0]:entry[0] + entry[1]]
+			if probe == raw_name:
+				return entry
+			if probe < raw_name:
+				lo = mid + 1
+			else:
+				hi = mid
+		return None
+
+	def _value(self, raw_name: bytes, value_offset: int, value_len: int) -> str:
+		data = self._mm[value_offset:value_offset + value_len]
+		if self._aead is not None:
+			from cryptography.exceptions import InvalidTag
+			try:
+				data = self._aead.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], raw_name)
+			except InvalidTag:
+				raise BundleError(f"Falha ao decifrar {raw_name.decode('utf-8')}: chave incorreta ou bundle corrompido")
+		return data.decode("utf-8")
+
+	def __getitem__(self, name: str) -> str:
+		raw_name = name.encode("utf-8")
+		entry = self._find(raw_name)
+		if entry is None:
+			raise KeyError(name)
+		return self._value(raw_name, entry[2], entry[3])
+
+	def __contains__(self, name: object) -> bool:
+		return isinstance(name, str) and self._find(name.encode("utf-8")) is not None
+
+	def __len__(self) -> int:
+		return self.count
+
+	def __iter__(self) -> Iterator[str]:
+		# Ordem original (template): entradas ordenadas pelo offset da chave
+		entries = sorted(self._entry(i) for i in range(self.count))
+		mm = self._mm
+		for key_offset, key_len, _, _ in entries:
+			yield mm[key_offset:key_offset + key_len].decode("utf-8")
+
+	def close(self) -> None:
+		self._mm.close()
+
+	def __enter__(self) -> "EnvBundle":
+		return self
+
+	def __exit__(self, *exc: object) -> None:
+		self.close()
+
+
+def open_bundle(environment: str, key_file: Optional[str] = None, base_dir: Path = BUNDLE_DIR) -> EnvBundle:
+	path = bundle_path(environment, base_dir)
+	if not path.exists():
+		raise BundleError(f"Bundle não encontrado: {path} (rode 'envsecure compile {environment}')")
+	return EnvBundle(path, resolve_key(key_file))
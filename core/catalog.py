@@ -1,28 +1,351 @@
 import json
-from dataclasses import asdict
+import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 from models.variable import EnvironmentVariable
+from utils.filesystem import atomic_write, file_lock
+
+if TYPE_CHECKING:
+	from core.catalog_query import CatalogQuery
+	from core.catalog_sqlite import SqliteCatalogStore
 
 
 CATALOG_FILE = Path(".envsecure/catalog.json")
+CATALOG_DB = Path(".envsecure/catalog.db")
+CATALOG_VERSION = 2
+JOURNAL_SUFFIX = ".journal"
+LOCK_SUFFIX = ".lock"
+# Acima disso o commit compacta o journal no snapshot automaticamente
+JOURNAL_COMPACT_BYTES = 8 * 1024 * 1024
+
+def _drop_torn_tail(fh: BinaryIO) -> None:
+	"""Corta o que vier depois do último '\n' (linha de um escritor interrompido)."""
+	end = fh.seek(0, os.SEEK_END)
+	pos = end
+	while pos > 0:
+		start = max(0, pos - 65536)
+		fh.seek(start)
+		chunk = fh.read(pos - start)
+		if pos == end and chunk.endswith(b"\n"):
+			return
+		newline = chunk.rfind(b"\n")
+		if newline != -1:
+			fh.truncate(start + newline + 1)
+			return
+		pos = start
+	fh.truncate(0)
+
+
+class PathRefs(Sequence[str]):
+	"""Visão preguiçosa de detected_in: índices na tabela de caminhos compartilhada.
+
+	Os caminhos só são materializados quando a sequência é lida.
+	"""
+
+	__slots__ = ("_table", "_refs")
+
+	def __init__(self, table: List[str], refs: List[int]) -> None:
+		self._table = table
+		self._refs = refs
+
+	def __len__(self) -> int:
+		return len(self._refs)
+
+	def __getitem__(self, index):  # type: ignore[override]
+		if isinstance(index, slice):
+			return [self._table[i] for i in self._refs[index]]
+		return self._table[self._refs[index]]
+
+	def __iter__(self) -> Iterator[str]:
+		table = self._table
+		return (table[i] for i in self._refs)
+
+	def __eq__(self, other: object) -> bool:
+		if isinstance(other, (list, tuple, PathRefs)):
+			return list(self) == list(other)
+		return NotImplemented
+
+	def __repr__(self) -> str:
+		return f"PathRefs({list(self)!r})"
+
+
+class JsonCatalogStore:
+	"""Catálogo em .envsecure/catalog.json (snapshot) + catalog.journal (mutações pendentes).
+
+	Snapshot (CATALOG_VERSION): {"version", "paths": [...], "variables": {nome: meta}} com
+	meta["detected_in"] como índices em "paths". O formato antigo (dict nome -> meta com
+	caminhos literais) continua sendo lido.
+
+	As mutações não regravam o snapshot: o commit acrescenta ao journal uma linha JSON
+	{"ops": [...]} com todas as operações da transação, sob lock exclusivo e com fsync, e a
+	leitura repete o journal sobre o snapshot. Uma linha truncada (escritor interrompido) é
+	descartada inteira, então uma transação nunca fica aplicada pela metade, e o próximo
+	commit corta esse resto antes de acrescentar. As operações são idempotentes, então
+	repetir o journal sobre um snapshot já compactado é inofensivo. 'compact' incorpora o
+	journal ao snapshot.
+	"""
+
+	def __init__(self, path: Path = CATALOG_FILE) -> None:
+		self.path = path
+		self.journal_path = path.with_suffix(JOURNAL_SUFFIX)
+		self.lock_path = path.with_suffix(LOCK_SUFFIX)
+		self._load()
+
+	def _load(self) -> None:
+		self._pending: List[Dict[str, Any]] = []
+		if not self.path.exists() and not self.journal_path.exists():
+			self._reset({})
+			return
+		with file_lock(self.lock_path, shared=True):
+			self._read()
+
+	def _reset(self, raw: Dict[str, Any]) -> None:
+		self._paths: List[str] = []
+		self._path_ids: Dict[str, int] = {}
+		self._data: Dict[str, Dict[str, Any]] = {}
+		self._indexes: Dict[str, Dict[str, Set[str]]] = {}
+		if raw.get("version") == CATALOG_VERSION and isinstance(raw.get("variables"), dict):
+			self._paths = raw.get("paths", [])
+			self._path_ids = {p: i for i, p in enumerate(self._paths)}
+			self._data = raw["variables"]
+		else:
+			for name, meta in raw.items():
+				self._data[name] = self._intern(meta)
+
+	def _read(self) -> None:
+		# Chamado com o lock (compartilhado ou exclusivo) já adquirido
+		self._reset(json.loads(self.path.read_text()) if self.path.exists() else {})
+		if not self.journal_path.exists():
+			return
+		for line in self.journal_path.read_bytes().splitlines():
+			if not line.strip():
+				continue
+			try:
+				entry = json.loads(line)
+			except ValueError:
+				# Transação truncada (escritor interrompido): ignorada por inteiro
+				continue
+			# Linhas antigas têm uma operação solta; as novas, {"ops": [...]}
+			for op in entry["ops"] if "ops" in entry else [entry]:
+				self._apply(op)
+
+	def _intern(self, meta: Dict[str, Any]) -> Dict[str, Any]:
+		meta = dict(meta)
+		detected_in = meta.get("detected_in")
+		if detected_in is None:
+			return meta
+		if isinstance(detected_in, PathRefs) and detected_in._table is self._paths:
+			meta["detected_in"] = list(detected_in._refs)
+			return meta
+		refs: List[int] = []
+		# Sem repetições, como a tabela detections do SQLite
+		for path in dict.fromkeys(detected_in):
+			ref = self._path_ids.get(path)
+			if ref is None:
+				ref = self._path_ids[path] = len(self._paths)
+				self._paths.append(path)
+			refs.append(ref)
+		meta["detected_in"] = refs
+		return meta
+
+	def _view(self, meta: Dict[str, Any]) -> Dict[str, Any]:
+		# Campo None ou detected_in vazio equivale a ausente, como no SQLite (NULL / sem detections)
+		meta = {k: v for k, v in meta.items() if v is not None}
+		if meta.get("detected_in"):
+			meta["detected_in"] = PathRefs(self._paths, meta["detected_in"])
+		else:
+			meta.pop("detected_in", None)
+		return meta
+
+	def _apply(self, op: Dict[str, Any]) -> None:
+		self._indexes.clear()
+		kind = op.get("op")
+		if kind == "put":
+			self._data[op["name"]] = self._intern(op["meta"])
+		elif kind == "update":
+			fields = self._intern(op["fields"])
+			for name in op["names"]:
+				self._data.setdefault(name, {}).update(fields)
+		elif kind == "delete":
+			self._data.pop(op["name"], None)
+
+	def _record(self, op: Dict[str, Any]) -> None:
+		self._apply(op)
+		self._pending.append(op)
+
+	@staticmethod
+	def _literal(meta: Dict[str, Any]) -> Dict[str, Any]:
+		# O journal guarda caminhos literais: a tabela de caminhos é local a cada processo
+		if isinstance(meta.get("detected_in"), PathRefs):
+			meta = dict(meta)
+			meta["detected_in"] = list(meta["detected_in"])
+		return meta
+
+	def __contains__(self, name: str) -> bool:
+		return name in self._data
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+	def names(self) -> List[str]:
+		return list(self._data)
+
+	def get(self, name: str) -> Optional[Dict[str, Any]]:
+		meta = self._data.get(name)
+		return self._view(meta) if meta is not None else None
+
+	def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+		for name, meta in self._data.items():
+			yield name, self._view(meta)
+
+	def field_index(self, field: str) -> Dict[str, Set[str]]:
+		"""Índice valor normalizado -> nomes para `field`, construído sob demanda e descartado a cada mutação."""
+		index = self._indexes.get(field)
+		if index is None:
+			from core.catalog_query import index_key
+			index = {}
+			for name, meta in self._data.items():
+				index.setdefault(index_key(meta.get(field)), set()).add(name)
+			self._indexes[field] = index
+		return index
+
+	def query_names(self, query: "CatalogQuery") -> List[str]:
+		selected = query.select(self)
+		return [name for name in self._data if name in selected]
+
+	def query(self, query: "CatalogQuery") -> Iterator[Tuple[str, Dict[str, Any]]]:
+		for name in self.query_names(query):
+			yield name, self._view(self._data[name])
+
+	def put(self, name: str, meta: Dict[str, Any]) -> None:
+		self._record({"op": "put", "name": name, "meta": self._literal(meta)})
+
+	def update(self, name: str, fields: Dict[str, Any]) -> None:
+		self.update_many([name], fields)
+
+	def update_many(self, names: List[str], fields: Dict[str, Any]) -> None:
+		if names:
+			self._record({"op": "update", "names": list(names), "fields": self._literal(fields)})
+
+	def delete(self, name: str) -> None:
+		if name in self._data:
+			self._record({"op": "delete", "name": name})
+
+	def _compact_paths(self) -> None:
+		# Descarta caminhos sem referência e renumera na ordem de uso
+		remap: Dict[int, int] = {}
+		paths: List[str] = []
+		for meta in self._data.values():
+			refs = meta.get("detected_in")
+			if not refs:
+				continue
+			new_refs = []
+			for ref in refs:
+				new = remap.get(ref)
+				if new is None:
+					new = remap[ref] = len(paths)
+					paths.append(self._paths[ref])
+				new_refs.append(new)
+			meta["detected_in"] = new_refs
+		self._paths = paths
+		self._path_ids = {p: i for i, p in enumerate(paths)}
+
+	def commit(self) -> None:
+		if not self._pending:
+			return
+		payload = json.dumps({"ops": self._pending}, ensure_ascii=False, separators=(",", ":")) + "\n"
+		with file_lock(self.lock_path):
+			with open(self.journal_path, "a+b") as fh:
+				_drop_torn_tail(fh)
+				fh.write(payload.encode("utf-8"))
+				fh.flush()
+				os.fsync(fh.fileno())
+			size = self.journal_path.stat().st_size
+		self._pending = []
+		if size > JOURNAL_COMPACT_BYTES:
+			self.compact()
+
+	def compact(self) -> int:
+		"""Incorpora o journal ao snapshot (sob lock exclusivo) e o esvazia. Retorna o nº de variáveis."""
+		self.commit()
+		with file_lock(self.lock_path):
+			self._read()
+			self._compact_paths()
+			payload = {"version": CATALOG_VERSION, "paths": self._paths, "variables": self._data}
+			atomic_write(self.path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")), mode=None)
+			if self.journal_path.exists():
+				self.journal_path.unlink()
+		return len(self._data)
+
+	def rollback(self) -> None:
+		if self._pending:
+			self._load()
+
+	def close(self) -> None:
+		pass
+
+
+CatalogStore = Union[JsonCatalogStore, "SqliteCatalogStore"]
+
+
+def open_catalog(base_dir: Path = CATALOG_FILE.parent) -> CatalogStore:
+	"""Abre o catálogo do projeto: SQLite se catalog.db existir, senão catalog.json."""
+	db_path = base_dir / CATALOG_DB.name
+	if db_path.exists():
+		from core.catalog_sqlite import SqliteCatalogStore
+		return SqliteCatalogStore(db_path)
+	return JsonCatalogStore(base_dir / CATALOG_FILE.name)
+
+
+@contextmanager
+def catalog_transaction(base_dir: Path = CATALOG_FILE.parent) -> Iterator[CatalogStore]:
+	"""Abre o catálogo uma vez, aplica as mutações em memória e grava tudo num único commit.
+
+	Se o bloco levantar exceção nada é gravado.
+	"""
+	store = open_catalog(base_dir)
+	try:
+		yield store
+		store.commit()
+	except BaseException:
+		store.rollback()
+		raise
+	finally:
+		store.close()
+
 
+def load_catalog(base_dir: Path = CATALOG_FILE.parent) -> Dict[str, Any]:
+	store = open_catalog(base_dir)
+	try:
+		return dict(store.items())
+	finally:
+		store.close()
 
-def load_catalog() -> Dict[str, Any]:
-	if CATALOG_FILE.exists():
-		return json.loads(CATALOG_FILE.read_text())
-	return {}
 
+def save_catalog(catalog: Dict[str, Any], base_dir: Path = CATALOG_FILE.parent) -> None:
+	with catalog_transaction(base_dir) as store:
+		for name in store.names():
+			if name not in catalog:
+				store.delete(name)
+		for name, meta in catalog.items():
+			store.put(name, meta)
 
-def save_catalog(catalog: Dict[str, Any]) -> None:
-	CATALOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-	CATALOG_FILE.write_text(json.dumps(catalog, indent=2, ensure_ascii=False))
 
+def add_variables(variables: Iterable[EnvironmentVariable], base_dir: Path = CATALOG_FILE.parent) -> int:
+	"""Adiciona (ou substitui) várias variáveis com uma única gravação do catálogo."""
+	count = 0
+	with catalog_transaction(base_dir) as store:
+		for variable in variables:
+			store.put(variable.name, variable.to_dict())
+			count += 1
+	return count
 
-def add_variable(variable: EnvironmentVariable) -> None:
-	catalog = load_catalog()
-	catalog[variable.name] = asdict(variable)
-	save_catalog(catalog)
 
+def update_many(names: Iterable[str], fields: Dict[str, Any], base_dir: Path = CATALOG_FILE.parent) -> None:
+	with catalog_transaction(base_dir) as store:
+		store.update_many(list(names), fields)
 
 
+def add_variable(variable: EnvironmentVariable, base_dir: Path = CATALOG_FILE.parent) -> None:
+	add_variables([variable], base_dir)
@@ -0,0 +1,264 @@
+"""Linguagem de consulta do catálogo.
+
+Exemplos::
+
+	category=secrets and sensitive=true and name~DB_*
+	not (required=true or category=database)
+	description~"*token*"
+
+Operadores: ``=``, ``!=``, ``~`` (glob), ``!~``; combinados com ``and``, ``or``, ``not`` e
+parênteses. Valores são comparados sem diferenciar maiúsculas (exceto ``name``) e os campos
+booleanos (required, sensitive) aceitam 1/true/yes e 0/false/no. Campo ausente equivale a
+valor vazio (``min_length=""``).
+
+A consulta é compilada uma vez: ``matches`` serve de predicado linha a linha, ``select`` resolve
+o conjunto de nomes pelos índices por campo do catálogo JSON e ``to_sql`` gera o WHERE usado
+pelo backend SQLite.
+"""
+from __future__ import annotations
+import fnmatch
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+	from core.catalog import JsonCatalogStore
+
+
+TRUE_VALUES = {"1", "true", "yes"}
+FALSE_VALUES = {"0", "false", "no"}
+BOOL_FIELDS = {"required", "sensitive"}
+# Campos com coluna no SQLite (ver core.catalog_sqlite.COLUMNS)
+SQL_FIELDS = {"category", "description", "required", "sensitive", "min_length", "pattern", "default_dev", "default_prod"}
+
+TOKEN_RE = re.compile(r"""\s*(?:(?P<op>!=|!~|=|~)|(?P<paren>[()])|"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<word>[^\s()=!~"']+))""")
+KEYWORDS = {"and", "or", "not"}
+
+Sql = Tuple[str, List[Any]]
+
+
+class QueryError(ValueError):
+	pass
+
+
+def index_key(value: Any) -> str:
+	"""Forma normalizada de um valor do catálogo, usada nos índices e nas comparações."""
+	if value is None:
+		return ""
+	if isinstance(value, bool):
+		return "true" if value else "false"
+	return str(value).lower()
+
+
+def _value_keys(value: str) -> Set[str]:
+	lowered = value.lower()
+	keys = {lowered}
+	if lowered in TRUE_VALUES:
+		keys.add("true")
+	elif lowered in FALSE_VALUES:
+		keys.add("false")
+	return keys
+
+
+class Compare:
+	def __init__(self, field: str, op: str, value: str) -> None:
+		self.field = field
+		self.negated = op.startswith("!")
+		self.glob = op.endswith("~")
+		self.value = value
+		if field == "name":
+			self._keys = {value}
+			self._regex = re.compile(fnmatch.translate(value)) if self.glob else None
+		else:
+			# 1/yes/0/no só viram true/false em campos booleanos, como em `to_sql`
+			self._keys = _value_keys(value) if field in BOOL_FIELDS else {value.lower()}
+			self._regex = re.compile(fnmatch.translate(value.lower())) if self.glob else None
+
+	def _hit(self, key: str) -> bool:
+		return bool(self._regex.match(key)) if self._regex is not None else key in self._keys
+
+	def matches(self, name: str, meta: Dict[str, Any]) -> bool:
+		key = name if self.field == "name" else index_key(meta.get(self.field))
+		return self._hit(key) != self.negated
+
+	def select(self, store: "JsonCatalogStore", universe: Set[str]) -> Set[str]:
+		if self.field == "name":
+			if self._regex is None:
+				hits = self._keys & universe
+			else:
+				hits = {n for n in universe if self._regex.match(n)}
+		else:
+			index = store.field_index(self.field)
+			hits = set()
+			for key in (k for k in index if self._hit(k)) if self._regex is not None else self._keys:
+				hits |= index.get(key, set())
+			hits &= universe
+		return universe - hits if self.negated else hits
+
+	def to_sql(self) -> Optional[Sql]:
+		if self.field == "name":
+			sql, params = ("name GLOB ?", [self.value]) if self.glob else ("name = ?", [self.value])
+		elif self.field in BOOL_FIELDS:
+			if self.glob:
+				return None
+			if self.value == "":
+				sql, params = f"{self.field} IS NULL", []
+			elif self._keys & {"true", "false"}:
+				# coalesce: coluna NULL (campo ausente) nunca torna a comparação NULL, então
+				# NOT (...) a inclui, como em `matches`
+				sql, params = f"coalesce({self.field}, -1) = ?", [int("true" in self._keys)]
+			else:
+				sql, params = "0", []
+		elif self.field in SQL_FIELDS:
+			column = f"lower(coalesce(CAST({self.field} AS TEXT), ''))"
+			sql, params = (f"{column} GLOB ?" if self.glob else f"{column} = ?"), [self.value.lower()]
+		else:
+			return None
+		return (f"NOT ({sql})", params) if self.negated else (sql, params)
+
+
+class Not:
+	def __init__(self, operand: Any) -> None:
+		self.operand = operand
+
+	def matches(self, name: str, meta: Dict[str, Any]) -> bool:
+		return not self.operand.matches(name, meta)
+
+	def select(self, store: "JsonCatalogStore", universe: Set[str]) -> Set[str]:
+		return universe - self.operand.select(store, universe)
+
+	def to_sql(self) -> Optional[Sql]:
+		inner = self.operand.to_sql()
+		return None if inner is None else (f"NOT ({inner[0]})", inner[1])
+
+
+class BoolOp:
+	def __init__(self, op: str, operands: List[Any]) -> None:
+		self.op = op
+		self.operands = operands
+
+	def matches(self, name: str, meta: Dict[str, Any]) -> bool:
+		if self.op == "and":
+			return all(o.matches(name, meta) for o in self.operands)
+		return any(o.matches(name, meta) for o in self.operands)
+
+	def select(self, store: "JsonCatalogStore", universe: Set[str]) -> Set[str]:
+		if self.op == "and":
+			result = universe
+			for operand in self.operands:
+				# Cada termo só precisa olhar o que sobrou dos anteriores
+				result = operand.select(store, result)
+				if not result:
+					break
+			return result
+		result = set()
+		for operand in self.operands:
+			result |= operand.select(store, universe)
+		return result
+
+	def to_sql(self) -> Optional[Sql]:
+		parts = [o.to_sql() for o in self.operands]
+		if any(p is None for p in parts):
+			return None
+		sql = f" {self.op.upper()} ".join(f"({p[0]})" for p in parts)  # type: ignore[index]
+		return sql, [param for p in parts for param in p[1]]  # type: ignore[index]
+
+
+class _Parser:
+	def __init__(self, text: str) -> None:
+		self.tokens: List[Tuple[str, str]] = []
+		pos = 0
+		text = text.strip()
+		while pos < len(text):
+			m = TOKEN_RE.match(text, pos)
+			if not m or m.end() == pos:
+				raise QueryError(f"Consulta inválida perto de: {text[pos:]!r}")
+			pos = m.end()
+			kind = m.lastgroup or ""
+			value = m.group(kind)
+			if kind in ("dq", "sq"):
+				kind = "str"
+			elif kind == "word" and value.lower() in KEYWORDS:
+				kind, value = "kw", value.lower()
+			self.tokens.append((kind, value))
+		self.pos = 0
+
+	def _peek(self) -> Tuple[str, str]:
+		return self.tokens[self.pos] if self.pos < len(self.tokens) else ("end", "")
+
+	def _next(self) -> Tuple[str, str]:
+		token = self._peek()
+		self.pos += 1
+		return token
+
+	def parse(self) -> Any:
+		node = self._or()
+		if self._peek()[0] != "end":
+			raise QueryError(f"Token inesperado: {self._peek()[1]!r}")
+		return node
+
+	def _or(self) -> Any:
+		operands = [self._and()]
+		while self._peek() == ("kw", "or"):
+			self._next()
+			operands.append(self._and())
+		return operands[0] if len(operands) == 1 else BoolOp("or", operands)
+
+	def _and(self) -> Any:
+		operands = [self._unary()]
+		while self._peek() == ("kw", "and"):
+			self._next()
+			operands.append(self._unary())
+		return operands[0] if len(operands) == 1 else BoolOp("and", operands)
+
+	def _unary(self) -> Any:
+		kind, value = self._next()
+		if (kind, value) == ("kw", "not"):
+			return Not(self._unary())
+		if (kind, value) == ("paren", "("):
+			node = self._or()
+			if self._next() != ("paren", ")"):
+				raise QueryError("Parêntese ')' esperado")
+			return node
+		if kind != "word":
+			raise QueryError(f"Campo esperado, encontrado {value!r}")
+		op_kind, op = self._next()
+		if op_kind != "op":
+			raise QueryError(f"Operador (=, !=, ~, !~) esperado após {value!r}")
+		value_kind, operand = self._next()
+		if value_kind not in ("word", "str"):
+			raise QueryError(f"Valor esperado após {value}{op}")
+		return Compare(value, op, operand)
+
+
+class CatalogQuery:
+	"""Consulta compilada; use `compile_query`."""
+
+	def __init__(self, text: str) -> None:
+		self.text = text
+		self.node = _Parser(text).parse()
+
+	def matches(self, name: str, meta: Dict[str, Any]) -> bool:
+		return self.node.matches(name, meta)
+
+	def select(self, store: "JsonCatalogStore") -> Set[str]:
+		return self.node.select(store, set(store.names()))
+
+	def to_sql(self) -> Optional[Sql]:
+		return self.node.to_sql()
+
+
+def compile_query(text: str) -> CatalogQuery:
+	return CatalogQuery(text)
+
+
+def quote(value: str) -> str:
+	"""Cita um valor para ser embutido numa consulta.
+
+	A linguagem não tem escape dentro de aspas: um valor com aspas simples e duplas não
+	pode ser citado e é recusado.
+	"""
+	if '"' not in value:
+		return f'"{value}"'
+	if "'" not in value:
+		return f"'{value}'"
+	raise QueryError(f"Valor com aspas simples e duplas não pode ser usado numa consulta: {value!r}")
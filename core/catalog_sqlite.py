@@ -0,0 +1,205 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import sqlite3
+from core.catalog import JsonCatalogStore
+from core.catalog_query import CatalogQuery
+
+
+# Campos com coluna própria; demais chaves ficam em `extra` (JSON)
+COLUMNS = ("category", "description", "required", "sensitive", "min_length", "pattern", "default_dev", "default_prod")
+BOOL_COLUMNS = {"required", "sensitive"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS variables (
+	name TEXT PRIMARY KEY,
+	category TEXT,
+	description TEXT,
+	required INTEGER,
+	sensitive INTEGER,
+	min_length INTEGER,
+	pattern TEXT,
+	default_dev TEXT,
+	default_prod TEXT,
+	extra TEXT
+);
+CREATE TABLE IF NOT EXISTS paths (
+	id INTEGER PRIMARY KEY,
+	path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS detections (
+	name TEXT NOT NULL REFERENCES variables(name) ON DELETE CASCADE,
+	path_id INTEGER NOT NULL REFERENCES paths(id),
+	position INTEGER NOT NULL,
+	PRIMARY KEY (name, path_id)
+);
+CREATE INDEX IF NOT EXISTS idx_variables_category ON variables(category);
+-- Mesma expressão gerada por core.catalog_query para category=...
+CREATE INDEX IF NOT EXISTS idx_variables_category_ci ON variables(lower(coalesce(CAST(category AS TEXT), '')));
+CREATE INDEX IF NOT EXISTS idx_variables_sensitive ON variables(sensitive);
+CREATE INDEX IF NOT EXISTS idx_variables_required ON variables(required);
+CREATE INDEX IF NOT EXISTS idx_detections_path ON detections(path_id);
+"""
+
+
+def _to_column(key: str, value: Any) -> Any:
+	if key in BOOL_COLUMNS and value is not None:
+		return int(bool(value))
+	return value
+
+
+class SqliteCatalogStore:
+	"""Catálogo em SQLite: leituras filtradas e atualizações tocam apenas as linhas afetadas."""
+
+	def __init__(self, path: Path) -> None:
+		self.path = path
+		path.parent.mkdir(parents=True, exist_ok=True)
+		self.conn = sqlite3.connect(str(path))
+		self.conn.execute("PRAGMA foreign_keys = ON")
+		self.conn.executescript(SCHEMA)
+		self._paths_dirty = False
+
+	def __contains__(self, name: str) -> bool:
+		return self.conn.execute("SELECT 1 FROM variables WHERE name = ?", (name,)).fetchone() is not None
+
+	def __len__(self) -> int:
+		return self.conn.execute("SELECT COUNT(*) FROM variables").fetchone()[0]
+
+	def names(self) -> List[str]:
+		return [row[0] for row in self.conn.execute("SELECT name FROM variables ORDER BY rowid")]
+
+	def _detected_in(self, names: Optional[List[str]] = None) -> Dict[str, List[str]]:
+		sql = "SELECT d.name, p.path FROM detections d JOIN paths p ON p.id = d.path_id"
+		params: Tuple[Any, ...] = ()
+		if names is not None:
+			sql += f" WHERE d.name IN ({','.join('?' * len(names))})"
+			params = tuple(names)
+		result: Dict[str, List[str]] = {}
+		for name, path in self.conn.execute(sql + " ORDER BY d.name, d.position", params):
+			result.setdefault(name, []).append(path)
+		return result
+
+	def _rows(self, where: str = "", params: Tuple[Any, ...] = ()) -> Iterator[Tuple[str, Dict[str, Any]]]:
+		cursor = self.conn.execute(
+			f"SELECT name, {', '.join(COLUMNS)}, extra FROM variables {where} ORDER BY rowid", params
+		)
+		rows = cursor.fetchall()
+		detected = self._detected_in([r[0] for r in rows]) if len(rows) < 500 else self._detected_in()
+		for row in rows:
+			meta: Dict[str, Any] = {}
+			for key, value in zip(COLUMNS, row[1:-1]):
+				if value is None:
+					continue
+				meta[key] = bool(value) if key in BOOL_COLUMNS else value
+			if row[-1]:
+				meta.update((k, v) for k, v in json.loads(row[-1]).items() if v is not None)
+			if row[0] in detected:
+				meta["detected_in"] = detected[row[0]]
+			yield row[0], meta
+
+	def get(self, name: str) -> Optional[Dict[str, Any]]:
+		for _, meta in self._rows("WHERE name = ?", (name,)):
+			return meta
+		return None
+
+	def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+		return self._rows()
+
+	def query_names(self, query: CatalogQuery) -> List[str]:
+		sql = query.to_sql()
+		if sql is None:
+			return [name for name, meta in self._rows() if query.matches(name, meta)]
+		return [row[0] for row in self.conn.execute(f"SELECT name FROM variables WHERE {sql[0]} ORDER BY rowid", sql[1])]
+
+	def query(self, query: CatalogQuery) -> Iterator[Tuple[str, Dict[str, Any]]]:
+		"""Consulta traduzida para WHERE; campos sem coluna caem no predicado em Python."""
+		sql = query.to_sql()
+		if sql is None:
+			return ((n, m) for n, m in self._rows() if query.matches(n, m))
+		return self._rows(f"WHERE {sql[0]}", tuple(sql[1]))
+
+	def _set_detected_in(self, name: str, paths: Iterable[str]) -> None:
+		self._paths_dirty = True
+		self.conn.execute("DELETE FROM detections WHERE name = ?", (name,))
+		rows = []
+		for position, path in enumerate(dict.fromkeys(paths)):
+			self.conn.execute("INSERT OR IGNORE INTO paths(path) VALUES (?)", (path,))
+			path_id = self.conn.execute("SELECT id FROM paths WHERE path = ?", (path,)).fetchone()[0]
+			rows.append((name, path_id, position))
+		self.conn.executemany("INSERT INTO detections(name, path_id, position) VALUES (?, ?, ?)", rows)
+
+	def put(self, name: str, meta: Dict[str, Any]) -> None:
+		extra = {k: v for k, v in meta.items() if k not in COLUMNS and k != "detected_in"}
+		values = [_to_column(k, meta.get(k)) for k in COLUMNS]
+		self.conn.execute(
+			f"INSERT INTO variables(name, {', '.join(COLUMNS)}, extra) VALUES ({', '.join('?' * (len(COLUMNS) + 2))}) "
+			f"ON CONFLICT(name) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in COLUMNS)}, extra = excluded.extra",
+			(name, *values, json.dumps(extra) if extra else None),
+		)
+		self._set_detected_in(name, meta.get("detected_in") or [])
+
+	def update(self, name: str, fields: Dict[str, Any]) -> None:
+		self.update_many([name], fields)
+
+	def update_many(self, names: List[str], fields: Dict[str, Any]) -> None:
+		column_fields = {k: v for k, v in fields.items() if k in COLUMNS}
+		other = {k: v for k, v in fields.items() if k not in COLUMNS}
+		for name in names:
+			self.conn.execute("INSERT OR IGNORE INTO variables(name) VALUES (?)", (name,))
+		if column_fields:
+			assignments = ", ".join(f"{k} = ?" for k in column_fields)
+			values = [_to_column(k, v) for k, v in column_fields.items()]
+			self.conn.executemany(
+				f"UPDATE variables SET {assignments} WHERE name = ?",
+				[(*values, name) for name in names],
+			)
+		if not other:
+			return
+		for name in names:
+			if "detected_in" in other:
+				self._set_detected_in(name, other["detected_in"] or [])
+			rest = {k: v for k, v in other.items() if k != "detected_in"}
+			if rest:
+				row = self.conn.execute("SELECT extra FROM variables WHERE name = ?", (name,)).fetchone()
+				extra = json.loads(row[0]) if row and row[0] else {}
+				extra.update(rest)
+				self.conn.execute("UPDATE variables SET extra = ? WHERE name = ?", (json.dumps(extra), name))
+
+	def delete(self, name: str) -> None:
+		self._paths_dirty = True
+		self.conn.execute("DELETE FROM variables WHERE name = ?", (name,))
+
+	def commit(self) -> None:
+		if self._paths_dirty:
+			# Caminhos que deixaram de ser referenciados
+			self.conn.execute("DELETE FROM paths WHERE id NOT IN (SELECT DISTINCT path_id FROM detections)")
+			self._paths_dirty = False
+		self.conn.commit()
+
+	def rollback(self) -> None:
+		self.conn.rollback()
+		self._paths_dirty = False
+
+	def compact(self) -> int:
+		self.commit()
+		self.conn.execute("VACUUM")
+		return len(self)
+
+	def close(self) -> None:
+		self.conn.close()
+
+	def import_json(self, path: Path) -> int:
+		source = JsonCatalogStore(path)
+		for name, meta in source.items():
+			self.put(name, meta)
+		self.commit()
+		return len(source)
+
+	def export_json(self, path: Path) -> int:
+		target = JsonCatalogStore(path)
+		for name in target.names():
+			target.delete(name)
+		for name, meta in self.items():
+			target.put(name, meta)
+		return target.compact()
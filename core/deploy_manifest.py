@@ -0,0 +1,53 @@
+from __future__ import annotations
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+from utils.filesystem import atomic_write
+
+
+MANIFEST_FILE = Path(".envsecure/deploy_manifest.json")
+MANIFEST_VERSION = 1
+
+
+def content_digest(data: bytes) -> str:
+	return hashlib.sha256(data).hexdigest()
+
+
+def entry_key(environment: str, target: str) -> str:
+	return f"{environment}|{target}"
+
+
+class DeployManifest:
+	"""Hashes do último deploy por (ambiente, alvo): template, segredos e saída renderizada."""
+
+	def __init__(self, path: Path = MANIFEST_FILE) -> None:
+		self.path = path
+		self.entries: Dict[str, Dict[str, Any]] = {}
+		self.dirty = False
+
+	def load(self) -> "DeployManifest":
+		if self.path.exists():
+			try:
+				data = json.loads(self.path.read_text())
+			except (OSError, ValueError):
+				data = {}
+			if data.get("version") == MANIFEST_VERSION:
+				self.entries = data.get("entries", {})
+		return self
+
+	def get(self, environment: str, target: str) -> Optional[Dict[str, Any]]:
+		return self.entries.get(entry_key(environment, target))
+
+	def update(self, environment: str, target: str, entry: Dict[str, Any]) -> None:
+		key = entry_key(environment, target)
+		if self.entries.get(key) != entry:
+			self.entries[key] = entry
+			self.dirty = True
+
+	def save(self) -> None:
+		if not self.dirty:
+			return
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		atomic_write(self.path, json.dumps({"version": MANIFEST_VERSION, "entries": self.entries}, indent=2, sort_keys=True))
+		self.dirty = False
@@ -0,0 +1,125 @@
+"""Parser único de arquivos .env (templates .safe e secrets.<env>).
+
+Suporta comentários, prefixo ``export``, valores entre aspas simples (literais) ou duplas
+(com escapes ``\\n``, ``\\t``, ``\\r``, ``\\"``, ``\\\\``), valores multilinha entre aspas e
+comentário inline ``  # ...`` em valores sem aspas. Linhas sem ``=`` viram chave com valor vazio.
+
+`load_env` devolve um mapeamento imutável (ordem do arquivo preservada) e mantém cache por
+(caminho, mtime_ns, tamanho): cada arquivo é lido e analisado uma vez por execução, não uma
+vez por trecho de código que precisa dele.
+"""
+from __future__ import annotations
+import os
+import re
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Tuple
+
+
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\", "$": "$"}
+EXPORT_RE = re.compile(r"export\s+")
+INLINE_COMMENT_RE = re.compile(r"\s+#.*$")
+# Valores que precisam de aspas para serem relidos iguais
+NEEDS_QUOTES_RE = re.compile(r"""[\r\n]|\s#|^\s|\s$|^["']""")
+
+EnvMapping = Mapping[str, str]
+
+_cache: Dict[str, Tuple[Tuple[int, int], EnvMapping]] = {}
+
+
+def _double_quoted(text: str, start: int) -> Tuple[str, int]:
+	"""Lê um valor entre aspas duplas a partir de `start` (após a aspa); retorna (valor, fim)."""
+	out: List[str] = []
+	i = start
+	while i < len(text):
+		ch = text[i]
+		if ch == "\\" and i + 1 < len(text):
+			nxt = text[i + 1]
+			out.append(ESCAPES.get(nxt, "\\" + nxt))
+			i += 2
+			continue
+		if ch == '"':
+			return "".join(out), i + 1
+		out.append(ch)
+		i += 1
+	raise ValueError("Aspas duplas não fechadas")
+
+
+def iter_env(text: str) -> Iterator[Tuple[str, str]]:
+	"""Itera (chave, valor) na ordem do texto; chaves repetidas aparecem mais de uma vez."""
+	pos = 0
+	length = len(text)
+	while pos < length:
+		end = text.find("\n", pos)
+		if end == -1:
+			end = length
+		line = text[pos:end].strip()
+		next_pos = end + 1
+		if not line or line.startswith("#"):
+			pos = next_pos
+			continue
+		m = EXPORT_RE.match(line)
+		if m:
+			line = line[m.end():]
+		key, sep, rest = line.partition("=")
+		key = key.strip()
+		if not sep:
+			yield key, ""
+			pos = next_pos
+			continue
+		rest = rest.lstrip()
+		if rest[:1] in ("'", '"'):
+			# Valor entre aspas pode continuar nas linhas seguintes: reanalisa a partir do texto bruto
+			raw_start = text.index(rest[0], text.index("=", pos)) + 1
+			if rest[0] == '"':
+				value, close = _double_quoted(text, raw_start)
+			else:
+				close = text.find("'", raw_start)
+				if close == -1:
+					raise ValueError(f"Aspas simples não fechadas em {key}")
+				value, close = text[raw_start:close], close + 1
+			line_end = text.find("\n", close)
+			next_pos = length if line_end == -1 else line_end + 1
+			yield key, value
+		else:
+			yield key, INLINE_COMMENT_RE.sub("", rest).strip()
+		pos = next_pos
+
+
+def parse_env(text: str) -> EnvMapping:
+	values: Dict[str, str] = {}
+	for key, value in iter_env(text):
+		values[key] = value
+	return MappingProxyType(values)
+
+
+def load_env(path: Path) -> EnvMapping:
+	"""Lê e analisa `path`, reaproveitando o resultado enquanto (mtime_ns, tamanho) não mudar."""
+	st = os.stat(path)
+	stamp = (st.st_mtime_ns, st.st_size)
+	cache_key = os.path.abspath(path)
+	hit = _cache.get(cache_key)
+	if hit is not None and hit[0] == stamp:
+		return hit[1]
+	try:
+		parsed = parse_env(Path(path).read_text())
+	except ValueError as e:
+		raise ValueError(f"{path}: {e}") from None
+	_cache[cache_key] = (stamp, parsed)
+	return parsed
+
+
+def clear_cache() -> None:
+	_cache.clear()
+
+
+def format_value(value: str) -> str:
+	"""Serializa um valor para .env; usa aspas duplas só quando o valor cru seria relido diferente."""
+	if not NEEDS_QUOTES_RE.search(value):
+		return value
+	escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+	return f'"{escaped}"'
+
+
+def format_env(values: Mapping[str, str]) -> str:
+	return "".join(f"{key}={format_value(value)}\n" for key, value in values.items())
@@ -0,0 +1,127 @@
+"""Interpolação de variáveis: ``${NOME}`` e ``${NOME:-padrão}`` (``$$`` = ``$`` literal).
+
+`Interpolator` analisa cada valor uma única vez, monta o grafo de dependências entre chaves e
+resolve em ordem topológica com memoização (cada chave é resolvida no máximo uma vez; custo
+linear no tamanho total dos valores). Ciclos geram `InterpolationCycleError` com o caminho.
+`update` troca o valor bruto de uma chave e invalida só as chaves que dependem dela.
+"""
+from __future__ import annotations
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+
+REF_RE = re.compile(r"\$\$|\$\{([A-Za-z_][A-Za-z0-9_]*)(?::-([^}]*))?\}")
+
+# Segmento: texto literal ou (nome, padrão) de uma referência
+Segment = Union[str, Tuple[str, Optional[str]]]
+
+
+class InterpolationCycleError(ValueError):
+	def __init__(self, cycle: List[str]) -> None:
+		self.cycle = cycle
+		super().__init__("Referência circular: " + " -> ".join(cycle))
+
+
+def parse_value(value: str) -> List[Segment]:
+	segments: List[Segment] = []
+	pos = 0
+	for m in REF_RE.finditer(value):
+		if m.start() > pos:
+			segments.append(value[pos:m.start()])
+		if m.group(0) == "$$":
+			segments.append("$")
+		else:
+			segments.append((m.group(1), m.group(2)))
+		pos = m.end()
+	if pos < len(value):
+		segments.append(value[pos:])
+	return segments
+
+
+class Interpolator:
+	"""Grafo de dependências sobre um conjunto de valores brutos."""
+
+	def __init__(self, values: Mapping[str, str]) -> None:
+		self._segments: Dict[str, List[Segment]] = {}
+		self._deps: Dict[str, Set[str]] = {}
+		self._dependents: Dict[str, Set[str]] = {}
+		self._resolved: Dict[str, str] = {}
+		# Referências sem valor definido (resolvidas como vazio ou pelo padrão)
+		self.missing: Set[str] = set()
+		for name, value in values.items():
+			self._set(name, value)
+
+	def _set(self, name: str, value: str) -> None:
+		for dep in self._deps.get(name, ()):
+			self._dependents[dep].discard(name)
+		segments = parse_value(value)
+		deps = {seg[0] for seg in segments if isinstance(seg, tuple)}
+		self._segments[name] = segments
+		self._deps[name] = deps
+		for dep in deps:
+			self._dependents.setdefault(dep, set()).add(name)
+
+	def _render(self, name: str) -> str:
+		parts: List[str] = []
+		for seg in self._segments[name]:
+			if isinstance(seg, str):
+				parts.append(seg)
+				continue
+			ref, default = seg
+			if ref in self._segments:
+				value = self._resolved[ref]
+				parts.append(value if value or default is None else default)
+			else:
+				self.missing.add(ref)
+				parts.append(default or "")
+		return "".join(parts)
+
+	def _resolve_from(self, root: str) -> None:
+		# DFS iterativa (sem limite de recursão) em pós-ordem; `path` é a pilha cinza para detectar ciclos
+		if root in self._resolved or root not in self._segments:
+			return
+		stack: List[Tuple[str, List[str]]] = [(root, sorted(self._deps[root]))]
+		on_path: Dict[str, int] = {root: 0}
+		path: List[str] = [root]
+		while stack:
+			name, pending = stack[-1]
+			while pending:
+				dep = pending.pop()
+				if dep in self._resolved or dep not in self._segments:
+					continue
+				if dep in on_path:
+					raise InterpolationCycleError(path[on_path[dep]:] + [dep])
+				on_path[dep] = len(path)
+				path.append(dep)
+				stack.append((dep, sorted(self._deps[dep])))
+				break
+			else:
+				self._resolved[name] = self._render(name)
+				stack.pop()
+				path.pop()
+				del on_path[name]
+
+	def resolve(self, names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+		"""Valores resolvidos de `names` (padrão: todas as chaves), na ordem pedida."""
+		names = list(self._segments) if names is None else list(names)
+		for name in names:
+			self._resolve_from(name)
+		return {name: self._resolved.get(name, "") for name in names}
+
+	def update(self, name: str, value: str) -> Set[str]:
+		"""Troca o valor bruto de `name`; retorna as chaves invalidadas (ela e seus dependentes)."""
+		self._set(name, value)
+		invalidated: Set[str] = set()
+		queue = [name]
+		while queue:
+			current = queue.pop()
+			if current in invalidated:
+				continue
+			invalidated.add(current)
+			self._resolved.pop(current, None)
+			queue.extend(self._dependents.get(current, ()))
+		return invalidated
+
+
+def interpolate(values: Mapping[str, str], names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+	return Interpolator(values).resolve(names)
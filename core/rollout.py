@@ -0,0 +1,258 @@
+"""Rollout em lotes de um .env renderizado para uma frota de `DeployTarget`.
+
+Os alvos são divididos em lotes (``--batch-size 10`` ou ``25%``). Cada lote é enviado com no
+máximo ``max_in_flight`` conexões simultâneas; depois dele roda o health check (um hook
+assíncrono, ex. um comando local) e, se houver, a pausa antes do próximo. O rollout é abortado
+quando a fração de alvos com falha passa de ``abort_ratio`` ou o health check falha.
+
+O estado (lotes concluídos + resultados por alvo) é gravado após cada lote; com ``resume`` o
+rollout continua do primeiro lote não concluído, desde que o plano (conteúdo + alvos + lotes)
+seja o mesmo. O I/O de SSH (paramiko, bloqueante) roda em threads, com as conexões do `SSHPool`.
+"""
+from __future__ import annotations
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from core.scan_cache import file_digest
+from models.environment import DeployTarget
+from utils.filesystem import atomic_write
+from utils.ssh import DEFAULT_TIMEOUT, RemoteStat, SSHConfig, SSHPool, Transfer, format_target, parse_target
+
+
+STATE_DIR = Path(".envsecure/rollout")
+STATE_VERSION = 1
+
+HealthCheck = Callable[[int, List[DeployTarget]], Awaitable[bool]]
+
+
+class RolloutError(ValueError):
+	pass
+
+
+@dataclass(frozen=True)
+class RolloutOptions:
+	batch_size: str = "10%"
+	max_in_flight: int = 8
+	pause: float = 0.0
+	abort_ratio: float = 0.0
+	check: str = "stat"
+	timeout: float = DEFAULT_TIMEOUT
+
+
+@dataclass
+class HostResult:
+	target: str
+	batch: int
+	seconds: float
+	error: Optional[str] = None
+	skipped: bool = False
+	remote_size: Optional[int] = None
+	remote_mtime: Optional[int] = None
+
+
+@dataclass
+class RolloutReport:
+	batches: int
+	completed: int = 0
+	aborted: Optional[str] = None
+	results: List[HostResult] = field(default_factory=list)
+
+	@property
+	def failed(self) -> List[HostResult]:
+		return [r for r in self.results if r.error is not None]
+
+
+def target_from_spec(spec: str, key_file: Optional[str] = None) -> DeployTarget:
+	"""'user@host[:porta]:/path' (ssh) ou 'local:<caminho>'."""
+	if spec.startswith("local:"):
+		return DeployTarget("local", target_path=spec[len("local:"):])
+	config, path = parse_target(spec, key_file)
+	return DeployTarget("ssh", config.host, config.user, key_file, path, config.port)
+
+
+def load_targets(path: Path, key_file: Optional[str] = None) -> List[DeployTarget]:
+	"""Um alvo por linha; linhas vazias e comentários (#) são ignorados."""
+	targets = []
+	for line in path.read_text().splitlines():
+		line = line.strip()
+		if line and not line.startswith("#"):
+			targets.append(target_from_spec(line, key_file))
+	return targets
+
+
+def ssh_config(target: DeployTarget, timeout: float = DEFAULT_TIMEOUT) -> SSHConfig:
+	return SSHConfig(target.host or "", target.user or "", target.key_file, target.port, timeout)
+
+
+def target_label(target: DeployTarget) -> str:
+	"""Chave do alvo no manifest de deploy ("ssh:..." / "local:...")."""
+	if target.type == "ssh":
+		return f"ssh:{format_target(ssh_config(target), target.target_path)}"
+	return f"{target.type}:{target.target_path}"
+
+
+def batches(targets: List[DeployTarget], size: str) -> List[List[DeployTarget]]:
+	"""Divide em lotes de `size` alvos ("10") ou `size`% da frota ("25%"), arredondando para cima."""
+	try:
+		if size.endswith("%"):
+			count = math.ceil(len(targets) * float(size[:-1]) / 100)
+		else:
+			count = int(size)
+	except ValueError:
+		raise RolloutError(f"Tamanho de lote inválido: {size!r}") from None
+	count = max(1, count)
+	return [targets[i:i + count] for i in range(0, len(targets), count)]
+
+
+def command_health_check(command: str, timeout: Optional[float] = None) -> HealthCheck:
+	"""Hook que roda `command` localmente após cada lote; sucesso = código de saída 0.
+
+	O comando recebe ENVSECURE_ROLLOUT_BATCH (número do lote, a partir de 1) e
+	ENVSECURE_ROLLOUT_HOSTS (hosts/caminhos do lote separados por espaço).
+	"""
+
+	async def check(batch: int, targets: List[DeployTarget]) -> bool:
+		env = dict(os.environ)
+		env["ENVSECURE_ROLLOUT_BATCH"] = str(batch + 1)
+		env["ENVSECURE_ROLLOUT_HOSTS"] = " ".join(t.host or t.target_path for t in targets)
+		proc = await asyncio.create_subprocess_shell(command, env=env)
+		try:
+			return await asyncio.wait_for(proc.wait(), timeout) == 0
+		except asyncio.TimeoutError:
+			proc.kill()
+			await proc.wait()
+			return False
+
+	return check
+
+
+class Rollout:
+	"""Envia `local_path` (conteúdo com hash `digest`) a `targets`, lote a lote."""
+
+	def __init__(
+		self,
+		targets: List[DeployTarget],
+		local_path: Path,
+		options: RolloutOptions = RolloutOptions(),
+		health_check: Optional[HealthCheck] = None,
+		state_path: Optional[Path] = None,
+		expected: Optional[Dict[str, RemoteStat]] = None,
+		pool: Optional[SSHPool] = None,
+	) -> None:
+		self.targets = targets
+		self.local_path = local_path
+		self.digest = file_digest(str(local_path))
+		self.size = local_path.stat().st_size
+		self.options = options
+		self.health_check = health_check
+		self.state_path = state_path
+		# Stat remoto registrado no manifest por alvo (modo "stat")
+		self.expected = expected or {}
+		self.pool = pool
+		self.batches = batches(targets, options.batch_size)
+
+	def plan_id(self) -> str:
+		h = hashlib.sha256(self.digest.encode())
+		for number, batch in enumerate(self.batches):
+			h.update(f"|{number}:".encode() + ",".join(target_label(t) for t in batch).encode())
+		return h.hexdigest()
+
+	def _load_state(self) -> Optional[Dict]:
+		if self.state_path is None or not self.state_path.exists():
+			return None
+		try:
+			state = json.loads(self.state_path.read_text())
+		except (OSError, ValueError):
+			return None
+		if state.get("version") != STATE_VERSION or state.get("plan") != self.plan_id():
+			raise RolloutError(f"Estado em {self.state_path} é de outro rollout (conteúdo, alvos ou lotes mudaram)")
+		return state
+
+	def _save_state(self, report: RolloutReport) -> None:
+		if self.state_path is None:
+			return
+		self.state_path.parent.mkdir(parents=True, exist_ok=True)
+		state = {
+			"version": STATE_VERSION,
+			"plan": self.plan_id(),
+			"completed": report.completed,
+			"aborted": report.aborted,
+			"results": [asdict(r) for r in report.results],
+		}
+		atomic_write(self.state_path, json.dumps(state, indent=2))
+
+	def _deploy(self, target: DeployTarget, batch: int, pool: SSHPool) -> HostResult:
+		# Roda numa thread do executor; mede só o trabalho, não a espera pelo semáforo
+		label = target_label(target)
+		start = time.perf_counter()
+		try:
+			if target.type == "ssh":
+				transfer = Transfer(
+					ssh_config(target, self.options.timeout), str(self.local_path), target.target_path,
+					self.digest, self.size, self.expected.get(label),
+				)
+				same, remote = pool.unchanged(transfer, self.options.check)
+				if not same:
+					remote = pool.put(transfer.config, transfer.local_path, transfer.remote_path)
+			elif target.type == "local":
+				path = Path(target.target_path)
+				same = path.exists() and file_digest(str(path)) == self.digest
+				if not same:
+					atomic_write(path, self.local_path.read_bytes())
+				remote = None
+			else:
+				raise RolloutError(f"Tipo de alvo não suportado: {target.type}")
+		except Exception as e:  # um alvo com problema conta para o abort_ratio, não derruba o lote
+			if target.type == "ssh" and not pool.alive(ssh_config(target, self.options.timeout)):
+				pool.discard(ssh_config(target, self.options.timeout))
+			return HostResult(label, batch, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+		size, mtime = remote if remote is not None else (None, None)
+		return HostResult(label, batch, time.perf_counter() - start, skipped=same, remote_size=size, remote_mtime=mtime)
+
+	async def run(self, resume: bool = False) -> RolloutReport:
+		report = RolloutReport(len(self.batches))
+		state = self._load_state() if resume else None
+		if state is not None:
+			report.completed = state["completed"]
+			report.results = [HostResult(**r) for r in state["results"] if r["batch"] < report.completed]
+
+		loop = asyncio.get_running_loop()
+		semaphore = asyncio.Semaphore(self.options.max_in_flight)
+		pool = self.pool or SSHPool()
+		executor = ThreadPoolExecutor(max_workers=self.options.max_in_flight)
+
+		async def deploy(target: DeployTarget, batch: int) -> HostResult:
+			async with semaphore:
+				return await loop.run_in_executor(executor, self._deploy, target, batch, pool)
+
+		try:
+			for number in range(report.completed, len(self.batches)):
+				batch = self.batches[number]
+				report.results.extend(await asyncio.gather(*(deploy(t, number) for t in batch)))
+				failed = len(report.failed)
+				if failed and failed / len(report.results) > self.options.abort_ratio:
+					report.aborted = f"{failed} de {len(report.results)} alvos falharam (limite {self.options.abort_ratio:.0%})"
+				elif self.health_check is not None and not await self.health_check(number, batch):
+					report.aborted = f"health check falhou após o lote {number + 1}"
+				if report.aborted:
+					# Lote não conta como concluído: o resume recomeça por ele
+					self._save_state(report)
+					return report
+				report.completed = number + 1
+				self._save_state(report)
+				if self.options.pause and report.completed < len(self.batches):
+					await asyncio.sleep(self.options.pause)
+		finally:
+			executor.shutdown(wait=True)
+			if self.pool is None:
+				pool.close()
+		if self.state_path is not None and self.state_path.exists():
+			self.state_path.unlink()
+		return report
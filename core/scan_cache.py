@@ -0,0 +1,105 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import json
+import os
+from utils.filesystem import atomic_write
+
+
+CACHE_FILE = Path(".envsecure/scan_cache.json")
+# Incrementar quando as regras de detecção mudarem, invalidando caches antigos
+CACHE_VERSION = 2
+
+
+def file_digest(path: str) -> str:
+	h = hashlib.sha256()
+	with open(path, "rb") as fh:
+		for chunk in iter(lambda: fh.read(1 << 20), b""):
+			h.update(chunk)
+	return h.hexdigest()
+
+
+def make_entry(
+	st: os.stat_result,
+	found: Dict[str, List[int]],
+	digest: Optional[str] = None,
+	with_lines: bool = False,
+) -> Dict[str, Any]:
+	entry: Dict[str, Any] = {
+		"size": st.st_size,
+		"mtime_ns": st.st_mtime_ns,
+		"ino": st.st_ino,
+		"vars": list(found),
+	}
+	if with_lines:
+		entry["lines"] = list(found.values())
+	if digest is not None:
+		entry["sha256"] = digest
+	return entry
+
+
+def entry_found(entry: Dict[str, Any]) -> Dict[str, List[int]]:
+	lines = entry.get("lines") or [[] for _ in entry["vars"]]
+	return dict(zip(entry["vars"], lines))
+
+
+def matches_stat(entry: Dict[str, Any], st: os.stat_result) -> bool:
+	return (
+		entry.get("size") == st.st_size
+		and entry.get("mtime_ns") == st.st_mtime_ns
+		and entry.get("ino") == st.st_ino
+	)
+
+
+class ScanCache:
+	"""Cache persistente do scan: caminho -> (fingerprint, variáveis encontradas)."""
+
+	def __init__(self, path: Path = CACHE_FILE) -> None:
+		self.path = path
+		self.entries: Dict[str, Dict[str, Any]] = {}
+		self.dirty = False
+
+	def load(self) -> "ScanCache":
+		if self.path.exists():
+			try:
+				data = json.loads(self.path.read_text())
+			except (OSError, ValueError):
+				data = {}
+			if data.get("version") == CACHE_VERSION:
+				self.entries = data.get("entries", {})
+		return self
+
+	def get(self, path: str) -> Optional[Dict[str, Any]]:
+		return self.entries.get(path)
+
+	def update(self, path: str, entry: Dict[str, Any]) -> None:
+		if self.entries.get(path) is not entry:
+			self.entries[path] = entry
+			self.dirty = True
+
+	def prune(self, seen: Iterable[str], root: Optional[Path] = None) -> int:
+		"""Remove entradas de arquivos sob `root` que não apareceram no último scan (ex.: apagados).
+
+		Entradas fora de `root` (outros sub-scans do mesmo repositório) são mantidas.
+		"""
+		keep = set(seen)
+		prefix = None
+		if root is not None:
+			prefix = os.path.join(os.path.abspath(root), "")
+		stale = [
+			p for p in self.entries
+			if p not in keep and (prefix is None or os.path.join(os.path.abspath(p), "").startswith(prefix))
+		]
+		for p in stale:
+			del self.entries[p]
+		if stale:
+			self.dirty = True
+		return len(stale)
+
+	def save(self) -> None:
+		if not self.dirty:
+			return
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		atomic_write(self.path, json.dumps({"version": CACHE_VERSION, "entries": self.entries}, separators=(",", ":")))
+		self.dirty = False
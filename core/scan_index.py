@@ -0,0 +1,107 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+import json
+import os
+from utils.filesystem import atomic_write
+
+
+INDEX_FILE = Path(".envsecure/scan_index.json")
+INDEX_VERSION = 1
+
+
+class ScanIndex:
+	"""Índice variável -> arquivos e arquivo -> variáveis (com linhas), atualizável por arquivo."""
+
+	def __init__(self) -> None:
+		self.by_var: Dict[str, List[str]] = {}
+		self.by_file: Dict[str, Dict[str, List[int]]] = {}
+
+	@classmethod
+	def from_variables(cls, variables: Dict[str, List[str]]) -> "ScanIndex":
+		index = cls()
+		for name, files in variables.items():
+			index.by_var[name] = list(files)
+			for path in files:
+				index.by_file.setdefault(path, {})[name] = []
+		return index
+
+	def remove_file(self, path: str) -> None:
+		for name in self.by_file.pop(path, {}):
+			files = self.by_var.get(name)
+			if files is None:
+				continue
+			files.remove(path)
+			if not files:
+				del self.by_var[name]
+
+	def update_file(self, path: str, found: Union[Mapping[str, List[int]], Iterable[str]]) -> None:
+		"""Substitui o que se sabe de `path`; aceita nomes ou nome -> linhas."""
+		self.remove_file(path)
+		if isinstance(found, Mapping):
+			entry = {name: list(lines) for name, lines in found.items()}
+		else:
+			entry = {name: [] for name in found}
+		if not entry:
+			return
+		self.by_file[path] = entry
+		for name in entry:
+			self.by_var.setdefault(name, []).append(path)
+
+	def files_under(self, directory: str) -> List[str]:
+		"""Chaves do índice abaixo de `directory`; compara caminhos absolutos ("." casa com "a.py")."""
+		prefix = os.path.join(os.path.abspath(directory), "")
+		return [p for p in self.by_file if os.path.abspath(p).startswith(prefix)]
+
+	def to_variables(self) -> Dict[str, List[str]]:
+		return {name: list(files) for name, files in self.by_var.items()}
+
+	def lookup_var(self, name: str) -> Dict[str, List[int]]:
+		return {path: self.by_file[path][name] for path in self.by_var.get(name, [])}
+
+	def resolve_file(self, path: str) -> Optional[str]:
+		"""Encontra a chave do índice para `path`, aceitando caminhos relativos ou absolutos."""
+		if path in self.by_file:
+			return path
+		normalized = str(Path(path))
+		if normalized in self.by_file:
+			return normalized
+		target = os.path.abspath(path)
+		for key in self.by_file:
+			if os.path.abspath(key) == target:
+				return key
+		return None
+
+	def save(self, path: Path = INDEX_FILE) -> None:
+		# Formato compacto: tabelas de arquivos e nomes + trincas [arquivo, nome, linhas]
+		files = list(self.by_file)
+		names = list(self.by_var)
+		file_ids = {f: i for i, f in enumerate(files)}
+		name_ids = {n: i for i, n in enumerate(names)}
+		hits = [
+			[file_ids[f], name_ids[n], lines]
+			for f, entry in self.by_file.items()
+			for n, lines in entry.items()
+		]
+		data = {"version": INDEX_VERSION, "files": files, "names": names, "hits": hits}
+		path.parent.mkdir(parents=True, exist_ok=True)
+		atomic_write(path, json.dumps(data, separators=(",", ":"), ensure_ascii=False), mode=None)
+
+	@classmethod
+	def load(cls, path: Path = INDEX_FILE) -> Optional["ScanIndex"]:
+		if not path.exists():
+			return None
+		data = json.loads(path.read_text())
+		if data.get("version") != INDEX_VERSION:
+			return None
+		index = cls()
+		files: List[str] = data["files"]
+		names: List[str] = data["names"]
+		# Preserva a ordem original das variáveis
+		for name in names:
+			index.by_var[name] = []
+		for file_id, name_id, lines in data["hits"]:
+			file, name = files[file_id], names[name_id]
+			index.by_file.setdefault(file, {})[name] = lines
+			index.by_var[name].append(file)
+		return index
@@ -1,27 +1,400 @@
 from pathlib import Path
+import fnmatch
+import json
+import mmap
+import os
 import re
-from typing import Dict, List
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Match, Optional, Set, TextIO, Tuple, TypeVar, Union
 
 
+Buffer = Union[bytes, bytearray, mmap.mmap]
+T = TypeVar("T")
+
+DEFAULT_GLOBS = ("*.py", "*.yml", "*.yaml", "*.json", "Dockerfile")
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+DEFAULT_EXCLUDES = (
+	".venv",
+	"venv",
+	".git",
+	"__pycache__",
+	"node_modules",
+	".mypy_cache",
+	".pytest_cache",
+	".tox",
+	"dist",
+	"build",
+	".envsecure",
+)
+
+
+# Padrões originais de três passadas (referência para benchmarks; o scan usa MATCHERS)
 PATTERNS = [
 	re.compile(r"os\.getenv\(['\"]([A-Z0-9_]+)['\"]\)"),
 	re.compile(r"\$\{?([A-Z0-9_]+)\}?"),
-	re.compile(r"ENV\s+([A-Z0-9_]+)"),
+	re.compile(r"ENV\s+([A-Z][A-Z0-9_]+)"),
 ]
 
+ENV_VAR_RE = re.compile(r"^[A-Z][A-Z0-9_]*$")
 
-def scan_paths(base: Path, globs: List[str]) -> Dict[str, List[str]]:
-	variables: Dict[str, List[str]] = {}
-	for pattern in globs:
-		for file in base.rglob(pattern):
-			if not file.is_file():
+# Motor de detecção: cada forma é guardada pelo literal que ela exige. O literal
+# é localizado com busca rápida de substring e a regex só roda se ele aparecer;
+# arquivos sem nenhum dos literais são descartados sem executar regex alguma.
+# As regexes já exigem nome iniciando por letra, dispensando validar cada achado.
+# Tudo opera sobre bytes, permitindo varrer o arquivo mapeado sem decodificá-lo.
+MATCHERS = (
+	(b"os.getenv(", re.compile(rb"os\.getenv\(['\"]([A-Z][A-Z0-9_]*)['\"]\)")),
+	(b"$", re.compile(rb"\$\{?([A-Z][A-Z0-9_]*)")),
+	(b"ENV", re.compile(rb"ENV\s+([A-Z][A-Z0-9_]+)")),
+)
+
+# Bytes iniciais inspecionados para detectar arquivos binários (presença de NUL)
+BINARY_SNIFF_SIZE = 8192
+# Arquivos acima deste tamanho são lidos em blocos em vez de mapeados por inteiro
+STREAM_THRESHOLD = 64 * 1024 * 1024
+CHUNK_SIZE = 4 * 1024 * 1024
+# Maior trecho que uma ocorrência pode ocupar antes da quebra de bloco (`ENV` + espaços/quebras
+# de linha em `ENV\s+NOME`): cada bloco repete até isso do final do anterior
+MAX_MATCH_SPAN = 4096
+
+
+def _find_raw(data: Buffer) -> Set[bytes]:
+	found: Set[bytes] = set()
+	for literal, regex in MATCHERS:
+		if data.find(literal) != -1:
+			found.update(regex.findall(data))
+	return found
+
+
+def find_variables(data: Buffer) -> Set[str]:
+	"""Detecta nomes de variáveis em bytes (ou mmap)."""
+	return {name.decode("ascii") for name in _find_raw(data)}
+
+
+def _count_newlines(data: Buffer, start: int, end: int) -> int:
+	if isinstance(data, (bytes, bytearray)):
+		return data.count(b"\n", start, end)
+	# mmap não tem count(): conta em janelas para não copiar o arquivo inteiro
+	total = 0
+	for offset in range(start, end, CHUNK_SIZE):
+		total += data[offset : min(offset + CHUNK_SIZE, end)].count(b"\n")
+	return total
+
+
+def find_variable_lines(data: Buffer, first_line: int = 1, skip_until: int = 0) -> Dict[str, List[int]]:
+	"""Como find_variables, mas devolve também as linhas (1-based) de cada ocorrência.
+
+	Ocorrências que terminam até `skip_until` (trecho já varrido) são ignoradas.
+	"""
+	hits: List[Tuple[int, bytes]] = []
+	for literal, regex in MATCHERS:
+		if data.find(literal) != -1:
+			hits.extend((m.start(), m.group(1)) for m in regex.finditer(data) if m.end() > skip_until)
+	hits.sort()
+	result: Dict[str, List[int]] = {}
+	line, last = first_line, 0
+	for pos, raw in hits:
+		line += _count_newlines(data, last, pos)
+		last = pos
+		lines = result.setdefault(raw.decode("ascii"), [])
+		if not lines or lines[-1] != line:
+			lines.append(line)
+	return result
+
+
+def _overlap(block: bytes) -> bytes:
+	# Até MAX_MATCH_SPAN bytes do fim do bloco, começando numa linha inteira quando possível
+	tail = block[-MAX_MATCH_SPAN:]
+	start = tail.find(b"\n") + 1
+	return tail[start:] if 0 < start < len(tail) else tail
+
+
+def _iter_blocks(fh: BinaryIO) -> Iterator[Tuple[bytes, int]]:
+	"""(bloco, tamanho do trecho repetido do bloco anterior no início dele).
+
+	Blocos são cortados na última quebra de linha, para não partir um nome ao meio, e começam
+	repetindo o final do anterior, para achar ocorrências que atravessam o corte.
+	"""
+	carry = b""
+	overlap = b""
+	while True:
+		chunk = fh.read(CHUNK_SIZE)
+		if not chunk:
+			break
+		buf = carry + chunk
+		cut = buf.rfind(b"\n") + 1
+		if cut == 0 and len(buf) < 4 * CHUNK_SIZE:
+			carry = buf
+			continue
+		if cut == 0:
+			cut = len(buf)
+		yield overlap + buf[:cut], len(overlap)
+		overlap = _overlap(buf[:cut])
+		carry = buf[cut:]
+	if carry:
+		yield overlap + carry, len(overlap)
+
+
+def _scan_stream(fh: BinaryIO) -> Set[bytes]:
+	found: Set[bytes] = set()
+	for block, _ in _iter_blocks(fh):
+		found |= _find_raw(block)
+	return found
+
+
+def _scan_stream_lines(fh: BinaryIO) -> Dict[str, List[int]]:
+	result: Dict[str, List[int]] = {}
+	line = 1
+	for block, repeated in _iter_blocks(fh):
+		first_line = line - block.count(b"\n", 0, repeated)
+		for name, lines in find_variable_lines(block, first_line, skip_until=repeated).items():
+			known = result.setdefault(name, [])
+			known.extend(n for n in lines if not known or n > known[-1])
+		line += block.count(b"\n", repeated)
+	return result
+
+
+def _scan_with(
+	path: Path,
+	max_file_size: Optional[int],
+	on_buffer: Callable[[Buffer], T],
+	on_stream: Callable[[BinaryIO], T],
+	empty: T,
+) -> T:
+	with open(path, "rb") as fh:
+		size = os.fstat(fh.fileno()).st_size
+		if size == 0 or (max_file_size is not None and size > max_file_size):
+			return empty
+		if b"\0" in fh.read(BINARY_SNIFF_SIZE):
+			return empty
+		fh.seek(0)
+		if size > STREAM_THRESHOLD:
+			return on_stream(fh)
+		try:
+			mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+		except (ValueError, OSError):
+			# Sistemas de arquivos sem suporte a mmap
+			return on_stream(fh)
+		with mm:
+			return on_buffer(mm)
+
+
+def scan_file(path: Path, max_file_size: Optional[int] = None) -> Set[str]:
+	"""Varre um arquivo sem decodificá-lo; ignora binários e arquivos acima de max_file_size."""
+	found = _scan_with(path, max_file_size, _find_raw, _scan_stream, set())
+	return {name.decode("ascii") for name in found}
+
+
+def scan_file_lines(path: Path, max_file_size: Optional[int] = None) -> Dict[str, List[int]]:
+	"""Como scan_file, incluindo as linhas de cada variável."""
+	return _scan_with(path, max_file_size, find_variable_lines, _scan_stream_lines, {})
+
+
+def _glob_matcher(globs: Iterable[str]) -> Callable[[str], Optional[Match[str]]]:
+	# Todos os globs viram uma única regex, casada contra o nome do arquivo
+	patterns = [fnmatch.translate(os.path.normcase(g)) for g in globs]
+	regex = re.compile("|".join(patterns) if patterns else "(?!)")
+	return lambda name: regex.match(os.path.normcase(name))
+
+
+def iter_files(
+	base: Path,
+	globs: Iterable[str] = DEFAULT_GLOBS,
+	exclude: Iterable[str] = DEFAULT_EXCLUDES,
+) -> Iterator[Path]:
+	"""Percorre a árvore uma única vez (os.scandir), podando diretórios excluídos.
+
+	Cada arquivo é emitido no máximo uma vez, na mesma ordem de os.walk(topdown=True).
+	Links simbólicos e arquivos especiais são ignorados.
+	"""
+	matches = _glob_matcher(globs)
+	excluded = set(exclude)
+	stack = [str(base)]
+	while stack:
+		current = stack.pop()
+		files: List[str] = []
+		subdirs: List[str] = []
+		try:
+			with os.scandir(current) as entries:
+				for entry in entries:
+					try:
+						if entry.is_dir(follow_symlinks=False):
+							if entry.name not in excluded:
+								subdirs.append(entry.path)
+						elif entry.is_file(follow_symlinks=False) and matches(entry.name):
+							files.append(entry.path)
+					except OSError:
+						continue
+		except OSError:
+			# Diretório inacessível
+			continue
+		for file_path in files:
+			yield Path(file_path)
+		stack.extend(reversed(subdirs))
+
+
+def select_files(
+	base: Path,
+	relpaths: Iterable[str],
+	globs: Iterable[str] = DEFAULT_GLOBS,
+	exclude: Iterable[str] = DEFAULT_EXCLUDES,
+) -> Iterator[Path]:
+	"""Aplica os mesmos filtros de iter_files a uma lista explícita de caminhos relativos."""
+	matches = _glob_matcher(globs)
+	excluded = set(exclude)
+	for rel in relpaths:
+		rel_path = Path(rel)
+		if excluded.intersection(rel_path.parts[:-1]) or not matches(rel_path.name):
+			continue
+		file_path = base / rel_path
+		if file_path.is_symlink() or not file_path.is_file():
+			continue
+		yield file_path
+
+
+def merge_scan(
+	previous: Dict[str, List[str]],
+	stale_paths: Set[str],
+	updates: Dict[str, List[str]],
+) -> Dict[str, List[str]]:
+	"""Remove de `previous` os caminhos em `stale_paths` e acrescenta o resultado parcial `updates`."""
+	merged: Dict[str, List[str]] = {}
+	for name, files in previous.items():
+		kept = [f for f in files if f not in stale_paths]
+		if kept:
+			merged[name] = kept
+	for name, files in updates.items():
+		merged.setdefault(name, []).extend(files)
+	return merged
+
+
+def _iter_json_object(fh: TextIO, chunk_size: int = 1 << 20) -> Iterator[Tuple[str, Any]]:
+	"""Lê um objeto JSON de nível superior par a par, sem carregar o documento inteiro.
+
+	A memória fica limitada ao maior valor individual (aqui, a lista de arquivos de uma variável).
+	"""
+	decoder = json.JSONDecoder()
+	buf = ""
+	pos = 0
+	eof = False
+
+	def fill() -> bool:
+		nonlocal buf, pos, eof
+		if eof:
+			return False
+		chunk = fh.read(chunk_size)
+		if not chunk:
+			eof = True
+			return False
+		buf = buf[pos:] + chunk
+		pos = 0
+		return True
+
+	def skip_ws() -> str:
+		nonlocal pos
+		while True:
+			while pos < len(buf) and buf[pos].isspace():
+				pos += 1
+			if pos < len(buf):
+				return buf[pos]
+			if not fill():
+				return ""
+
+	def decode() -> Any:
+		nonlocal pos
+		while True:
+			try:
+				value, end = decoder.raw_decode(buf, pos)
+			except ValueError:
+				if fill():
+					continue
+				raise
+			# Um número no fim do buffer pode estar truncado: garante mais contexto
+			if end == len(buf) and not eof and fill():
 				continue
-			content = file.read_text(errors="ignore")
-			for regex in PATTERNS:
-				for match in regex.findall(content):
-					name = match[0] if isinstance(match, tuple) else match
-					variables.setdefault(name, []).append(str(file))
-	return variables
+			pos = end
+			return value
+
+	if skip_ws() != "{":
+		raise ValueError("Esperado objeto JSON")
+	pos += 1
+	if skip_ws() == "}":
+		return
+	while True:
+		skip_ws()
+		key = decode()
+		if skip_ws() != ":":
+			raise ValueError("Esperado ':' no objeto JSON")
+		pos += 1
+		skip_ws()
+		yield key, decode()
+		sep = skip_ws()
+		pos += 1
+		if sep == "}":
+			return
+		if sep != ",":
+			raise ValueError("Esperado ',' ou '}' no objeto JSON")
+
+
+def iter_scan_groups(path: Path) -> Iterator[Tuple[str, List[str]]]:
+	"""Lê a saída de 'envsecure scan' como (variável, [arquivos]), em streaming.
+
+	Aceita o JSON agregado ({VAR: [arquivos]}) e o NDJSON ({"name", "file"} por linha); no NDJSON
+	linhas consecutivas da mesma variável formam um grupo (uma variável pode reaparecer depois).
+	Arquivo vazio (NDJSON de um scan sem ocorrências) é um scan vazio.
+	"""
+	with open(path, encoding="utf-8") as fh:
+		first = fh.readline()
+		while first and not first.strip():
+			first = fh.readline()
+		if not first:
+			return
+		try:
+			record = json.loads(first)
+		except ValueError:
+			record = None
+		if not (isinstance(record, dict) and "name" in record and "file" in record):
+			fh.seek(0)
+			for name, files in _iter_json_object(fh):
+				yield name, list(files)
+			return
+		name, files = record["name"], [record["file"]]
+		for line in fh:
+			if not line.strip():
+				continue
+			record = json.loads(line)
+			if record["name"] != name:
+				yield name, files
+				name, files = record["name"], []
+			files.append(record["file"])
+		yield name, files
 
 
+def iter_scan_hits(path: Path) -> Iterator[Tuple[str, str]]:
+	"""Lê a saída de 'envsecure scan' como pares (variável, arquivo)."""
+	for name, files in iter_scan_groups(path):
+		for file in files:
+			yield name, file
 
+
+def load_scan(path: Path) -> Dict[str, List[str]]:
+	variables: Dict[str, List[str]] = {}
+	for name, file in iter_scan_hits(path):
+		variables.setdefault(name, []).append(file)
+	return variables
+
+
+def scan_paths(
+	base: Path,
+	globs: Iterable[str] = DEFAULT_GLOBS,
+	exclude: Iterable[str] = DEFAULT_EXCLUDES,
+	max_file_size: Optional[int] = None,
+) -> Dict[str, List[str]]:
+	variables: Dict[str, List[str]] = {}
+	for file in iter_files(base, globs, exclude):
+		try:
+			found = scan_file(file, max_file_size)
+		except OSError:
+			continue
+		for name in sorted(found):
+			variables.setdefault(name, []).append(str(file))
+	return variables
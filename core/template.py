@@ -1,16 +1,26 @@
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Mapping
+from core.envfile import format_env, load_env
+from core.interpolate import Interpolator, parse_value
 
 
-def render_from_template(template_path: Path, variables: Dict[str, str]) -> str:
-	content = []
-	for line in template_path.read_text().splitlines():
-		if not line.strip() or line.strip().startswith('#'):
-			continue
-		name, sep, _ = line.partition('=')
-		value = variables.get(name.strip(), "")
-		content.append(f"{name}{sep}{value}")
-	return "\n".join(content) + "\n"
+def _derived(value: str) -> bool:
+	return any(isinstance(segment, tuple) for segment in parse_value(value))
 
 
+def render_values(template: Mapping[str, str], variables: Mapping[str, str], defaults: bool = False) -> Dict[str, str]:
+	"""Valores finais das chaves do template, com referências ${VAR} resolvidas.
 
+	Cada chave usa o valor de `variables` (segredos). Sem segredo ela sai vazia, como antes,
+	exceto quando o valor do template é derivado (tem ``${VAR}``, ex. ``DATABASE_URL``); padrões
+	literais do template (placeholders) só são usados com `defaults`. Só os valores do template
+	são interpolados (``$$`` vira ``$``): segredos são sempre literais e podem ser referenciados.
+	"""
+	values = {name: value if defaults or _derived(value) else "" for name, value in template.items()}
+	# `$$` é o escape de `$` literal do Interpolator
+	values.update((name, value.replace("$", "$$")) for name, value in variables.items())
+	return Interpolator(values).resolve(template)
+
+
+def render_from_template(template_path: Path, variables: Mapping[str, str], defaults: bool = False) -> str:
+	return format_env(render_values(load_env(template_path), variables, defaults))
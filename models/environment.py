@@ -9,6 +9,7 @@ class DeployTarget:
 	user: Optional[str] = None
 	key_file: Optional[str] = None
 	target_path: str = ".env"
+	port: int = 22
 
 
 @dataclass
@@ -1,9 +1,24 @@
-from dataclasses import dataclass, field
-from typing import List, Optional
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
 
 
+def _slotted(cls: type) -> type:
+	"""Backport de ``dataclass(slots=True)`` (Python 3.10+): recria a dataclass com __slots__."""
+	names = tuple(f.name for f in fields(cls))
+	namespace = {k: v for k, v in cls.__dict__.items() if k not in names and k not in ("__dict__", "__weakref__")}
+	namespace["__slots__"] = names
+	return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_slotted
 @dataclass
 class EnvironmentVariable:
+	"""Registro de uma variável do catálogo.
+
+	Dataclass com __slots__ (sem __dict__ por instância) porque catálogos grandes mantêm
+	milhares destes objetos em memória.
+	"""
+
 	name: str
 	category: str
 	description: str = ""
@@ -15,5 +30,9 @@ class EnvironmentVariable:
 	default_prod: Optional[str] = None
 	detected_in: List[str] = field(default_factory=list)
 
+	def to_dict(self) -> Dict[str, Any]:
+		return {name: getattr(self, name) for name in self.__slots__}
 
-
+	@classmethod
+	def from_dict(cls, data: Dict[str, Any]) -> "EnvironmentVariable":
+		return cls(**{k: v for k, v in data.items() if k in cls.__slots__})
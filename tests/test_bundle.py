@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+import pytest
+from core.bundle import BundleError, EnvBundle, build_bundle
+
+
+def test_bundle_roundtrip_and_lookup(tmp_path: Path) -> None:
+	values = {f"VAR_{i:04d}": f"valor {i}" for i in range(1000, 0, -1)}
+	values["MULTI"] = "a\nb"
+	path = tmp_path / "dev.envb"
+	path.write_bytes(build_bundle(values))
+	with EnvBundle(path) as bundle:
+		assert len(bundle) == len(values)
+		assert bundle["VAR_0500"] == "valor 500"
+		assert bundle["MULTI"] == "a\nb"
+		assert "NOPE" not in bundle
+		with pytest.raises(KeyError):
+			bundle["NOPE"]
+		assert list(bundle) == list(values)
+
+
+def test_encrypted_bundle_requires_right_key(tmp_path: Path) -> None:
+	key, other = os.urandom(32), os.urandom(32)
+	path = tmp_path / "prod.envb"
+	path.write_bytes(build_bundle({"API_KEY": "segredo-super-longo"}, key))
+	assert b"segredo" not in path.read_bytes()
+	with pytest.raises(BundleError):
+		EnvBundle(path)
+	assert EnvBundle(path, key)["API_KEY"] == "segredo-super-longo"
+	with pytest.raises(BundleError):
+		EnvBundle(path, other)["API_KEY"]
+
+
+def test_compile_then_deploy_from_bundle(tmp_path: Path, monkeypatch) -> None:
+	from click.testing import CliRunner
+	from cli.main import cli
+
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / ".envsecure" / "templates").mkdir(parents=True)
+	(tmp_path / ".envsecure" / "secrets").mkdir()
+	(tmp_path / ".envsecure" / "templates" / "app.env.safe").write_text("DB_URL=\nAPP_SECRET=\n")
+	(tmp_path / ".envsecure" / "secrets" / "secrets.dev").write_text("APP_SECRET=0123456789abcdef\nDB_URL=postgres://db\n")
+	runner = CliRunner()
+	assert runner.invoke(cli, ["compile", "dev"]).exit_code == 0
+	(tmp_path / ".envsecure" / "secrets" / "secrets.dev").unlink()
+	result = runner.invoke(cli, ["deploy", "dev", "--local", "--from-bundle", "--validate-first"])
+	assert result.exit_code == 0, result.output
+	assert (tmp_path / ".envsecure" / ".env.dev").read_text() == "DB_URL=postgres://db\nAPP_SECRET=0123456789abcdef\n"
+	result = runner.invoke(cli, ["validate", "--env", "dev", "--from-bundle", "--strict"])
+	assert result.exit_code == 0, result.output
+
+
+def test_compile_refuses_plaintext_outside_dev(tmp_path: Path, monkeypatch) -> None:
+	from click.testing import CliRunner
+	from cli.main import cli
+
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / ".envsecure" / "templates").mkdir(parents=True)
+	(tmp_path / ".envsecure" / "secrets").mkdir()
+	(tmp_path / ".envsecure" / "templates" / "app.env.safe").write_text("API_KEY=\n")
+	(tmp_path / ".envsecure" / "secrets" / "secrets.prod").write_text("API_KEY=segredo\n")
+	runner = CliRunner()
+	result = runner.invoke(cli, ["compile", "prod"])
+	assert result.exit_code != 0 and "--encrypt" in result.output
+	assert not (tmp_path / ".envsecure" / "build" / "prod.envb").exists()
+	result = runner.invoke(cli, ["compile", "prod", "--allow-plaintext"])
+	assert result.exit_code == 0 and "texto claro" in result.output
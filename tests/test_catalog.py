@@ -0,0 +1,323 @@
+import json
+from pathlib import Path
+from core.catalog import JsonCatalogStore, open_catalog
+from core.catalog_query import compile_query
+from core.catalog_sqlite import SqliteCatalogStore
+
+
+def _seed(path: Path) -> None:
+	store = JsonCatalogStore(path)
+	store.put("DB_URL", {"category": "database", "sensitive": False, "required": True, "detected_in": ["a.py", "b.py"]})
+	store.put("API_TOKEN", {"category": "secrets", "sensitive": True, "required": False, "min_length": 32, "detected_in": ["a.py"]})
+	store.commit()
+
+
+def test_sqlite_roundtrip_and_filter(tmp_path: Path) -> None:
+	_seed(tmp_path / "catalog.json")
+	db = SqliteCatalogStore(tmp_path / "catalog.db")
+	assert db.import_json(tmp_path / "catalog.json") == 2
+	db.close()
+
+	store = open_catalog(tmp_path)
+	assert isinstance(store, SqliteCatalogStore)
+	assert [n for n, _ in store.query(compile_query("sensitive=true"))] == ["API_TOKEN"]
+	assert [n for n, _ in store.query(compile_query("category=database"))] == ["DB_URL"]
+	store.update_many(["DB_URL", "API_TOKEN"], {"required": False})
+	store.delete("API_TOKEN")
+	store.commit()
+	assert store.get("DB_URL") == {"category": "database", "sensitive": False, "required": False, "detected_in": ["a.py", "b.py"]}
+	assert store.export_json(tmp_path / "out.json") == 1
+	store.close()
+	assert JsonCatalogStore(tmp_path / "out.json").get("DB_URL")["detected_in"] == ["a.py", "b.py"]
+
+
+def test_json_and_sqlite_stores_agree_on_items(tmp_path: Path) -> None:
+	from models.variable import EnvironmentVariable
+
+	store = JsonCatalogStore(tmp_path / "catalog.json")
+	# to_dict() traz campos None; detected_in repetido e vazio
+	store.put("DB_URL", EnvironmentVariable("DB_URL", "database", detected_in=["a.py", "b.py", "a.py"]).to_dict())
+	store.put("API_TOKEN", {"category": "secrets", "sensitive": True, "min_length": None, "owner": None, "detected_in": []})
+	store.update_many(["API_TOKEN", "LEGACY"], {"description": "x", "team": "core"})
+	store.commit()
+
+	db = SqliteCatalogStore(tmp_path / "catalog.db")
+	db.import_json(tmp_path / "catalog.json")
+	expected = list(JsonCatalogStore(tmp_path / "catalog.json").items())
+	assert list(db.items()) == expected
+	assert expected[0][1]["detected_in"] == ["a.py", "b.py"]
+	assert "min_length" not in expected[1][1] and "detected_in" not in expected[1][1]
+	db.export_json(tmp_path / "back.json")
+	assert list(JsonCatalogStore(tmp_path / "back.json").items()) == expected
+	db.close()
+
+
+def test_environment_variable_is_a_slotted_dataclass() -> None:
+	import dataclasses
+	from models.variable import EnvironmentVariable
+
+	var = EnvironmentVariable("DB_URL", "database", detected_in=["a.py"])
+	assert not hasattr(var, "__dict__")
+	assert dataclasses.asdict(var) == var.to_dict()
+	assert dataclasses.replace(var, category="network") == EnvironmentVariable.from_dict({**var.to_dict(), "category": "network"})
+	assert repr(var).startswith("EnvironmentVariable(name='DB_URL', category='database'")
+
+
+def test_batch_add_appends_once_and_rolls_back(tmp_path: Path) -> None:
+	from core.catalog import add_variables, catalog_transaction
+	from models.variable import EnvironmentVariable
+
+	count = add_variables((EnvironmentVariable(name=f"VAR_{i}", category="general") for i in range(500)), tmp_path)
+	assert count == 500
+	journal = tmp_path / "catalog.journal"
+	# Uma transação = uma linha do journal
+	assert [len(json.loads(line)["ops"]) for line in journal.read_text().splitlines()] == [500]
+	assert not (tmp_path / "catalog.json").exists()
+
+	try:
+		with catalog_transaction(tmp_path) as store:
+			store.delete("VAR_0")
+			raise RuntimeError("falha no meio do lote")
+	except RuntimeError:
+		pass
+	assert len(journal.read_text().splitlines()) == 1
+	assert "VAR_0" in JsonCatalogStore(tmp_path / "catalog.json")
+
+
+def test_torn_journal_line_does_not_hide_later_commits(tmp_path: Path) -> None:
+	path = tmp_path / "catalog.json"
+	store = JsonCatalogStore(path)
+	store.put("A", {"category": "general"})
+	store.commit()
+	journal = tmp_path / "catalog.journal"
+	with open(journal, "ab") as fh:
+		# Escritor interrompido no meio de uma transação com duas operações
+		fh.write(b'{"ops":[{"op":"put","name":"B","meta":{}},{"op":"put","na')
+	for name in ("C", "D"):
+		store = JsonCatalogStore(path)
+		store.put(name, {"category": "general"})
+		store.commit()
+	assert JsonCatalogStore(path).names() == ["A", "C", "D"]
+
+	# Linha corrompida no meio (journal legado com uma operação por linha) é pulada
+	journal.write_text('{"op":"put","name":"A","meta":{}}\n{"op":"put"\n{"op":"put","name":"E","meta":{}}\n')
+	assert JsonCatalogStore(path).names() == ["A", "E"]
+
+
+def test_json_catalog_interns_paths_and_reads_legacy_format(tmp_path: Path) -> None:
+	path = tmp_path / "catalog.json"
+	shared = "/srv/app/docker-compose.production.yml"
+	legacy = {f"VAR_{i}": {"category": "general", "detected_in": [shared, f"/srv/app/m{i % 2}.py"]} for i in range(50)}
+	path.write_text(json.dumps(legacy))
+
+	store = JsonCatalogStore(path)
+	assert store.get("VAR_3")["detected_in"] == [shared, "/srv/app/m1.py"]
+	store.delete("VAR_1")
+	store.commit()
+	store.compact()
+
+	raw = json.loads(path.read_text())
+	assert raw["paths"] == [shared, "/srv/app/m0.py", "/srv/app/m1.py"]
+	assert raw["variables"]["VAR_3"]["detected_in"] == [0, 2]
+	assert dict(JsonCatalogStore(path).items())["VAR_2"]["detected_in"] == [shared, "/srv/app/m0.py"]
+
+
+def _concurrent_writer(base: str, worker: int) -> None:
+	from core.catalog import catalog_transaction
+	for i in range(20):
+		with catalog_transaction(Path(base)) as store:
+			store.update(f"W{worker}_{i}", {"required": True})
+			store.update("SHARED", {f"w{worker}": i})
+
+
+def test_concurrent_writers_do_not_lose_updates(tmp_path: Path) -> None:
+	import multiprocessing
+	ctx = multiprocessing.get_context("spawn")
+	procs = [ctx.Process(target=_concurrent_writer, args=(str(tmp_path), w)) for w in range(4)]
+	for proc in procs:
+		proc.start()
+	for proc in procs:
+		proc.join(60)
+		assert proc.exitcode == 0
+
+	store = JsonCatalogStore(tmp_path / "catalog.json")
+	assert len(store) == 4 * 20 + 1
+	assert store.get("SHARED") == {"w0": 19, "w1": 19, "w2": 19, "w3": 19}
+	assert store.compact() == 81
+	assert not (tmp_path / "catalog.journal").exists()
+	assert JsonCatalogStore(tmp_path / "catalog.json").get("SHARED") == {"w0": 19, "w1": 19, "w2": 19, "w3": 19}
+
+
+def test_catalog_list_pages_and_export_streams(tmp_path: Path, monkeypatch) -> None:
+	from click.testing import CliRunner
+	from cli.commands.catalog import catalog_cmd
+	from core.catalog import add_variables
+	from models.variable import EnvironmentVariable
+
+	monkeypatch.chdir(tmp_path)
+	add_variables(
+		EnvironmentVariable(name=f"VAR_{i:02d}", category="general", detected_in=[f"f{j}.py" for j in range(i % 4)])
+		for i in range(30)
+	)
+	runner = CliRunner()
+	result = runner.invoke(catalog_cmd, ["list", "--sort", "name", "--offset", "5", "--limit", "3", "--format", "plain"])
+	assert result.exit_code == 0
+	assert [line.split("\t")[0] for line in result.output.splitlines()] == ["VAR_05", "VAR_06", "VAR_07"]
+
+	result = runner.invoke(catalog_cmd, ["list", "--sort", "detected_in", "--limit", "1", "--format", "ndjson"])
+	assert json.loads(result.output)["name"] == "VAR_00"
+
+	result = runner.invoke(catalog_cmd, ["export", "--format", "json", "--counts", "--output", "out.json"])
+	assert result.exit_code == 0
+	exported = json.loads((tmp_path / "out.json").read_text())
+	assert len(exported) == 30
+	assert exported["VAR_03"]["detected_in_count"] == 3
+	assert "detected_in" not in exported["VAR_03"]
+
+
+def test_query_language_json_index_matches_sqlite(tmp_path: Path) -> None:
+	import pytest
+	from core.catalog_query import QueryError
+
+	json_store = JsonCatalogStore(tmp_path / "catalog.json")
+	sqlite_store = SqliteCatalogStore(tmp_path / "catalog.db")
+	for i in range(40):
+		meta = {
+			"category": ["secrets", "database", "general", "Network"][i % 4],
+			"sensitive": i % 3 == 0,
+			"required": i % 5 == 0,
+			"owner": f"team{i % 2}",
+		}
+		if i % 7:
+			meta["min_length"] = 16
+		for store in (json_store, sqlite_store):
+			store.put(f"{'DB' if i % 2 else 'APP'}_VAR_{i}", meta)
+	sqlite_store.commit()
+
+	queries = [
+		"category=secrets and sensitive=true",
+		"name~DB_* and not (required=yes or category=database)",
+		"category~net* or min_length=''",
+		"category!=general and owner=team1",
+		"sensitive!=true and name!~APP_*",
+	]
+	for text in queries:
+		query = compile_query(text)
+		expected = [n for n, m in json_store.items() if query.matches(n, m)]
+		assert expected, text
+		assert json_store.query_names(query) == expected, text
+		assert sqlite_store.query_names(query) == expected, text
+	with pytest.raises(QueryError):
+		compile_query("category= and")
+
+
+def test_bool_coercion_and_quoting_match_on_both_backends(tmp_path: Path) -> None:
+	import pytest
+	from core.catalog_query import QueryError, quote
+
+	json_store = JsonCatalogStore(tmp_path / "catalog.json")
+	sqlite_store = SqliteCatalogStore(tmp_path / "catalog.db")
+	for store in (json_store, sqlite_store):
+		store.put("A", {"category": "yes", "sensitive": True})
+		store.put("B", {"category": "true", "sensitive": False, "min_length": 1})
+		store.put("""C'"D""", {"category": "general"})
+	sqlite_store.commit()
+
+	for text, expected in [
+		("category=yes", ["A"]),
+		("category!=true", ["A", """C'"D"""]),
+		("sensitive=yes", ["A"]),
+		("sensitive=no", ["B"]),
+		("min_length=true", []),
+	]:
+		query = compile_query(text)
+		assert json_store.query_names(query) == expected, text
+		assert sqlite_store.query_names(query) == expected, text
+	assert json_store.query_names(compile_query(f"name={quote('B')}")) == ["B"]
+	with pytest.raises(QueryError):
+		quote("""C'"D""")
+
+
+def test_import_scan_applies_only_the_diff(tmp_path: Path, monkeypatch) -> None:
+	from click.testing import CliRunner
+	from cli.commands.catalog import catalog_cmd
+
+	monkeypatch.chdir(tmp_path)
+	runner = CliRunner()
+	scan = tmp_path / "scan.json"
+	scan.write_text(json.dumps({"DB_URL": ["a.py", "b.py"], "API_TOKEN": ["a.py"]}, indent=2))
+	result = runner.invoke(catalog_cmd, ["import-scan", "--file", str(scan)])
+	assert result.exit_code == 0
+	assert "+2 variáveis" in result.output
+	journal = tmp_path / ".envsecure" / "catalog.journal"
+	size = journal.stat().st_size
+
+	result = runner.invoke(catalog_cmd, ["import-scan", "--file", str(scan)])
+	assert "nada a gravar" in result.output
+	assert journal.stat().st_size == size
+
+	ndjson = tmp_path / "scan.ndjson"
+	ndjson.write_text(
+		"\n".join(json.dumps(r) for r in [{"name": "DB_URL", "file": "a.py"}, {"name": "NEW", "file": "c.py"}, {"name": "DB_URL", "file": "c.py"}])
+	)
+	result = runner.invoke(catalog_cmd, ["import-scan", "--file", str(ndjson), "--prune"])
+	assert "+1 variáveis, ~1 alteradas, -1 não detectadas; caminhos +1 -1" in result.output
+	store = JsonCatalogStore(tmp_path / ".envsecure" / "catalog.json")
+	assert store.get("DB_URL")["detected_in"] == ["a.py", "c.py"]
+	assert "detected_in" not in store.get("API_TOKEN")
+
+
+def test_import_scan_ndjson_reimport_is_a_noop(tmp_path: Path, monkeypatch) -> None:
+	from click.testing import CliRunner
+	from cli.commands.catalog import catalog_cmd
+
+	monkeypatch.chdir(tmp_path)
+	runner = CliRunner()
+	# Saída NDJSON do scan: em ordem de arquivo, cada variável aparece em grupos não adjacentes
+	ndjson = tmp_path / "scan.ndjson"
+	ndjson.write_text("".join(
+		json.dumps({"name": name, "file": f"src/{f}.py"}) + "\n" for f in "abc" for name in ("DB_URL", "API_TOKEN")
+	))
+	result = runner.invoke(catalog_cmd, ["import-scan", "--file", str(ndjson)])
+	assert "+2 variáveis" in result.output
+	journal = tmp_path / ".envsecure" / "catalog.journal"
+	ops = [op for line in journal.read_text().splitlines() for op in json.loads(line)["ops"]]
+	assert len(ops) == 2
+	size = journal.stat().st_size
+
+	result = runner.invoke(catalog_cmd, ["import-scan", "--file", str(ndjson)])
+	assert "nada a gravar" in result.output
+	assert journal.stat().st_size == size
+	assert JsonCatalogStore(tmp_path / ".envsecure" / "catalog.json").get("DB_URL")["detected_in"] == ["src/a.py", "src/b.py", "src/c.py"]
+
+	# Arquivo c.py sumiu do scan: detected_in encurtado, um update por variável
+	ndjson.write_text("".join(
+		json.dumps({"name": name, "file": f"src/{f}.py"}) + "\n" for f in "ab" for name in ("DB_URL", "API_TOKEN")
+	))
+	result = runner.invoke(catalog_cmd, ["import-scan", "--file", str(ndjson)])
+	assert "~2 alteradas" in result.output and "caminhos +0 -1" in result.output
+	assert len(journal.read_text().splitlines()) == 2
+	assert len(json.loads(journal.read_text().splitlines()[-1])["ops"]) == 2
+	assert JsonCatalogStore(tmp_path / ".envsecure" / "catalog.json").get("API_TOKEN")["detected_in"] == ["src/a.py", "src/b.py"]
+
+
+def test_negated_bool_queries_match_rows_without_the_field(tmp_path: Path) -> None:
+	json_store = JsonCatalogStore(tmp_path / "catalog.json")
+	sqlite_store = SqliteCatalogStore(tmp_path / "catalog.db")
+	for store in (json_store, sqlite_store):
+		store.put("A", {"category": "general", "sensitive": True, "required": True})
+		# Entrada sem os campos booleanos (legado ou criada por update_many)
+		store.update_many(["B"], {"category": "general"})
+	sqlite_store.commit()
+
+	for text, expected in [
+		("sensitive!=true", ["B"]),
+		("not sensitive=true", ["B"]),
+		("required!=false", ["A", "B"]),
+		("not (sensitive=true or required=false)", ["B"]),
+		("sensitive=''", ["B"]),
+	]:
+		query = compile_query(text)
+		assert [n for n, m in json_store.items() if query.matches(n, m)] == expected, text
+		assert json_store.query_names(query) == expected, text
+		assert sqlite_store.query_names(query) == expected, text
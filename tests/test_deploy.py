@@ -0,0 +1,62 @@
+from pathlib import Path
+from click.testing import CliRunner
+from cli.main import cli
+
+
+def _project(base: Path, envs: dict) -> None:
+	(base / ".envsecure" / "templates").mkdir(parents=True)
+	(base / ".envsecure" / "secrets").mkdir()
+	(base / ".envsecure" / "templates" / "app.env.safe").write_text("DB_HOST=\nDATABASE_URL=postgres://${DB_HOST}/app\n")
+	for env, content in envs.items():
+		(base / ".envsecure" / "secrets" / f"secrets.{env}").write_text(content)
+
+
+def test_deploy_all_envs_reports_failures_without_aborting(tmp_path: Path, monkeypatch) -> None:
+	monkeypatch.chdir(tmp_path)
+	envs = {f"tenant{i}": f"DB_HOST=db{i}\n" for i in range(6)}
+	envs["broken"] = 'DB_HOST="db\n'
+	_project(tmp_path, envs)
+
+	result = CliRunner().invoke(cli, ["deploy", "--all-envs", "--jobs", "3"])
+	assert result.exit_code != 0
+	assert "1 de 7 ambientes falharam: broken" in result.output
+	for i in range(6):
+		assert (tmp_path / ".envsecure" / f".env.tenant{i}").read_text() == f"DB_HOST=db{i}\nDATABASE_URL=postgres://db{i}/app\n"
+	assert not (tmp_path / ".envsecure" / ".env.broken").exists()
+
+	result = CliRunner().invoke(cli, ["deploy", "--envs", "tenant1,tenant2"])
+	assert result.exit_code == 0, result.output
+
+
+def test_unchanged_deploy_is_a_noop_unless_forced(tmp_path: Path, monkeypatch) -> None:
+	monkeypatch.chdir(tmp_path)
+	_project(tmp_path, {"prod": "DB_HOST=db\n"})
+	runner = CliRunner()
+	output = tmp_path / ".envsecure" / ".env.prod"
+	backup = tmp_path / ".envsecure" / ".env.prod.bak"
+
+	assert runner.invoke(cli, ["deploy", "prod", "--local"]).exit_code == 0
+	mtime = output.stat().st_mtime_ns
+	result = runner.invoke(cli, ["deploy", "prod", "--local"])
+	assert "Sem alterações" in result.output
+	assert output.stat().st_mtime_ns == mtime
+	assert not backup.exists()
+
+	(tmp_path / ".envsecure" / "secrets" / "secrets.prod").write_text("DB_HOST=db2\n")
+	assert "Gerado" in runner.invoke(cli, ["deploy", "prod", "--local"]).output
+	assert backup.read_text().startswith("DB_HOST=db\n")
+	assert "Gerado" in runner.invoke(cli, ["deploy", "prod", "--local", "--force"]).output
+
+
+def test_template_placeholders_need_template_defaults(tmp_path: Path, monkeypatch) -> None:
+	monkeypatch.chdir(tmp_path)
+	_project(tmp_path, {"prod": "DB_HOST=db\n"})
+	(tmp_path / ".envsecure" / "templates" / "app.env.safe").write_text("DB_HOST=\nAPI_KEY=your_value_here\n")
+	runner = CliRunner()
+	output = tmp_path / ".envsecure" / ".env.prod"
+
+	assert runner.invoke(cli, ["deploy", "prod", "--local"]).exit_code == 0
+	assert output.read_text() == "DB_HOST=db\nAPI_KEY=\n"
+	# A opção entra no manifest: o deploy seguinte não é pulado
+	assert runner.invoke(cli, ["deploy", "prod", "--local", "--template-defaults"]).exit_code == 0
+	assert output.read_text() == "DB_HOST=db\nAPI_KEY=your_value_here\n"
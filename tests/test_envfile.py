@@ -0,0 +1,49 @@
+import os
+from pathlib import Path
+from core.envfile import format_env, load_env, parse_env
+
+
+def test_parse_env_handles_quotes_export_and_multiline() -> None:
+	text = (
+		"# comentário\n"
+		"export API_KEY=abc123  # inline\n"
+		"PLAIN = valor com espaço \n"
+		"HASH=a#b\n"
+		"SINGLE='literal \\n $X'\n"
+		'DOUBLE="linha1\\nlinha2 \\"q\\""\n'
+		'MULTI="primeira\n'
+		'segunda"\n'
+		"EMPTY=\n"
+		"BARE\n"
+	)
+	env = parse_env(text)
+	assert dict(env) == {
+		"API_KEY": "abc123",
+		"PLAIN": "valor com espaço",
+		"HASH": "a#b",
+		"SINGLE": "literal \\n $X",
+		"DOUBLE": 'linha1\nlinha2 "q"',
+		"MULTI": "primeira\nsegunda",
+		"EMPTY": "",
+		"BARE": "",
+	}
+	assert dict(parse_env(format_env(env))) == dict(env)
+
+
+def test_load_env_caches_by_mtime_and_size(tmp_path: Path, monkeypatch) -> None:
+	import core.envfile as envfile
+	path = tmp_path / "secrets.dev"
+	path.write_text("A=1\n")
+	calls = []
+	real_parse = envfile.parse_env
+	monkeypatch.setattr(envfile, "parse_env", lambda text: (calls.append(text), real_parse(text))[1])
+
+	first = load_env(path)
+	assert load_env(path) is first
+	assert len(calls) == 1
+
+	path.write_text("A=22\n")
+	st = path.stat()
+	os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+	assert load_env(path)["A"] == "22"
+	assert len(calls) == 2
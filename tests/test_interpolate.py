@@ -0,0 +1,40 @@
+import pytest
+from core.interpolate import InterpolationCycleError, Interpolator
+from core.template import render_values
+
+
+def test_resolves_references_defaults_and_escapes() -> None:
+	template = {"DATABASE_URL": "postgres://${DB_USER}:${DB_PASSWORD}@${DB_HOST}:${DB_PORT:-5432}/${DB_NAME}", "PRICE": "$$5"}
+	secrets = {"DB_USER": "app", "DB_PASSWORD": "s3cr3t", "DB_HOST": "db", "DB_NAME": "main"}
+	assert render_values(template, secrets, defaults=True) == {"DATABASE_URL": "postgres://app:s3cr3t@db:5432/main", "PRICE": "$5"}
+
+
+def test_literal_template_defaults_are_opt_in() -> None:
+	template = {"API_KEY": "your_value_here", "DB_HOST": "localhost", "URL": "http://${DB_HOST}/"}
+	# Sem segredo: chave vazia como antes; só valores derivados (${VAR}) vêm do template
+	assert render_values(template, {}) == {"API_KEY": "", "DB_HOST": "", "URL": "http:///"}
+	assert render_values(template, {"DB_HOST": "db"}, defaults=True) == {"API_KEY": "your_value_here", "DB_HOST": "db", "URL": "http://db/"}
+
+
+def test_cycle_is_reported_with_path() -> None:
+	with pytest.raises(InterpolationCycleError) as exc:
+		Interpolator({"A": "${B}", "B": "x${C}", "C": "${A}", "D": "ok"}).resolve()
+	assert exc.value.cycle in (["A", "B", "C", "A"], ["B", "C", "A", "B"], ["C", "A", "B", "C"])
+
+
+def test_long_chain_and_incremental_update() -> None:
+	n = 5000
+	values = {"K0": "v"}
+	values.update({f"K{i}": f"${{K{i - 1}}}" for i in range(1, n)})
+	values["OTHER"] = "fixo"
+	engine = Interpolator(values)
+	assert engine.resolve([f"K{n - 1}"]) == {f"K{n - 1}": "v"}
+	invalidated = engine.update(f"K{n - 3}", "novo")
+	assert invalidated == {f"K{n - 3}", f"K{n - 2}", f"K{n - 1}"}
+	assert engine.resolve([f"K{n - 1}", "K0"]) == {f"K{n - 1}": "novo", "K0": "v"}
+
+
+def test_secret_values_are_never_interpolated() -> None:
+	template = {"DB_PASSWORD": "", "DSN": "db://app:${DB_PASSWORD}@${DB_HOST:-localhost}"}
+	secrets = {"DB_PASSWORD": "pa$$w0rd${x}", "DB_HOST": "${OTHER}"}
+	assert render_values(template, secrets) == {"DB_PASSWORD": "pa$$w0rd${x}", "DSN": "db://app:pa$$w0rd${x}@${OTHER}"}
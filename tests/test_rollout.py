@@ -0,0 +1,84 @@
+import asyncio
+from pathlib import Path
+from typing import List
+from click.testing import CliRunner
+from cli.main import cli
+from core.rollout import Rollout, RolloutOptions, batches, target_from_spec
+from models.environment import DeployTarget
+
+
+def _targets(root: Path, count: int) -> List[DeployTarget]:
+	return [target_from_spec(f"local:{root / f'host{i}.env'}") for i in range(count)]
+
+
+def test_batches_by_count_and_percent(tmp_path: Path) -> None:
+	targets = _targets(tmp_path, 10)
+	assert [len(b) for b in batches(targets, "4")] == [4, 4, 2]
+	assert [len(b) for b in batches(targets, "25%")] == [3, 3, 3, 1]
+	assert target_from_spec("deploy@web1:2222:/srv/.env").port == 2222
+
+
+def test_rollout_aborts_on_health_check_and_resumes(tmp_path: Path) -> None:
+	source = tmp_path / "app.env"
+	source.write_text("A=1\n")
+	targets = _targets(tmp_path, 5)
+	state = tmp_path / "state.json"
+	seen: List[int] = []
+
+	async def failing_second(batch: int, hosts: List[DeployTarget]) -> bool:
+		seen.append(batch)
+		return batch != 1
+
+	report = asyncio.run(Rollout(targets, source, RolloutOptions(batch_size="2"), failing_second, state).run())
+	assert report.aborted and report.completed == 1
+	assert all(Path(t.target_path).exists() for t in targets[:4]) and not Path(targets[4].target_path).exists()
+	assert state.exists()
+
+	# O lote concluído não é reenviado; o lote que falhou no health check, sim
+	Path(targets[0].target_path).unlink()
+	Path(targets[2].target_path).write_text("stale\n")
+
+	async def passing(batch: int, hosts: List[DeployTarget]) -> bool:
+		seen.append(batch)
+		return True
+
+	report = asyncio.run(Rollout(targets, source, RolloutOptions(batch_size="2"), passing, state).run(resume=True))
+	assert report.aborted is None and report.completed == 3
+	assert seen == [0, 1, 1, 2]
+	assert not Path(targets[0].target_path).exists()
+	assert [Path(t.target_path).read_text() for t in targets[1:]] == ["A=1\n"] * 4
+	assert sorted(r.batch for r in report.results) == [0, 0, 1, 1, 2]
+	assert not state.exists()
+
+
+def test_rollout_abort_ratio(tmp_path: Path) -> None:
+	source = tmp_path / "app.env"
+	source.write_text("A=1\n")
+	targets = _targets(tmp_path, 4)
+	targets[1] = target_from_spec(f"local:{tmp_path / 'missing' / 'host.env'}")
+
+	report = asyncio.run(Rollout(targets, source, RolloutOptions(batch_size="2", abort_ratio=0.5)).run())
+	assert report.aborted is None and len(report.failed) == 1
+
+	report = asyncio.run(Rollout(targets, source, RolloutOptions(batch_size="2", abort_ratio=0.1)).run())
+	assert report.aborted and report.completed == 0
+
+
+def test_rollout_cli_local_fleet(tmp_path: Path, monkeypatch) -> None:
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / ".envsecure" / "templates").mkdir(parents=True)
+	(tmp_path / ".envsecure" / "secrets").mkdir()
+	(tmp_path / ".envsecure" / "templates" / "app.env.safe").write_text("DB_HOST=\n")
+	(tmp_path / ".envsecure" / "secrets" / "secrets.prod").write_text("DB_HOST=db1\n")
+	hosts = tmp_path / "hosts.txt"
+	hosts.write_text("# frota\n" + "".join(f"local:{tmp_path / f'h{i}.env'}\n" for i in range(3)))
+
+	args = ["rollout", "prod", "--hosts", str(hosts), "--batch-size", "50%", "--health-check", "test -n \"$ENVSECURE_ROLLOUT_HOSTS\""]
+	result = CliRunner().invoke(cli, args)
+	assert result.exit_code == 0, result.output
+	assert "Lotes: 2/2" in result.output
+	assert all((tmp_path / f"h{i}.env").read_text() == "DB_HOST=db1\n" for i in range(3))
+
+	result = CliRunner().invoke(cli, args[:-2] + ["--health-check", "exit 1"])
+	assert result.exit_code != 0
+	assert "--resume" in result.output
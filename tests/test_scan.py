@@ -0,0 +1,315 @@
+from pathlib import Path
+from cli.commands.scan import _scan_tree
+
+
+def _make_tree(base: Path) -> None:
+	(base / "app").mkdir()
+	(base / "node_modules").mkdir()
+	(base / "app" / "settings.py").write_text("import os\nDB_URL = os.getenv('DB_URL')\nKEY = os.getenv(\"API_KEY\")\n")
+	(base / "docker-compose.yml").write_text("environment:\n  - DB_URL=${DB_URL}\n  - REDIS=$REDIS_HOST\n")
+	(base / "Dockerfile").write_text("ENV APP_ENV production\n")
+	(base / "node_modules" / "ignored.py").write_text("os.getenv('IGNORED')\n")
+	for i in range(20):
+		(base / "app" / f"mod_{i}.py").write_text(f"os.getenv('VAR_{i % 7}')\n")
+
+
+def test_scan_tree_parallel_matches_serial(tmp_path: Path) -> None:
+	_make_tree(tmp_path)
+	excluded = {"node_modules"}
+	globs = ["*.py", "*.yml", "Dockerfile"]
+	serial = _scan_tree(tmp_path, globs, excluded)
+	parallel = _scan_tree(tmp_path, globs, excluded, jobs=2)
+	assert "IGNORED" not in serial
+	assert sorted(serial["DB_URL"]) == [str(tmp_path / "app" / "settings.py"), str(tmp_path / "docker-compose.yml")]
+	assert list(parallel.items()) == list(serial.items())
+
+
+def test_scan_tree_cache_reuses_unchanged_files(tmp_path: Path, monkeypatch) -> None:
+	import cli.commands.scan as scan_module
+	from core.scan_cache import ScanCache
+
+	_make_tree(tmp_path)
+	cache_path = tmp_path / "cache.json"
+	globs = ["*.py", "*.yml", "Dockerfile"]
+	cache = ScanCache(cache_path)
+	first = _scan_tree(tmp_path, globs, {"node_modules"}, cache=cache)
+	cache.save()
+
+	scanned = []
+	original = scan_module._scan_file
+	monkeypatch.setattr(scan_module, "_scan_file", lambda p, *a: scanned.append(p.name) or original(p, *a))
+	(tmp_path / "Dockerfile").write_text("ENV OTHER_VAR 1\n")
+	(tmp_path / "app" / "mod_0.py").unlink()
+	cache = ScanCache(cache_path).load()
+	second = _scan_tree(tmp_path, globs, {"node_modules"}, cache=cache)
+	assert scanned == ["Dockerfile"]
+	assert "APP_ENV" in first and "APP_ENV" not in second
+	assert "OTHER_VAR" in second
+	assert str(tmp_path / "app" / "mod_0.py") not in cache.entries
+
+
+def test_scan_cache_prune_keeps_other_roots(tmp_path: Path) -> None:
+	from core.scan_cache import ScanCache
+
+	for sub in ("svc_a", "svc_ab"):
+		(tmp_path / sub).mkdir()
+		(tmp_path / sub / "app.py").write_text("import os\nos.getenv('X')\n")
+	cache = ScanCache(tmp_path / "cache.json")
+	_scan_tree(tmp_path / "svc_ab", ["*.py"], set(), cache=cache)
+	_scan_tree(tmp_path / "svc_a", ["*.py"], set(), cache=cache)
+	assert set(cache.entries) == {str(tmp_path / "svc_a" / "app.py"), str(tmp_path / "svc_ab" / "app.py")}
+
+	(tmp_path / "svc_a" / "app.py").unlink()
+	_scan_tree(tmp_path / "svc_a", ["*.py"], set(), cache=cache)
+	assert set(cache.entries) == {str(tmp_path / "svc_ab" / "app.py")}
+
+
+def test_find_variables_forms() -> None:
+	from core.scanner import find_variables
+
+	content = b"os.getenv('DB_URL')\nhost=${REDIS_HOST} port=$REDIS_PORT $1BAD ${_BAD}\nENV APP_ENV production\n$ENV LATE_VAR\n"
+	assert find_variables(content) == {"DB_URL", "REDIS_HOST", "REDIS_PORT", "APP_ENV", "ENV", "LATE_VAR"}
+	assert find_variables(b'{"id": 1, "label": "no vars here"}') == set()
+
+
+def test_scan_file_skips_binary_and_large_files(tmp_path: Path, monkeypatch) -> None:
+	import core.scanner as scanner
+
+	binary = tmp_path / "blob.json"
+	binary.write_bytes(b"\x00\x01$SECRET_KEY")
+	big = tmp_path / "fixture.json"
+	big.write_text("x" * 2000 + "\n${BIG_VAR}\n")
+	assert scanner.scan_file(binary) == set()
+	assert scanner.scan_file(big) == {"BIG_VAR"}
+	assert scanner.scan_file(big, max_file_size=1024) == set()
+	# Leitura em blocos para arquivos acima do limiar de mmap
+	monkeypatch.setattr(scanner, "STREAM_THRESHOLD", 100)
+	monkeypatch.setattr(scanner, "CHUNK_SIZE", 64)
+	streamed = tmp_path / "stream.yml"
+	streamed.write_text("".join(f"      - VAR_{i}=${{VAR_{i}}}\n" for i in range(50)))
+	assert scanner.scan_file(streamed) == {f"VAR_{i}" for i in range(50)}
+	# `ENV` e o nome em linhas diferentes, em blocos diferentes; linhas iguais às do mmap
+	spanning = tmp_path / "Dockerfile"
+	spanning.write_text("".join(f"RUN step {i} && ENV\n  SPLIT_{i} x\n" for i in range(30)))
+	assert scanner.scan_file(spanning) == {f"SPLIT_{i}" for i in range(30)}
+	streamed_lines = scanner.scan_file_lines(spanning)
+	monkeypatch.setattr(scanner, "STREAM_THRESHOLD", 1 << 30)
+	assert streamed_lines == scanner.scan_file_lines(spanning)
+
+
+def test_scan_cache_respects_max_file_size(tmp_path: Path) -> None:
+	from core.scan_cache import ScanCache
+
+	target = tmp_path / "app.py"
+	target.write_text("os.getenv('SMALL_VAR')\n")
+	cache = ScanCache(tmp_path / "cache.json")
+	assert "SMALL_VAR" in _scan_tree(tmp_path, ["*.py"], set(), cache=cache)
+	assert "SMALL_VAR" not in _scan_tree(tmp_path, ["*.py"], set(), cache=cache, max_file_size=8)
+
+
+def test_iter_files_single_pass_matches_os_walk(tmp_path: Path) -> None:
+	import fnmatch
+	import os
+	from core.scanner import iter_files, scan_paths
+
+	_make_tree(tmp_path)
+	(tmp_path / "app" / "nested").mkdir()
+	(tmp_path / "app" / "nested" / "values.yaml").write_text("key: ${NESTED_VAR}\n")
+	globs = ["*.py", "*.yml", "*.yaml", "Dockerfile", "settings.*"]
+	expected = []
+	for root, dirs, files in os.walk(tmp_path):
+		dirs[:] = [d for d in dirs if d != "node_modules"]
+		expected += [Path(root) / f for f in files if any(fnmatch.fnmatch(f, g) for g in globs)]
+	found = list(iter_files(tmp_path, globs, {"node_modules"}))
+	assert found == expected
+	# settings.py casa dois globs mas aparece uma única vez
+	assert scan_paths(tmp_path, globs)["DB_URL"].count(str(tmp_path / "app" / "settings.py")) == 1
+	assert "IGNORED" not in scan_paths(tmp_path, globs)
+
+
+def test_scan_since_merges_git_changes(tmp_path: Path, monkeypatch) -> None:
+	import json
+	import shutil
+	import subprocess
+	import pytest
+	from click.testing import CliRunner
+	from cli.commands.scan import scan_cmd
+
+	if shutil.which("git") is None:
+		pytest.skip("git indisponível")
+	_make_tree(tmp_path)
+	git = ["git", "-c", "user.name=t", "-c", "user.email=t@t", "-C", str(tmp_path)]
+	subprocess.run(git + ["init", "-q"], check=True)
+	subprocess.run(git + ["add", "-A"], check=True)
+	subprocess.run(git + ["commit", "-q", "-m", "init"], check=True)
+	monkeypatch.chdir(tmp_path)
+	out = tmp_path / "scan.json"
+	runner = CliRunner()
+	assert runner.invoke(scan_cmd, ["--output", str(out)]).exit_code == 0
+
+	(tmp_path / "Dockerfile").unlink()
+	(tmp_path / "app" / "mod_1.py").write_text("os.getenv('CHANGED_VAR')\n")
+	(tmp_path / "app" / "new.py").write_text("os.getenv('NEW_VAR')\n")
+	result = runner.invoke(scan_cmd, ["--output", str(out), "--since", "HEAD"])
+	assert result.exit_code == 0, result.output
+	merged = json.loads(out.read_text())
+
+	full_out = tmp_path / "full.json"
+	assert runner.invoke(scan_cmd, ["--output", str(full_out)]).exit_code == 0
+	full = json.loads(full_out.read_text())
+	assert {k: sorted(v) for k, v in merged.items()} == {k: sorted(v) for k, v in full.items()}
+	assert "APP_ENV" not in merged and "NEW_VAR" in merged
+
+
+def test_watch_polling_updates_index(tmp_path: Path) -> None:
+	import os
+	from cli.commands.scan import _apply_changes
+	from core.scan_index import ScanIndex
+	from core.scanner import iter_files
+	from utils.watch import PollingWatcher
+
+	_make_tree(tmp_path)
+	globs = ["*.py", "*.yml", "Dockerfile"]
+	index = ScanIndex.from_variables(_scan_tree(tmp_path, globs, {"node_modules"}))
+	watcher = PollingWatcher(lambda: iter_files(tmp_path, globs, {"node_modules"}), interval=0)
+	(tmp_path / "app" / "settings.py").write_text("os.getenv('ONLY_NEW')\n")
+	os.utime(tmp_path / "app" / "settings.py", ns=(1, 1))
+	(tmp_path / "Dockerfile").unlink()
+	changed = watcher.poll(0)
+	assert changed == {str(tmp_path / "app" / "settings.py"), str(tmp_path / "Dockerfile")}
+	assert _apply_changes(tmp_path, globs, {"node_modules"}, index, changed) == 2
+	variables = index.to_variables()
+	assert variables["ONLY_NEW"] == [str(tmp_path / "app" / "settings.py")]
+	assert variables["DB_URL"] == [str(tmp_path / "docker-compose.yml")]
+	assert "API_KEY" not in variables and "APP_ENV" not in variables
+
+
+def test_watch_overflow_with_relative_base_drops_deleted_files(tmp_path: Path, monkeypatch) -> None:
+	import os
+	import sys
+	import pytest
+	from cli.commands.scan import _apply_changes
+	from core.scan_index import ScanIndex
+	from utils.watch import IN_Q_OVERFLOW, InotifyWatcher, _EVENT
+
+	if not sys.platform.startswith("linux"):
+		pytest.skip("inotify só no Linux")
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / "a.py").write_text("os.getenv('A')\n")
+	(tmp_path / "b.py").write_text("os.getenv('B')\n")
+	base = Path(".")
+	index = ScanIndex.from_variables(_scan_tree(base, ["*.py"], set()))
+	assert sorted(index.by_file) == ["a.py", "b.py"]
+
+	watcher = InotifyWatcher(base, set())
+	# Fila do kernel estourou enquanto b.py era apagado: só chega IN_Q_OVERFLOW
+	os.close(watcher.fd)
+	read_fd, write_fd = os.pipe()
+	os.set_blocking(read_fd, False)
+	watcher.fd = read_fd
+	os.write(write_fd, _EVENT.pack(-1, IN_Q_OVERFLOW, 0, 0))
+	(tmp_path / "b.py").unlink()
+	changed = watcher.poll(1)
+	watcher.close()
+	os.close(write_fd)
+	assert changed == {"."}
+	assert _apply_changes(base, ["*.py"], set(), index, changed) == 2
+	assert index.to_variables() == {"A": ["a.py"]}
+
+
+def test_watch_flush_uses_format_and_categorize_options(tmp_path: Path, monkeypatch) -> None:
+	import json
+	import cli.commands.scan as scan_module
+	from core.catalog import JsonCatalogStore
+
+	class StubWatcher:
+		def __init__(self) -> None:
+			self.events = [{str(tmp_path / "app.py")}, set()]
+
+		def poll(self, timeout: float) -> set:
+			if not self.events:
+				raise KeyboardInterrupt
+			return self.events.pop(0)
+
+		def close(self) -> None:
+			pass
+
+	monkeypatch.chdir(tmp_path)
+	monkeypatch.setattr(scan_module, "create_watcher", lambda *a, **k: StubWatcher())
+	(tmp_path / "app.py").write_text("os.getenv('DB_PASSWORD')\n")
+	out = tmp_path / "scan.txt"
+	# Extensão .txt seria CSV no modo auto: o formato pedido deve prevalecer
+	scan_module._watch(tmp_path, ["*.py"], set(), {}, str(out), None, 0, True, True, fmt="ndjson", auto_categorize=False)
+	assert [json.loads(line) for line in out.read_text().splitlines()] == [{"name": "DB_PASSWORD", "file": str(tmp_path / "app.py")}]
+	assert JsonCatalogStore(tmp_path / ".envsecure" / "catalog.json").get("DB_PASSWORD")["category"] == "general"
+
+
+def test_scan_ndjson_stream_roundtrip(tmp_path: Path, monkeypatch) -> None:
+	import json
+	from click.testing import CliRunner
+	from cli.commands.scan import scan_cmd
+	from core.scanner import load_scan
+
+	_make_tree(tmp_path)
+	monkeypatch.chdir(tmp_path)
+	runner = CliRunner()
+	assert runner.invoke(scan_cmd, ["--output", "scan.json"]).exit_code == 0
+	assert runner.invoke(scan_cmd, ["--output", "scan.ndjson", "-j", "2"]).exit_code == 0
+	lines = (tmp_path / "scan.ndjson").read_text().splitlines()
+	assert json.loads(lines[0]).keys() == {"name", "file"}
+	assert load_scan(tmp_path / "scan.ndjson") == json.loads((tmp_path / "scan.json").read_text())
+
+
+def test_empty_ndjson_scan_imports_as_empty(tmp_path: Path, monkeypatch) -> None:
+	from click.testing import CliRunner
+	from cli.commands.catalog import catalog_cmd
+	from cli.commands.scan import scan_cmd
+	from core.scanner import load_scan
+
+	(tmp_path / "app.py").write_text("print('sem variáveis')\n")
+	monkeypatch.chdir(tmp_path)
+	runner = CliRunner()
+	assert runner.invoke(scan_cmd, ["--format", "ndjson", "--output", "scan.ndjson"]).exit_code == 0
+	assert (tmp_path / "scan.ndjson").read_text().strip() == ""
+	assert load_scan(tmp_path / "scan.ndjson") == {}
+	(tmp_path / "blank.ndjson").write_text("\n  \n")
+	assert load_scan(tmp_path / "blank.ndjson") == {}
+	result = runner.invoke(catalog_cmd, ["import-scan", "--file", "scan.ndjson"])
+	assert result.exit_code == 0, result.output
+	assert "nada a gravar" in result.output
+
+
+def test_scan_index_roundtrip_and_query(tmp_path: Path, monkeypatch) -> None:
+	from click.testing import CliRunner
+	from cli.commands.scan import scan_cmd
+	from core.scan_index import INDEX_FILE, ScanIndex
+
+	_make_tree(tmp_path)
+	monkeypatch.chdir(tmp_path)
+	runner = CliRunner()
+	assert runner.invoke(scan_cmd, ["--index", "--output", "scan.json"]).exit_code == 0
+	index = ScanIndex.load(INDEX_FILE)
+	assert index is not None
+	assert index.lookup_var("API_KEY") == {str(Path("app") / "settings.py"): [3]}
+	assert index.by_file[index.resolve_file(str(tmp_path / "docker-compose.yml"))] == {"DB_URL": [2], "REDIS_HOST": [3]}
+	result = runner.invoke(scan_cmd, ["--query", "DB_URL"])
+	assert result.exit_code == 0
+	assert "settings.py:2" in result.output and "docker-compose.yml:2" in result.output
+
+
+def test_synthetic_tree_generator(tmp_path: Path) -> None:
+	from benchmarks.synth import SynthSpec, generate
+	from core.scanner import iter_files
+
+	spec = SynthSpec(files=200, depth=2, fanout=3, size_mean=512, binary_ratio=0.1, excluded_share=0.25)
+	stats = generate(tmp_path / "a", spec)
+	assert stats["files"] == 200
+	assert generate(tmp_path / "b", spec) == stats
+	# Mesma seed => mesmos bytes, inclusive nos arquivos binários
+	def tree(root: Path) -> dict:
+		return {p.relative_to(root): p.read_bytes() for p in root.rglob("*") if p.is_file()}
+
+	assert tree(tmp_path / "a") == tree(tmp_path / "b")
+	visible = list(iter_files(tmp_path / "a"))
+	assert not any("node_modules" in p.parts for p in visible)
+	assert len([p for p in visible if p.name != "synth.json"]) == stats["files"] - stats["excluded"]
@@ -0,0 +1,277 @@
+"""Deploy via SSH contra um servidor SFTP paramiko local (sem sshd)."""
+import hashlib
+import os
+import shlex
+import socket
+import threading
+from pathlib import Path
+from typing import Iterator, List
+import paramiko
+import pytest
+from click.testing import CliRunner
+from cli.main import cli
+from utils.ssh import SSHConfig, SSHPool, Transfer, fan_out, parse_target
+
+
+class _Server(paramiko.ServerInterface):
+	def __init__(self, client_key: paramiko.PKey, root: str) -> None:
+		self.client_key = client_key
+		self.root = root
+
+	def get_allowed_auths(self, username: str) -> str:
+		return "publickey"
+
+	def check_auth_publickey(self, username: str, key: paramiko.PKey) -> int:
+		return paramiko.AUTH_SUCCESSFUL if key == self.client_key else paramiko.AUTH_FAILED
+
+	def check_channel_request(self, kind: str, chanid: int) -> int:
+		return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+	def check_channel_exec_request(self, channel, command) -> bool:
+		# Só `sha256sum -- <caminho>`, sobre a raiz do servidor
+		argv = shlex.split(command.decode())
+		if argv[:2] != ["sha256sum", "--"]:
+			return False
+
+		def run() -> None:
+			path = os.path.join(self.root, argv[2].lstrip("/"))
+			try:
+				with open(path, "rb") as fh:
+					channel.sendall(f"{hashlib.sha256(fh.read()).hexdigest()}  {argv[2]}\n".encode())
+				channel.send_exit_status(0)
+			except OSError:
+				channel.send_exit_status(1)
+			# EOF sem close: fechar antes da resposta ao exec derrubaria o pedido no cliente
+			channel.shutdown_write()
+
+		threading.Thread(target=run, daemon=True).start()
+		return True
+
+
+class _Handle(paramiko.SFTPHandle):
+	def stat(self):
+		return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+	def chattr(self, attr):
+		return paramiko.SFTP_OK
+
+
+class _SFTP(paramiko.SFTPServerInterface):
+	"""Mapeia caminhos remotos absolutos para dentro de `root`."""
+
+	root = ""
+	stand_in: "SFTPStandIn"
+
+	def _path(self, path: str) -> str:
+		return os.path.join(self.root, self.canonicalize(path).lstrip("/"))
+
+	def open(self, path, flags, attr):
+		mode = "r+b" if flags & os.O_RDWR else ("wb" if flags & os.O_WRONLY else "rb")
+		if flags & os.O_APPEND:
+			mode = "ab"
+		if flags & (os.O_WRONLY | os.O_RDWR):
+			self.stand_in.writes += 1
+		try:
+			fd = os.open(self._path(path), flags, 0o600)
+			fh = os.fdopen(fd, mode)
+		except OSError as e:
+			return paramiko.SFTPServer.convert_errno(e.errno)
+		handle = _Handle(flags)
+		handle.readfile = handle.writefile = fh
+		handle.filename = self._path(path)
+		return handle
+
+	def stat(self, path):
+		try:
+			return paramiko.SFTPAttributes.from_stat(os.stat(self._path(path)))
+		except OSError as e:
+			return paramiko.SFTPServer.convert_errno(e.errno)
+
+	lstat = stat
+
+	def chattr(self, path, attr):
+		return paramiko.SFTP_OK
+
+	def remove(self, path):
+		try:
+			os.remove(self._path(path))
+		except OSError as e:
+			return paramiko.SFTPServer.convert_errno(e.errno)
+		return paramiko.SFTP_OK
+
+	def posix_rename(self, oldpath, newpath):
+		if self.stand_in.posix_rename != paramiko.SFTP_OK:
+			return self.stand_in.posix_rename
+		try:
+			os.replace(self._path(oldpath), self._path(newpath))
+		except OSError as e:
+			return paramiko.SFTPServer.convert_errno(e.errno)
+		return paramiko.SFTP_OK
+
+	def rename(self, oldpath, newpath):
+		# SFTPv3: rename não sobrescreve um destino existente
+		if os.path.exists(self._path(newpath)):
+			return paramiko.SFTP_FAILURE
+		try:
+			os.rename(self._path(oldpath), self._path(newpath))
+		except OSError as e:
+			return paramiko.SFTPServer.convert_errno(e.errno)
+		return paramiko.SFTP_OK
+
+
+class SFTPStandIn:
+	def __init__(self, root: Path) -> None:
+		self.root = root
+		self.host_key = paramiko.RSAKey.generate(1024)
+		self.client_key = paramiko.RSAKey.generate(1024)
+		self.connections = 0
+		self.writes = 0
+		# Resposta ao posix-rename@openssh.com (ex. SFTP_OP_UNSUPPORTED, SFTP_PERMISSION_DENIED)
+		self.posix_rename = paramiko.SFTP_OK
+		self._sock = socket.socket()
+		self._sock.bind(("127.0.0.1", 0))
+		self._sock.listen(16)
+		self.port = self._sock.getsockname()[1]
+		self._transports: List[paramiko.Transport] = []
+		threading.Thread(target=self._accept, daemon=True).start()
+
+	def _accept(self) -> None:
+		while True:
+			try:
+				conn, _ = self._sock.accept()
+			except OSError:
+				return
+			self.connections += 1
+			transport = paramiko.Transport(conn)
+			transport.add_server_key(self.host_key)
+			handler = type("_RootedSFTP", (_SFTP,), {"root": str(self.root), "stand_in": self})
+			transport.set_subsystem_handler("sftp", paramiko.SFTPServer, handler)
+			transport.start_server(server=_Server(self.client_key, str(self.root)))
+			self._transports.append(transport)
+
+	def close(self) -> None:
+		self._sock.close()
+		for transport in self._transports:
+			transport.close()
+
+
+@pytest.fixture
+def server(tmp_path: Path) -> Iterator[SFTPStandIn]:
+	root = tmp_path / "remote"
+	root.mkdir()
+	stand_in = SFTPStandIn(root)
+	yield stand_in
+	stand_in.close()
+
+
+@pytest.fixture
+def key_file(tmp_path: Path, server: SFTPStandIn) -> str:
+	path = tmp_path / "id_rsa"
+	server.client_key.write_private_key_file(str(path))
+	return str(path)
+
+
+def test_parse_target() -> None:
+	config, path = parse_target("deploy@web1:2222:/srv/app/.env", key_file="k")
+	assert (config.user, config.host, config.port, config.key_file, path) == ("deploy", "web1", 2222, "k", "/srv/app/.env")
+	assert parse_target("deploy@web1:/srv/.env")[0].port == 22
+	with pytest.raises(ValueError):
+		parse_target("web1/srv/.env")
+
+
+def test_fan_out_reuses_one_connection_per_host(tmp_path: Path, server: SFTPStandIn, key_file: str) -> None:
+	config = SSHConfig("127.0.0.1", "deploy", key_file, server.port, timeout=5)
+	transfers = []
+	for i in range(5):
+		local = tmp_path / f"f{i}"
+		local.write_text(f"VALUE={i}\n")
+		transfers.append(Transfer(config, str(local), f"/f{i}.env"))
+	transfers.append(Transfer(config, str(tmp_path / "f0"), "/missing/dir/f.env"))
+
+	with SSHPool() as pool:
+		results = fan_out(transfers, max_workers=4, pool=pool)
+		again = fan_out(transfers[:1], pool=pool)
+
+	assert [r.transfer for r in results] == transfers
+	assert all(r.error is None for r in results[:5])
+	# Erro de arquivo não derruba a conexão nem os demais envios do host
+	assert results[5].error is not None
+	assert again[0].error is None
+	assert server.connections == 1
+	assert [(server.root / f"f{i}.env").read_text() for i in range(5)] == [f"VALUE={i}\n" for i in range(5)]
+
+
+def test_fan_out_reports_unreachable_host(tmp_path: Path) -> None:
+	sock = socket.socket()
+	sock.bind(("127.0.0.1", 0))
+	port = sock.getsockname()[1]
+	sock.close()
+	local = tmp_path / "f"
+	local.write_text("A=1\n")
+	config = SSHConfig("127.0.0.1", "deploy", None, port, timeout=1)
+	results = fan_out([Transfer(config, str(local), "/a"), Transfer(config, str(local), "/b")])
+	assert all(r.error for r in results)
+
+
+def test_put_falls_back_only_when_posix_rename_is_unsupported(tmp_path: Path, server: SFTPStandIn, key_file: str) -> None:
+	config = SSHConfig("127.0.0.1", "deploy", key_file, server.port, timeout=5)
+	local = tmp_path / "new.env"
+	local.write_text("A=2\n")
+	live = server.root / "app.env"
+	live.write_text("A=1\n")
+
+	# Erro real no rename: o destino fica intacto, o temporário é removido e o erro sobe
+	server.posix_rename = paramiko.SFTP_PERMISSION_DENIED
+	with SSHPool() as pool:
+		with pytest.raises(PermissionError):
+			pool.put(config, str(local), "/app.env")
+	assert live.read_text() == "A=1\n"
+	assert sorted(p.name for p in server.root.iterdir()) == ["app.env"]
+
+	# Servidor sem a extensão: troca por rename simples, sem perder o destino
+	server.posix_rename = paramiko.SFTP_OP_UNSUPPORTED
+	with SSHPool() as pool:
+		pool.put(config, str(local), "/app.env")
+		pool.put(config, str(local), "/other.env")
+	assert live.read_text() == "A=2\n"
+	assert sorted(p.name for p in server.root.iterdir()) == ["app.env", "other.env"]
+
+
+def test_deploy_ssh_uploads_only_changed_remotes(tmp_path: Path, monkeypatch, server: SFTPStandIn, key_file: str) -> None:
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / ".envsecure" / "templates").mkdir(parents=True)
+	(tmp_path / ".envsecure" / "secrets").mkdir()
+	(tmp_path / ".envsecure" / "templates" / "app.env.safe").write_text("DB_HOST=\nDATABASE_URL=postgres://${DB_HOST}/app\n")
+	for env, host in (("prod", "db1"), ("staging", "db2")):
+		(tmp_path / ".envsecure" / "secrets" / f"secrets.{env}").write_text(f"DB_HOST={host}\n")
+	target = f"deploy@127.0.0.1:{server.port}:/{{env}}.env"
+
+	args = ["deploy", "--envs", "prod,staging", "--ssh", target, "--key", key_file, "--ssh-timeout", "5"]
+	result = CliRunner().invoke(cli, args)
+	assert result.exit_code == 0, result.output
+	assert (server.root / "prod.env").read_text() == "DB_HOST=db1\nDATABASE_URL=postgres://db1/app\n"
+	assert (server.root / "staging.env").read_text() == "DB_HOST=db2\nDATABASE_URL=postgres://db2/app\n"
+	assert server.connections == 1
+	writes = server.writes
+	assert [p.name for p in server.root.iterdir() if p.name.endswith(".tmp")] == []
+
+	# Conteúdo remoto atual (stat igual ao registrado): nada é enviado
+	result = CliRunner().invoke(cli, args)
+	assert result.exit_code == 0, result.output
+	assert server.writes == writes
+
+	# Alteração remota de mesmo tamanho: só o host/arquivo divergente é reenviado
+	tampered = server.root / "prod.env"
+	tampered.write_text(tampered.read_text().replace("db1", "dbX"))
+	os.utime(tampered, (1, 1))
+	result = CliRunner().invoke(cli, args + ["--remote-check", "hash"])
+	assert result.exit_code == 0, result.output
+	assert server.writes == writes + 1
+	assert tampered.read_text() == "DB_HOST=db1\nDATABASE_URL=postgres://db1/app\n"
+
+	result = CliRunner().invoke(cli, args + ["--remote-check", "hash"])
+	assert server.writes == writes + 1
+
+	result = CliRunner().invoke(cli, ["deploy", "--envs", "prod,staging", "--ssh", "deploy@127.0.0.1:/same.env"])
+	assert result.exit_code != 0
+	assert "{env}" in result.output
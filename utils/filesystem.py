@@ -1,5 +1,7 @@
 from __future__ import annotations
 from pathlib import Path
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
 import shutil
 import os
 
@@ -11,11 +13,43 @@ def ensure_mode(path: Path, mode: int = 0o600) -> None:
 		pass
 
 
-def atomic_write(path: Path, content: str) -> None:
+def atomic_write(path: Path, content: Union[str, bytes], mode: Optional[int] = 0o600) -> None:
 	tmp = path.with_suffix(path.suffix + ".tmp")
-	tmp.write_text(content)
+	if isinstance(content, bytes):
+		tmp.write_bytes(content)
+	else:
+		tmp.write_text(content)
 	shutil.move(tmp, path)
-	ensure_mode(path)
+	if mode is not None:
+		ensure_mode(path, mode)
 
 
+@contextmanager
+def file_lock(path: Path, shared: bool = False) -> Iterator[None]:
+	"""Lock consultivo entre processos sobre `path` (flock no POSIX, msvcrt no Windows).
 
+	No Windows não há lock compartilhado: `shared` vira exclusivo.
+	"""
+	path.parent.mkdir(parents=True, exist_ok=True)
+	with open(path, "a+b") as fh:
+		if os.name == "nt":
+			import msvcrt
+			fh.seek(0)
+			while True:
+				try:
+					msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+					break
+				except OSError:
+					continue
+			try:
+				yield
+			finally:
+				fh.seek(0)
+				msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+		else:
+			import fcntl
+			fcntl.flock(fh.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+			try:
+				yield
+			finally:
+				fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import List, Tuple
+import subprocess
+
+
+def _git(repo: Path, *args: str) -> str:
+	try:
+		proc = subprocess.run(
+			["git", "-C", str(repo), *args],
+			check=True,
+			stdout=subprocess.PIPE,
+			stderr=subprocess.PIPE,
+		)
+	except FileNotFoundError:
+		raise RuntimeError("Executável 'git' não encontrado")
+	except subprocess.CalledProcessError as e:
+		raise RuntimeError(e.stderr.decode(errors="ignore").strip() or f"git {' '.join(args)} falhou")
+	return proc.stdout.decode("utf-8", errors="surrogateescape")
+
+
+def changed_files(repo: Path, since: str) -> Tuple[List[str], List[str]]:
+	"""Lista arquivos alterados desde `since` (índice + árvore de trabalho + não rastreados).
+
+	Retorna (alterados_ou_novos, removidos), com caminhos relativos a `repo`.
+	Usa apenas o repositório local.
+	"""
+	changed: List[str] = []
+	deleted: List[str] = []
+	# Renomeações aparecem como remoção + adição
+	tokens = _git(repo, "diff", "--name-status", "-z", "--no-renames", "--relative", since, "--").split("\0")
+	for status, path in zip(tokens[0::2], tokens[1::2]):
+		if not status:
+			continue
+		if status.startswith("D"):
+			deleted.append(path)
+		else:
+			changed.append(path)
+	untracked = _git(repo, "ls-files", "--others", "--exclude-standard", "-z").split("\0")
+	changed.extend(p for p in untracked if p)
+	return changed, deleted
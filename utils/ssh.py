@@ -1,27 +1,298 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+import posixpath
+import re
+import shlex
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
 import paramiko
 
 
-@dataclass
+DEFAULT_TIMEOUT = 10.0
+# Verificação remota antes de enviar: nenhuma, stat (tamanho/mtime registrados) ou sha256sum
+CHECK_MODES = ("none", "stat", "hash")
+TARGET_RE = re.compile(r"^(?P<user>[^@\s]+)@(?P<host>[^:\s]+)(?::(?P<port>\d+))?:(?P<path>.+)$")
+
+
+@dataclass(frozen=True)
 class SSHConfig:
 	host: str
 	user: str
 	key_file: Optional[str] = None
+	port: int = 22
+	timeout: float = DEFAULT_TIMEOUT
 
 
-def send_file(config: SSHConfig, local_path: str, remote_path: str) -> None:
-	client = paramiko.SSHClient()
-	client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-	client.connect(
-		hostname=config.host,
-		username=config.user,
-		key_filename=config.key_file,
-	)
-	sftp = client.open_sftp()
-	sftp.put(local_path, remote_path)
-	sftp.close()
-	client.close()
+# (tamanho, mtime) do arquivo remoto
+RemoteStat = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class Transfer:
+	config: SSHConfig
+	local_path: str
+	remote_path: str
+	# sha256 e tamanho do conteúdo local (modo "hash")
+	digest: Optional[str] = None
+	size: Optional[int] = None
+	# stat remoto registrado após o último envio deste mesmo conteúdo (modo "stat")
+	expected: Optional[RemoteStat] = None
+
+	@property
+	def target(self) -> str:
+		return format_target(self.config, self.remote_path)
+
+
+@dataclass
+class TransferResult:
+	transfer: Transfer
+	seconds: float
+	error: Optional[str] = None
+	# Conteúdo remoto já era o atual: nada foi enviado
+	skipped: bool = False
+	remote: Optional[RemoteStat] = None
+
+
+def parse_target(spec: str, key_file: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT) -> Tuple[SSHConfig, str]:
+	"""Converte 'user@host:/path' (ou 'user@host:porta:/path') em (SSHConfig, caminho remoto)."""
+	m = TARGET_RE.match(spec)
+	if not m:
+		raise ValueError(f"Alvo SSH inválido: {spec!r} (esperado user@host:/caminho)")
+	port = int(m.group("port")) if m.group("port") else 22
+	return SSHConfig(m.group("host"), m.group("user"), key_file, port, timeout), m.group("path")
+
+
+def format_target(config: SSHConfig, remote_path: str) -> str:
+	port = f":{config.port}" if config.port != 22 else ""
+	return f"{config.user}@{config.host}{port}:{remote_path}"
+
+
+def _unsupported(error: IOError) -> bool:
+	# SSH_FX_OP_UNSUPPORTED chega sem errno, só com a mensagem ("Operation unsupported")
+	return error.errno is None and "unsupported" in str(error).lower()
+
+
+def _swap(sftp: paramiko.SFTPClient, tmp_path: str, remote_path: str) -> None:
+	"""Troca o destino sem posix-rename: o atual vira backup antes de o novo entrar no lugar.
+
+	O destino nunca é apagado antes de o novo arquivo estar no lugar; se o segundo rename
+	falhar, o backup volta para o destino.
+	"""
+	backup: Optional[str] = f"{tmp_path}.old"
+	try:
+		sftp.rename(remote_path, backup)
+	except FileNotFoundError:
+		backup = None
+	try:
+		sftp.rename(tmp_path, remote_path)
+	except BaseException:
+		if backup is not None:
+			sftp.rename(backup, remote_path)
+		raise
+	if backup is not None:
+		try:
+			sftp.remove(backup)
+		except (OSError, paramiko.SSHException):
+			pass
+
+
+class _Connection:
+	def __init__(self, config: SSHConfig) -> None:
+		self.client = paramiko.SSHClient()
+		self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+		self.client.connect(
+			hostname=config.host,
+			port=config.port,
+			username=config.user,
+			key_filename=config.key_file,
+			timeout=config.timeout,
+			banner_timeout=config.timeout,
+			auth_timeout=config.timeout,
+		)
+		self.sftp = self.client.open_sftp()
+		self.sftp.get_channel().settimeout(config.timeout)
+		# Um SFTPClient atende uma operação por vez
+		self.lock = threading.Lock()
+		# Vira False quando o servidor responde que não suporta posix-rename@openssh.com
+		self.posix_rename = True
+
+	def alive(self) -> bool:
+		transport = self.client.get_transport()
+		return transport is not None and transport.is_active()
 
+	def close(self) -> None:
+		try:
+			self.sftp.close()
+		finally:
+			self.client.close()
 
+
+class SSHPool:
+	"""Conexões autenticadas + sessões SFTP reaproveitadas por (host, porta, usuário, chave)."""
+
+	def __init__(self) -> None:
+		self._connections: Dict[Tuple[str, int, str, Optional[str]], _Connection] = {}
+		self._locks: Dict[Tuple[str, int, str, Optional[str]], threading.Lock] = {}
+		self._guard = threading.Lock()
+
+	@staticmethod
+	def _key(config: SSHConfig) -> Tuple[str, int, str, Optional[str]]:
+		return (config.host, config.port, config.user, config.key_file)
+
+	def connection(self, config: SSHConfig) -> _Connection:
+		key = self._key(config)
+		with self._guard:
+			lock = self._locks.setdefault(key, threading.Lock())
+		# Lock por host: chamadas concorrentes ao mesmo host esperam um único handshake
+		with lock:
+			conn = self._connections.get(key)
+			if conn is None or not conn.alive():
+				conn = _Connection(config)
+				self._connections[key] = conn
+			return conn
+
+	def alive(self, config: SSHConfig) -> bool:
+		conn = self._connections.get(self._key(config))
+		return conn is not None and conn.alive()
+
+	def discard(self, config: SSHConfig) -> None:
+		with self._guard:
+			conn = self._connections.pop(self._key(config), None)
+		if conn is not None:
+			conn.close()
+
+	def stat(self, config: SSHConfig, remote_path: str) -> Optional[RemoteStat]:
+		conn = self.connection(config)
+		with conn.lock:
+			try:
+				attrs = conn.sftp.stat(remote_path)
+			except FileNotFoundError:
+				return None
+		return int(attrs.st_size or 0), int(attrs.st_mtime or 0)
+
+	def digest(self, config: SSHConfig, remote_path: str) -> Optional[str]:
+		"""sha256 do arquivo remoto via `sha256sum`; None se o arquivo ou o comando não existir."""
+		conn = self.connection(config)
+		_, stdout, _ = conn.client.exec_command(f"sha256sum -- {shlex.quote(remote_path)}", timeout=config.timeout)
+		output = stdout.read().decode("utf-8", "replace")
+		if stdout.channel.recv_exit_status() != 0 or not output:
+			return None
+		return output.split()[0].lower()
+
+	def put(self, config: SSHConfig, local_path: str, remote_path: str) -> RemoteStat:
+		"""Envia para um temporário no mesmo diretório e renomeia por cima do destino.
+
+		Quem lê o destino vê o arquivo antigo ou o novo, nunca um parcial. Só quando o servidor
+		não suporta posix-rename o destino é trocado em dois renames (ver `_swap`). Qualquer
+		outro erro remove o temporário e é repassado, com o destino intacto. Retorna o stat final.
+		"""
+		directory, name = posixpath.split(remote_path)
+		tmp_path = posixpath.join(directory, f".{name}.{uuid.uuid4().hex[:12]}.tmp")
+		conn = self.connection(config)
+		with conn.lock:
+			sftp = conn.sftp
+			try:
+				sftp.put(local_path, tmp_path)
+				sftp.chmod(tmp_path, 0o600)
+				if conn.posix_rename:
+					try:
+						sftp.posix_rename(tmp_path, remote_path)
+					except IOError as e:
+						if not _unsupported(e):
+							raise
+						conn.posix_rename = False
+				if not conn.posix_rename:
+					_swap(sftp, tmp_path, remote_path)
+			except BaseException:
+				try:
+					sftp.remove(tmp_path)
+				except (OSError, paramiko.SSHException):
+					pass
+				raise
+			attrs = sftp.stat(remote_path)
+		return int(attrs.st_size or 0), int(attrs.st_mtime or 0)
+
+	def unchanged(self, transfer: Transfer, mode: str) -> Tuple[bool, Optional[RemoteStat]]:
+		"""(conteúdo remoto já é o atual?, stat remoto) conforme o modo de verificação."""
+		if mode == "none":
+			return False, None
+		remote = self.stat(transfer.config, transfer.remote_path)
+		if remote is None:
+			return False, None
+		if mode == "stat":
+			return transfer.expected is not None and remote == transfer.expected, remote
+		if transfer.digest is None or (transfer.size is not None and remote[0] != transfer.size):
+			return False, remote
+		return self.digest(transfer.config, transfer.remote_path) == transfer.digest, remote
+
+	def close(self) -> None:
+		with self._guard:
+			connections = list(self._connections.values())
+			self._connections.clear()
+		for conn in connections:
+			conn.close()
+
+	def __enter__(self) -> "SSHPool":
+		return self
+
+	def __exit__(self, *exc: object) -> None:
+		self.close()
+
+
+def _run_host(pool: SSHPool, transfers: List[Transfer], check: str) -> List[TransferResult]:
+	results: List[TransferResult] = []
+	failed: Optional[str] = None
+	for transfer in transfers:
+		start = time.perf_counter()
+		if failed is not None:
+			results.append(TransferResult(transfer, 0.0, failed))
+			continue
+		try:
+			same, remote = pool.unchanged(transfer, check)
+			if same:
+				results.append(TransferResult(transfer, time.perf_counter() - start, skipped=True, remote=remote))
+				continue
+			remote = pool.put(transfer.config, transfer.local_path, transfer.remote_path)
+		except (OSError, EOFError, paramiko.SSHException) as e:
+			error = f"{type(e).__name__}: {e}"
+			results.append(TransferResult(transfer, time.perf_counter() - start, error))
+			if isinstance(e, socket.timeout) or not pool.alive(transfer.config):
+				# Erro de conexão/timeout (não de arquivo): os demais arquivos do host falham juntos
+				failed = error
+				pool.discard(transfer.config)
+			continue
+		results.append(TransferResult(transfer, time.perf_counter() - start, remote=remote))
+	return results
+
+
+def fan_out(
+	transfers: List[Transfer],
+	max_workers: int = 8,
+	pool: Optional[SSHPool] = None,
+	check: str = "none",
+) -> List[TransferResult]:
+	"""Envia os arquivos em paralelo: um worker por host (até `max_workers`), conexão reaproveitada
+	para todos os arquivos do mesmo host. Com `check` ("stat"/"hash"), destinos cujo conteúdo
+	remoto já é o atual são pulados. Resultados na ordem de `transfers`."""
+	by_host: Dict[Tuple[str, int, str, Optional[str]], List[Transfer]] = {}
+	for transfer in transfers:
+		by_host.setdefault(SSHPool._key(transfer.config), []).append(transfer)
+	own_pool = pool is None
+	pool = pool or SSHPool()
+	try:
+		with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(by_host) or 1))) as executor:
+			batches = list(executor.map(lambda group: _run_host(pool, group, check), by_host.values()))
+	finally:
+		if own_pool:
+			pool.close()
+	done = {id(r.transfer): r for batch in batches for r in batch}
+	return [done[id(t)] for t in transfers]
+
+
+def send_file(config: SSHConfig, local_path: str, remote_path: str) -> None:
+	with SSHPool() as pool:
+		pool.put(config, local_path, remote_path)
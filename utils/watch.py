@@ -0,0 +1,131 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Set, Tuple, Union
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+
+# Máscaras de inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+_EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+	"""Detecta mudanças comparando (mtime_ns, tamanho) de snapshots sucessivos."""
+
+	def __init__(self, list_files: Callable[[], Iterable[Path]], interval: float = 1.0) -> None:
+		self.list_files = list_files
+		self.interval = interval
+		self._snapshot = self._take()
+
+	def _take(self) -> Dict[str, Tuple[int, int]]:
+		snapshot: Dict[str, Tuple[int, int]] = {}
+		for path in self.list_files():
+			try:
+				st = os.stat(path)
+			except OSError:
+				continue
+			snapshot[str(path)] = (st.st_mtime_ns, st.st_size)
+		return snapshot
+
+	def poll(self, timeout: float) -> Set[str]:
+		time.sleep(min(timeout, self.interval))
+		current = self._take()
+		changed = {p for p, sig in current.items() if self._snapshot.get(p) != sig}
+		changed.update(p for p in self._snapshot if p not in current)
+		self._snapshot = current
+		return changed
+
+	def close(self) -> None:
+		pass
+
+
+class InotifyWatcher:
+	"""Observa a árvore com inotify (Linux), adicionando novos diretórios conforme surgem."""
+
+	def __init__(self, base: Path, exclude: Iterable[str]) -> None:
+		libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+		self._add = libc.inotify_add_watch
+		self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+		self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		if self.fd < 0:
+			raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+		self.base = base
+		self.excluded = set(exclude)
+		self._dirs: Dict[int, str] = {}
+		self._watch_tree(str(base))
+
+	def _watch_tree(self, root: str) -> None:
+		for current, dirs, _ in os.walk(root):
+			dirs[:] = [d for d in dirs if d not in self.excluded]
+			wd = self._add(self.fd, os.fsencode(current), WATCH_MASK)
+			if wd >= 0:
+				self._dirs[wd] = current
+
+	def poll(self, timeout: float) -> Set[str]:
+		changed: Set[str] = set()
+		ready, _, _ = select.select([self.fd], [], [], timeout)
+		if not ready:
+			return changed
+		while True:
+			try:
+				data = os.read(self.fd, 64 * 1024)
+			except BlockingIOError:
+				break
+			offset = 0
+			while offset < len(data):
+				wd, mask, _, length = _EVENT.unpack_from(data, offset)
+				raw_name = data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+				offset += _EVENT.size + length
+				if mask & IN_Q_OVERFLOW:
+					# Eventos perdidos: trata a árvore inteira como alterada
+					changed.add(str(self.base))
+					continue
+				if mask & IN_IGNORED:
+					self._dirs.pop(wd, None)
+					continue
+				parent = self._dirs.get(wd)
+				if parent is None or not raw_name:
+					continue
+				name = os.fsdecode(raw_name)
+				if mask & IN_ISDIR and name in self.excluded:
+					continue
+				path = os.path.join(parent, name)
+				if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+					self._watch_tree(path)
+				changed.add(path)
+		return changed
+
+	def close(self) -> None:
+		os.close(self.fd)
+
+
+def create_watcher(
+	base: Path,
+	exclude: Iterable[str],
+	list_files: Callable[[], Iterable[Path]],
+	interval: float = 1.0,
+	force_polling: bool = False,
+) -> Union[InotifyWatcher, PollingWatcher]:
+	if not force_polling and sys.platform.startswith("linux"):
+		try:
+			return InotifyWatcher(base, exclude)
+		except (OSError, AttributeError):
+			# libc sem inotify ou limite de watches atingido
+			pass
+	return PollingWatcher(list_files, interval)